@@ -1,15 +1,180 @@
-from openai import OpenAI
+from openai import APIConnectionError, APIStatusError, APITimeoutError, AsyncOpenAI
+import asyncio
 import json
+import threading
+import weakref
+from collections import OrderedDict
 from datetime import datetime
 
+from app.resilience import CircuitOpenError, backoff_delay, get_circuit_breaker
+from app.taxonomy_ranker import TaxonomyRanker
+from config import Config
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _get_background_loop():
+    """
+    Obtém o event loop em segundo plano usado pelos métodos síncronos, de modo
+    que threads diferentes compartilhem as conexões do cliente assíncrono.
+    
+    Returns:
+        asyncio.AbstractEventLoop: Event loop em execução numa thread daemon
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name='openai-async', daemon=True).start()
+            _loop = loop
+        return _loop
+
+
+# Partes fixas dos prompts (taxonomia e instruções) já montadas, por lista de registros do aia.json
+_prefix_cache = OrderedDict()
+_prefix_lock = threading.Lock()
+
+
+def _cached_prefix(kind, aia_data, build):
+    """
+    Obtém uma parte fixa do prompt, montada uma única vez por versão da
+    taxonomia. A lista de registros do aia.json só é substituída quando o
+    arquivo muda (get_taxonomy), então a própria lista identifica a versão.
+    
+    Args:
+        kind: Tipo da parte do prompt
+        aia_data: Lista de categorias do arquivo aia.json
+        build: Função que monta a parte a partir de aia_data
+        
+    Returns:
+        Parte do prompt montada
+    """
+    key = (kind, id(aia_data))
+    with _prefix_lock:
+        cached = _prefix_cache.get(key)
+        if cached is not None and cached[0] is aia_data:
+            _prefix_cache.move_to_end(key)
+            return cached[1]
+    
+    value = build(aia_data)
+    with _prefix_lock:
+        _prefix_cache[key] = (aia_data, value)
+        while len(_prefix_cache) > 16:
+            _prefix_cache.popitem(last=False)
+    return value
+
 class OpenAIClient:
-    def __init__(self, api_key):
+    # Modelo usado nas duas etapas da classificação
+    MODEL = "gpt-3.5-turbo"
+    
+    # Versão dos prompts: incrementar ao alterar _build_prompt_etapa1/_build_prompt_etapa2,
+    # para que as sugestões em cache sejam geradas novamente
+    PROMPT_VERSION = 2
+    
+    # Papel do assistente, no início de todas as mensagens de sistema
+    SYSTEM_PROMPT = "Você é um assistente especializado em categorizar projetos de pesquisa e desenvolvimento."
+    
+    # Modelo do modo de chamada única (precisa suportar saída estruturada com JSON schema)
+    SINGLE_CALL_MODEL = "gpt-4o-mini"
+    
+    # Modos de classificação: duas chamadas (padrão) ou uma única chamada estruturada
+    MODES = ('duas_etapas', 'uma_etapa')
+    
+    # Campos do projeto enviados nos prompts
+    PROJECT_FIELDS = ('titulo', 'titulo_publico', 'objetivo', 'descricao_publica', 'tags')
+    
+    def __init__(self, api_key, timeout=None, mode=None, prerank=None, transport=None):
         self.api_key = api_key
-        self.client = OpenAI(api_key=api_key)
+        
+        # Transporte HTTP opcional (ex.: cassete de gravação/reprodução, ver app.openai_transport)
+        self.transport = transport
+        
+        # Pré-ranking local dos segmentos na primeira etapa (ver _shortlist)
+        self.prerank = Config.AI_PRERANK if prerank is None else prerank
+        
+        # Modo de classificação (ver MODES)
+        self.mode = mode or Config.AI_SUGGESTION_MODE
+        if self.mode not in self.MODES:
+            raise ValueError(f"Modo de sugestão desconhecido: {self.mode}")
+        
+        # Tempo máximo (segundos) de uma sugestão completa (duas etapas)
+        self.timeout = timeout if timeout is not None else Config.OPENAI_TIMEOUT
+        
+        # Resiliência de cada chamada à API: tempo máximo por etapa, novas tentativas
+        # (429/5xx/timeout), requisição de reserva (hedge) e disjuntor compartilhado
+        self.stage_timeout = Config.OPENAI_STAGE_TIMEOUT
+        self.max_retries = Config.OPENAI_MAX_RETRIES
+        self.hedge_after = Config.OPENAI_HEDGE_AFTER
+        self.breaker = get_circuit_breaker(Config.OPENAI_BREAKER_FAILURES, Config.OPENAI_BREAKER_RESET_SECONDS)
+        
+        # Clientes AsyncOpenAI por event loop
+        self._async_clients = weakref.WeakKeyDictionary()
+        
+        # Uso acumulado da API (requisições e tokens) por este cliente
+        self.usage = {'requests': 0, 'prompt_tokens': 0, 'cached_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+        self._usage_lock = threading.Lock()
+        
+        # Função opcional chamada com os tokens de cada sugestão (ex.: limitador de taxa)
+        self.on_usage = None
+    
+    @classmethod
+    def model_for(cls, mode):
+        """
+        Obtém o modelo usado por um modo de classificação.
+        
+        Args:
+            mode: Modo de classificação (ver MODES)
+            
+        Returns:
+            str: Nome do modelo
+        """
+        return cls.SINGLE_CALL_MODEL if mode == 'uma_etapa' else cls.MODEL
+    
+    def _record_usage(self, response):
+        """
+        Acumula o uso de tokens informado na resposta da API.
+        
+        Args:
+            response: Resposta de chat.completions.create
+            
+        Returns:
+            int: Total de tokens da resposta
+        """
+        usage = getattr(response, 'usage', None)
+        total_tokens = (usage.total_tokens or 0) if usage is not None else 0
+        
+        # Tokens do prompt atendidos pelo cache de prompts da OpenAI (prefixo repetido)
+        details = getattr(usage, 'prompt_tokens_details', None)
+        cached_tokens = (getattr(details, 'cached_tokens', None) or 0) if details is not None else 0
+        
+        with self._usage_lock:
+            self.usage['requests'] += 1
+            if usage is not None:
+                self.usage['prompt_tokens'] += usage.prompt_tokens or 0
+                self.usage['completion_tokens'] += usage.completion_tokens or 0
+            self.usage['cached_tokens'] += cached_tokens
+            self.usage['total_tokens'] += total_tokens
+        
+        if usage is not None:
+            print(f"OpenAI: {usage.prompt_tokens} tokens de prompt ({cached_tokens} em cache), "
+                  f"{usage.completion_tokens} de resposta")
+        return total_tokens
+    
+    def get_usage(self):
+        """
+        Obtém o uso acumulado da API.
+        
+        Returns:
+            dict: Requisições e tokens (prompt, em cache, completion e total)
+        """
+        with self._usage_lock:
+            return dict(self.usage)
     
     def suggest_categories(self, project, categories_lists=None, aia_data=None):
         """
         Sugere categorias para um projeto usando a API do OpenAI em um processo de duas etapas.
+        Versão síncrona: executa suggest_categories_async no event loop em segundo plano.
         
         Etapa 1: A IA identifica a Micro Área, Segmento e Domínio
         Etapa 2: Com base nessas informações, fornecemos a lista correta de Domínios Afeitos Outros
@@ -23,28 +188,280 @@ class OpenAIClient:
         Returns:
             Dicionário com as categorias sugeridas e informações adicionais
         """
+        future = asyncio.run_coroutine_threadsafe(
+            self._suggest(project, aia_data, self.timeout), _get_background_loop()
+        )
+        result, tokens = future.result()
+        self._notify_usage(tokens)
+        return result
+    
+    async def suggest_categories_async(self, project, categories_lists=None, aia_data=None, timeout=None):
+        """
+        Versão assíncrona de suggest_categories, baseada no cliente AsyncOpenAI.
+        
+        Args:
+            project: Dicionário com informações do projeto
+            categories_lists: Dicionário com as listas de categorias disponíveis (opcional)
+            aia_data: Lista de categorias do arquivo aia.json (opcional)
+            timeout: Tempo máximo (segundos) das duas etapas; padrão: o do cliente
+            
+        Returns:
+            Dicionário com as categorias sugeridas e informações adicionais
+        """
+        result, tokens = await self._suggest(project, aia_data, timeout or self.timeout)
+        self._notify_usage(tokens)
+        return result
+    
+    async def suggest_many_async(self, projects, aia_data=None, max_concurrency=8, timeout=None):
+        """
+        Sugere categorias para vários projetos ao mesmo tempo, com no máximo
+        max_concurrency chamadas em andamento. Cancelar a tarefa cancela as
+        chamadas pendentes.
+        
+        Args:
+            projects: Lista de dicionários de projetos
+            aia_data: Lista de categorias do arquivo aia.json (opcional)
+            max_concurrency: Quantidade máxima de projetos processados simultaneamente
+            timeout: Tempo máximo (segundos) por projeto; padrão: o do cliente
+            
+        Returns:
+            list: Sugestões na mesma ordem dos projetos
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        
+        async def suggest(project):
+            async with semaphore:
+                return await self.suggest_categories_async(project, None, aia_data, timeout)
+        
+        return await asyncio.gather(*(suggest(project) for project in projects))
+    
+    def _notify_usage(self, tokens):
+        """Informa os tokens de uma sugestão à função on_usage, na thread de quem chamou."""
+        if self.on_usage is not None:
+            self.on_usage(tokens)
+    
+    def close(self):
+        """
+        Fecha os clientes AsyncOpenAI deste cliente nos event loops ainda em
+        execução (o fechamento é agendado no próprio loop, sem esperar).
+        """
+        with self._usage_lock:
+            clients = list(self._async_clients.items())
+            self._async_clients.clear()
+        for loop, client in clients:
+            if loop.is_running():
+                asyncio.run_coroutine_threadsafe(client.close(), loop)
+    
+    async def aclose(self):
+        """Fecha o cliente AsyncOpenAI do event loop em execução (ex.: antes do fim de um asyncio.run)."""
+        with self._usage_lock:
+            client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.close()
+    
+    def _async_client(self):
+        """
+        Obtém o cliente AsyncOpenAI do event loop em execução (um por loop, pois
+        as conexões do cliente ficam presas ao loop em que foram abertas).
+        
+        Returns:
+            AsyncOpenAI: Cliente da API
+        """
+        loop = asyncio.get_running_loop()
+        with self._usage_lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                http_client = None
+                if self.transport is not None or Config.OPENAI_CASSETTE_MODE:
+                    # Importado apenas com o cassete ativo: depende do pacote httpx (opcional)
+                    from app.openai_transport import build_http_client
+                    http_client = build_http_client(self.transport)
+                client = AsyncOpenAI(
+                    api_key=self.api_key,
+                    max_retries=0,
+                    base_url=Config.OPENAI_BASE_URL or None,
+                    http_client=http_client
+                )
+                self._async_clients[loop] = client
+            return client
+    
+    async def _create_completion(self, prompt, model=None, response_format=None, system_prompt=None):
+        """
+        Chama a API de chat com o prompt de uma etapa.
+        
+        Args:
+            prompt: Prompt da etapa (parte específica do projeto)
+            model: Modelo a usar (padrão: MODEL)
+            response_format: Formato de resposta estruturada (opcional)
+            system_prompt: Mensagem de sistema fixa (padrão: SYSTEM_PROMPT)
+            
+        Returns:
+            tuple: (texto da resposta, tokens consumidos)
+        """
+        options = {'response_format': response_format} if response_format else {}
+        request = dict(
+            model=model or self.MODEL,
+            messages=[
+                {"role": "system", "content": system_prompt or self.SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.3,
+            max_tokens=800,
+            **options
+        )
+        
+        attempt = 0
+        while True:
+            # Com o circuito aberto a chamada falha imediatamente (CircuitOpenError)
+            self.breaker.allow()
+            try:
+                response = await self._call_with_hedge(request)
+            except asyncio.CancelledError:
+                self.breaker.release()
+                raise
+            except Exception as e:
+                if not self._is_retryable(e):
+                    self.breaker.release()
+                    raise
+                self.breaker.record_failure()
+                if attempt >= self.max_retries or self.breaker.is_open:
+                    raise
+                delay = self._retry_after(e) or backoff_delay(
+                    attempt, Config.OPENAI_RETRY_BASE_DELAY, Config.OPENAI_RETRY_MAX_DELAY
+                )
+                print(f"Falha ao chamar OpenAI ({type(e).__name__}); nova tentativa em {delay:.1f}s")
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            
+            self.breaker.record_success()
+            tokens = self._record_usage(response)
+            return response.choices[0].message.content.strip(), tokens
+    
+    async def _call_once(self, request):
+        """Uma requisição à API, limitada pelo tempo máximo por etapa."""
+        return await asyncio.wait_for(
+            self._async_client().chat.completions.create(**request), self.stage_timeout or None
+        )
+    
+    async def _call_with_hedge(self, request):
+        """
+        Faz a requisição; se hedge_after estiver definido e a resposta demorar mais
+        que isso, envia uma requisição de reserva e usa a que responder primeiro.
+        
+        Args:
+            request: Parâmetros de chat.completions.create
+            
+        Returns:
+            Resposta da API
+        """
+        if not self.hedge_after:
+            return await self._call_once(request)
+        
+        tasks = [asyncio.ensure_future(self._call_once(request))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_after)
+            if not done:
+                print(f"OpenAI sem resposta em {self.hedge_after}s: enviando requisição de reserva")
+                tasks.append(asyncio.ensure_future(self._call_once(request)))
+            
+            error = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # Cancelar a requisição que não foi usada
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+    
+    @staticmethod
+    def _is_retryable(error):
+        """True para erros transitórios: tempo esgotado, conexão, 429 e 5xx."""
+        if isinstance(error, (asyncio.TimeoutError, APITimeoutError, APIConnectionError)):
+            return True
+        if isinstance(error, APIStatusError):
+            return error.status_code == 429 or error.status_code >= 500
+        return False
+    
+    @staticmethod
+    def _retry_after(error):
+        """Espera (segundos) pedida pela API no cabeçalho Retry-After, limitada a OPENAI_RETRY_MAX_DELAY."""
+        response = getattr(error, 'response', None)
+        if response is None:
+            return None
+        try:
+            return min(float(response.headers.get('retry-after')), Config.OPENAI_RETRY_MAX_DELAY)
+        except (TypeError, ValueError):
+            return None
+    
+    async def _suggest(self, project, aia_data, timeout):
+        """
+        Executa as duas etapas da sugestão com tempo máximo.
+        
+        Args:
+            project: Dicionário com informações do projeto
+            aia_data: Lista de categorias do arquivo aia.json
+            timeout: Tempo máximo (segundos) das duas etapas ou None
+            
+        Returns:
+            tuple: (sugestão, tokens consumidos)
+        """
         if not self.api_key:
             return {
                 "error": "Chave da API OpenAI não configurada"
+            }, 0
+        
+        usage = {'tokens': 0}
+        if self.mode == 'uma_etapa':
+            suggest = self._suggest_single_call(project, aia_data, usage)
+        else:
+            suggest = self._suggest_two_steps(project, aia_data, usage)
+        try:
+            result = await asyncio.wait_for(suggest, timeout)
+        except asyncio.TimeoutError:
+            result = {
+                "_aia_n1_macroarea": "",
+                "_aia_n2_segmento": "",
+                "_aia_n3_dominio_afeito": "",
+                "_aia_n3_dominio_outro": "",
+                "confianca": "BAIXA",
+                "justificativa": "",
+                "error": f"Tempo esgotado ao chamar OpenAI ({timeout}s)",
+                "timestamp": datetime.now().isoformat()
             }
+        return result, usage['tokens']
+    
+    async def _suggest_two_steps(self, project, aia_data, usage):
+        """
+        Processo de duas etapas de suggest_categories.
         
+        Args:
+            project: Dicionário com informações do projeto
+            aia_data: Lista de categorias do arquivo aia.json
+            usage: Dicionário onde os tokens consumidos são acumulados
+            
+        Returns:
+            Dicionário com as categorias sugeridas e informações adicionais
+        """
         try:
             # ETAPA 1: Identificar Micro Área, Segmento e Domínio
-            prompt_etapa1 = self._build_prompt_etapa1(project, aia_data)
+            # (taxonomia e instruções fixas na mensagem de sistema; o projeto na mensagem do usuário)
+            prompt_etapa1 = self._build_prompt_etapa1(project)
+            candidates = self._shortlist(project, aia_data)
+            if candidates is None:
+                system_etapa1 = _cached_prefix('etapa1', aia_data, self._build_system_prompt_etapa1)
+            else:
+                system_etapa1 = self._build_system_prompt_etapa1(candidates)
             
             # Chamar a API do ChatGPT para a primeira etapa
-            response_etapa1 = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "Você é um assistente especializado em categorizar projetos de pesquisa e desenvolvimento."},
-                    {"role": "user", "content": prompt_etapa1}
-                ],
-                temperature=0.3,
-                max_tokens=800
-            )
-            
-            # Extrair a resposta da primeira etapa
-            ai_response_etapa1 = response_etapa1.choices[0].message.content.strip()
+            ai_response_etapa1, tokens = await self._create_completion(prompt_etapa1, system_prompt=system_etapa1)
+            usage['tokens'] += tokens
             
             # Processar a resposta da primeira etapa
             try:
@@ -80,18 +497,8 @@ class OpenAIClient:
                 prompt_etapa2 = self._build_prompt_etapa2(project, result_etapa1, dominios_afeitos_outros)
                 
                 # Chamar a API do ChatGPT para a segunda etapa
-                response_etapa2 = self.client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[
-                        {"role": "system", "content": "Você é um assistente especializado em categorizar projetos de pesquisa e desenvolvimento."},
-                        {"role": "user", "content": prompt_etapa2}
-                    ],
-                    temperature=0.3,
-                    max_tokens=800
-                )
-                
-                # Extrair a resposta da segunda etapa
-                ai_response_etapa2 = response_etapa2.choices[0].message.content.strip()
+                ai_response_etapa2, tokens = await self._create_completion(prompt_etapa2)
+                usage['tokens'] += tokens
                 
                 # Processar a resposta da segunda etapa
                 result_etapa2 = self._parse_ai_response(ai_response_etapa2)
@@ -129,6 +536,122 @@ class OpenAIClient:
                 "timestamp": datetime.now().isoformat()
             }
     
+    async def _suggest_single_call(self, project, aia_data, usage):
+        """
+        Modo de chamada única: a IA retorna os quatro campos de uma vez, em saída
+        estruturada (JSON schema). Os Domínios Afeitos Outros devolvidos são
+        filtrados pela lista pré-calculada para a macroárea e o segmento escolhidos.
+        
+        Args:
+            project: Dicionário com informações do projeto
+            aia_data: Lista de categorias do arquivo aia.json
+            usage: Dicionário onde os tokens consumidos são acumulados
+            
+        Returns:
+            Dicionário com as categorias sugeridas e informações adicionais
+        """
+        try:
+            prompt = self._build_prompt_unica(project)
+            ai_response, tokens = await self._create_completion(
+                prompt,
+                self.SINGLE_CALL_MODEL,
+                _cached_prefix('formato_unica', aia_data, self._response_format),
+                _cached_prefix('unica', aia_data, self._build_system_prompt_unica)
+            )
+            usage['tokens'] += tokens
+            
+            result = self._parse_ai_response(ai_response)
+            if not result or "error" in result:
+                return result
+            
+            # Manter apenas domínios de outros segmentos da mesma macroárea
+            permitidos = set(self._get_dominios_afeitos_outros(
+                result.get("_aia_n1_macroarea", ""), result.get("_aia_n2_segmento", ""), aia_data
+            ))
+            dominios_outros = [
+                dominio.strip() for dominio in str(result.get("_aia_n3_dominio_outro") or '').split(';')
+                if dominio.strip() in permitidos
+            ]
+            result["_aia_n3_dominio_outro"] = ';'.join(dominios_outros) if dominios_outros else "N/A"
+            
+            result["timestamp"] = datetime.now().isoformat()
+            return result
+            
+        except Exception as e:
+            return {
+                "_aia_n1_macroarea": "",
+                "_aia_n2_segmento": "",
+                "_aia_n3_dominio_afeito": "",
+                "_aia_n3_dominio_outro": "",
+                "confianca": "BAIXA",
+                "justificativa": "",
+                "error": f"Erro ao chamar OpenAI: {str(e)}",
+                "timestamp": datetime.now().isoformat()
+            }
+    
+    def _response_format(self, aia_data):
+        """
+        Monta o JSON schema da resposta do modo de chamada única, restringindo
+        macroárea e segmento às opções do aia.json.
+        
+        Args:
+            aia_data: Lista de categorias do arquivo aia.json
+            
+        Returns:
+            dict: response_format da API de chat
+        """
+        macroareas = sorted({item.get('Macroárea') for item in aia_data or [] if item.get('Macroárea')})
+        segmentos = sorted({item.get('Segmento') for item in aia_data or [] if item.get('Segmento')})
+        
+        properties = {
+            "_aia_n1_macroarea": {"type": "string"},
+            "_aia_n2_segmento": {"type": "string"},
+            "_aia_n3_dominio_afeito": {"type": "string"},
+            "_aia_n3_dominio_outro": {"type": "string"},
+            "confianca": {"type": "string", "enum": ["ALTA", "MÉDIA", "BAIXA"]},
+            "justificativa": {"type": "string"}
+        }
+        if macroareas:
+            properties["_aia_n1_macroarea"]["enum"] = macroareas
+        if segmentos:
+            properties["_aia_n2_segmento"]["enum"] = segmentos
+        
+        return {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "classificacao_aia",
+                "strict": True,
+                "schema": {
+                    "type": "object",
+                    "properties": properties,
+                    "required": list(properties),
+                    "additionalProperties": False
+                }
+            }
+        }
+    
+    def _shortlist(self, project, aia_data):
+        """
+        Pré-ranking local: seleciona os segmentos do aia.json mais parecidos com o
+        projeto, para enviar à IA apenas esses candidatos na primeira etapa.
+        
+        Args:
+            project: Dicionário com informações do projeto
+            aia_data: Lista de categorias do arquivo aia.json
+            
+        Returns:
+            list: Registros dos segmentos candidatos, ou None para usar a taxonomia
+                  completa (pré-ranking desativado ou com baixa confiança)
+        """
+        if not self.prerank or not aia_data:
+            return None
+        
+        ranker = _cached_prefix('ranker', aia_data, TaxonomyRanker)
+        candidates = ranker.shortlist(project, Config.AI_PRERANK_TOP_K, Config.AI_PRERANK_MIN_SCORE)
+        if candidates is None:
+            print(f"Pré-ranking com baixa confiança para o projeto {project.get('codigo_projeto')}; usando a taxonomia completa")
+        return candidates
+    
     def _parse_ai_response(self, ai_response):
         """
         Analisa a resposta da IA e tenta extrair o JSON.
@@ -198,18 +721,34 @@ class OpenAIClient:
         
         return dominios_outros
     
-    def _build_prompt_etapa1(self, project, aia_data=None):
+    def _build_project_text(self, project):
         """
-        Constrói o prompt para a primeira etapa: identificação de Micro Área, Segmento e Domínio.
+        Monta o texto com as informações do projeto enviadas nos prompts.
         
         Args:
             project: Dicionário com informações do projeto
-            aia_data: Lista de categorias do arquivo aia.json (opcional)
             
         Returns:
-            String com o prompt formatado
+            String com os campos do projeto
+        """
+        return f"""
+        Título do Projeto: {project.get('titulo', '')}
+        Título Público: {project.get('titulo_publico', '')}
+        Objetivo: {project.get('objetivo', '')}
+        Descrição Pública: {project.get('descricao_publica', '')}
+        Tags: {project.get('tags', '')}
+        """
+    
+    def _build_taxonomy_text(self, aia_data):
+        """
+        Monta o texto das categorias do aia.json agrupadas por Macroárea e Segmento.
+        
+        Args:
+            aia_data: Lista de categorias do arquivo aia.json
+            
+        Returns:
+            String com as categorias (vazia se não houver aia_data)
         """
-        # Construir a parte do prompt com as categorias do aia.json
         aia_categories_text = ""
         
         if aia_data:
@@ -244,14 +783,26 @@ class OpenAIClient:
                 
                 aia_categories_text += "\n"
         
-        prompt = f"""
-        Com base nas informações do projeto abaixo, sugira as categorias mais apropriadas do AIA (Áreas de Interesse Aplicado):
+        return aia_categories_text
+    
+    def _build_system_prompt_etapa1(self, aia_data=None):
+        """
+        Constrói a mensagem de sistema da primeira etapa: papel, categorias do
+        aia.json e instruções. Não contém nada do projeto, para que seja um
+        prefixo idêntico entre as chamadas (aproveitado pelo cache de prompts da
+        OpenAI). Montada uma vez por versão da taxonomia (_cached_prefix).
         
-        Título do Projeto: {project.get('titulo', '')}
-        Título Público: {project.get('titulo_publico', '')}
-        Objetivo: {project.get('objetivo', '')}
-        Descrição Pública: {project.get('descricao_publica', '')}
-        Tags: {project.get('tags', '')}
+        Args:
+            aia_data: Lista de categorias do arquivo aia.json (opcional)
+            
+        Returns:
+            String com a mensagem de sistema
+        """
+        aia_categories_text = self._build_taxonomy_text(aia_data)
+        
+        return f"""{self.SYSTEM_PROMPT}
+        
+        Com base nas informações do projeto enviadas pelo usuário, sugira as categorias mais apropriadas do AIA (Áreas de Interesse Aplicado):
         
         {aia_categories_text}
         
@@ -276,8 +827,23 @@ class OpenAIClient:
         
         É MUITO IMPORTANTE que sua resposta seja um JSON válido, pois será processada automaticamente.
         """
+    
+    def _build_prompt_etapa1(self, project):
+        """
+        Constrói o prompt (mensagem do usuário) para a primeira etapa: apenas as
+        informações do projeto; a taxonomia e as instruções ficam na mensagem
+        de sistema (_build_system_prompt_etapa1).
         
-        return prompt
+        Args:
+            project: Dicionário com informações do projeto
+            
+        Returns:
+            String com o prompt formatado
+        """
+        return f"""
+        Classifique o projeto abaixo:
+        {self._build_project_text(project)}
+        """
     
     def _build_prompt_etapa2(self, project, result_etapa1, dominios_afeitos_outros):
         """
@@ -337,6 +903,93 @@ class OpenAIClient:
         
         return prompt
     
+    def _build_system_prompt_unica(self, aia_data=None):
+        """
+        Constrói a mensagem de sistema do modo de chamada única: papel, categorias
+        do aia.json com os Domínios Afeitos Outros permitidos de cada segmento e
+        instruções. Montada uma vez por versão da taxonomia (_cached_prefix).
+        
+        Args:
+            aia_data: Lista de categorias do arquivo aia.json (opcional)
+            
+        Returns:
+            String com a mensagem de sistema
+        """
+        # Agrupar os domínios por macroárea e segmento
+        macroareas = {}
+        for item in aia_data or []:
+            segmentos = macroareas.setdefault(item.get('Macroárea'), {})
+            dominios = segmentos.setdefault(item.get('Segmento'), [])
+            for dominio in item.get('Domínios Afeitos', '').split(';'):
+                dominio = dominio.strip()
+                if dominio and dominio not in dominios:
+                    dominios.append(dominio)
+        
+        # Os Domínios Afeitos Outros de um segmento são os domínios dos demais
+        # segmentos da mesma macroárea: numerar os segmentos permite indicar a
+        # lista de cada um sem repetir os domínios
+        aia_categories_text = ""
+        if macroareas:
+            aia_categories_text = "Categorias do AIA (Áreas de Interesse Aplicado):\n\n"
+            for macroarea, segmentos in macroareas.items():
+                aia_categories_text += f"Macroárea: {macroarea}\n"
+                numeros = {segmento: i for i, segmento in enumerate(segmentos, 1)}
+                for segmento, dominios in segmentos.items():
+                    aia_categories_text += f"  [{numeros[segmento]}] Segmento: {segmento}\n"
+                    if dominios:
+                        aia_categories_text += "    Domínios Afeitos:\n"
+                        for dominio in dominios:
+                            aia_categories_text += f"      - {dominio}\n"
+                    outros = [f"[{numeros[s]}]" for s in segmentos if s != segmento and segmentos[s]]
+                    if outros:
+                        aia_categories_text += f"    Domínios Afeitos Outros permitidos: os domínios dos segmentos {', '.join(outros)}\n"
+                    else:
+                        aia_categories_text += "    Domínios Afeitos Outros permitidos: nenhum (use \"N/A\")\n"
+                aia_categories_text += "\n"
+        
+        return f"""{self.SYSTEM_PROMPT}
+        
+        Com base nas informações do projeto enviadas pelo usuário, sugira as categorias mais apropriadas do AIA (Áreas de Interesse Aplicado):
+        
+        {aia_categories_text}
+        
+        Você deve classificar o projeto escolhendo EXATAMENTE UMA Macroárea e UM Segmento das opções acima.
+        Para Domínios Afeitos, você pode selecionar MÚLTIPLOS domínios que sejam relevantes para o projeto, mas apenas do segmento escolhido.
+        Para Domínios Afeitos Outros, selecione apenas domínios da lista permitida para o segmento escolhido
+        (domínios de outros segmentos da mesma macroárea que também são relevantes). Se não houver domínios relevantes, use "N/A".
+        
+        Responda com os campos:
+        - "_aia_n1_macroarea": Nome da Macroárea escolhida
+        - "_aia_n2_segmento": Nome do Segmento escolhido
+        - "_aia_n3_dominio_afeito": Domínios separados por ponto e vírgula (Domínio1;Domínio2)
+        - "_aia_n3_dominio_outro": Domínios Afeitos Outros separados por ponto e vírgula, ou "N/A"
+        - "confianca": ALTA, MÉDIA ou BAIXA
+        - "justificativa": Breve explicação da sua classificação (máximo 2 frases)
+        
+        Use o formato exato dos nomes como listados acima.
+        
+        A confiança deve ser:
+        - ALTA: quando você tem certeza da classificação
+        - MÉDIA: quando a classificação é provável, mas há outras possibilidades
+        - BAIXA: quando há pouca informação ou o projeto poderia se encaixar em várias categorias
+        """
+    
+    def _build_prompt_unica(self, project):
+        """
+        Constrói o prompt (mensagem do usuário) do modo de chamada única: apenas
+        as informações do projeto (ver _build_system_prompt_unica).
+        
+        Args:
+            project: Dicionário com informações do projeto
+            
+        Returns:
+            String com o prompt formatado
+        """
+        return f"""
+        Classifique o projeto abaixo:
+        {self._build_project_text(project)}
+        """
+    
     def process_validation(self, suggestion, validation):
         """
         Processa a validação do usuário para uma sugestão da IA.
@@ -389,3 +1042,38 @@ class OpenAIClient:
                 result[db_field] = manual_value  # Usar a chave do banco de dados no resultado
         
         return result
+
+
+# Clientes compartilhados pelo processo, por chave da API e URL base
+MAX_SHARED_CLIENTS = 4
+_shared_clients = OrderedDict()
+_shared_clients_lock = threading.Lock()
+
+
+def get_openai_client(api_key):
+    """
+    Obtém o OpenAIClient compartilhado pelo processo para a chave informada,
+    de modo que rotas e jobs em segundo plano reaproveitem as conexões do
+    cliente assíncrono (um AsyncOpenAI por event loop, ver _async_client).
+    Os clientes substituídos (ex.: após a troca da chave) são fechados.
+    
+    Args:
+        api_key: Chave da API OpenAI
+        
+    Returns:
+        OpenAIClient: Instância única por chave da API e OPENAI_BASE_URL
+    """
+    key = (api_key, Config.OPENAI_BASE_URL)
+    with _shared_clients_lock:
+        client = _shared_clients.get(key)
+        if client is not None:
+            _shared_clients.move_to_end(key)
+            return client
+        client = OpenAIClient(api_key)
+        _shared_clients[key] = client
+        replaced = []
+        while len(_shared_clients) > MAX_SHARED_CLIENTS:
+            replaced.append(_shared_clients.popitem(last=False)[1])
+    for old in replaced:
+        old.close()
+    return client
@@ -0,0 +1,328 @@
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+
+from app.ai_integration import OpenAIClient
+from app.local_classifier import get_local_classifier
+from app.project_store import normalize_project_id
+from app.storage import create_data_client
+from app.suggestion_cache import get_suggestion_cache, suggestion_cache_key
+from app.suggestion_jobs import generate_suggestion
+from app.write_committer import atomic_write_json
+from config import Config
+
+
+class TokenBucket:
+    """
+    Limitador de taxa (token bucket): libera até rate_per_minute unidades por
+    minuto, com rajadas de até capacity. O saldo pode ficar negativo quando o
+    consumo real supera a estimativa; as próximas requisições esperam a dívida.
+    """
+
+    def __init__(self, rate_per_minute, capacity=None):
+        """
+        Inicializa o limitador.
+
+        Args:
+            rate_per_minute: Unidades liberadas por minuto (0 ou None desativa o limite)
+            capacity: Saldo máximo acumulado (padrão: rate_per_minute)
+        """
+        self.rate = (rate_per_minute or 0) / 60.0
+        self.capacity = capacity or rate_per_minute or 0
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        """Acrescenta ao saldo as unidades liberadas desde a última atualização."""
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def acquire(self, amount=1):
+        """
+        Consome unidades do saldo, esperando até que estejam disponíveis.
+
+        Args:
+            amount: Quantidade de unidades
+        """
+        if self.rate <= 0:
+            return
+        # Pedidos maiores que a capacidade esperam o saldo cheio e deixam dívida
+        needed = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= needed:
+                    self._tokens -= amount
+                    return
+                wait_time = (needed - self._tokens) / self.rate
+            time.sleep(min(wait_time, 1.0))
+
+    def adjust(self, amount):
+        """
+        Corrige o saldo após o consumo real ser conhecido.
+
+        Args:
+            amount: Unidades a devolver (positivo) ou a debitar (negativo)
+        """
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+
+class BatchClassifier:
+    """
+    Gera sugestões da IA para todos os projetos ainda não categorizados, com
+    concorrência limitada, limite de requisições e de tokens por minuto e um
+    checkpoint que permite retomar a execução após uma interrupção.
+    """
+
+    def __init__(self, openai_api_key, workers=4, rpm=60, tpm=90000,
+                 checkpoint_path=None, limit=None, report_every=10):
+        """
+        Inicializa o classificador em lote.
+
+        Args:
+            openai_api_key: Chave da API OpenAI
+            workers: Quantidade de projetos processados em paralelo
+            rpm: Limite de requisições por minuto (0 desativa)
+            tpm: Limite de tokens por minuto (0 desativa)
+            checkpoint_path: Arquivo de checkpoint
+            limit: Quantidade máxima de projetos nesta execução
+            report_every: Intervalo (em projetos) entre os relatórios de vazão
+        """
+        self.openai_api_key = openai_api_key
+        self.workers = max(1, workers)
+        self.limit = limit
+        self.report_every = max(1, report_every)
+        self.checkpoint_path = checkpoint_path or Config.AI_BATCH_CHECKPOINT_PATH
+
+        self.json_client = create_data_client()
+        self.openai_client = OpenAIClient(openai_api_key)
+        self.openai_client.on_usage = self._on_usage
+
+        # Cada projeto faz até duas requisições (etapas 1 e 2)
+        self.request_bucket = TokenBucket(rpm)
+        self.token_bucket = TokenBucket(tpm)
+        self._local = threading.local()
+        self._tokens_per_project = None
+
+        self._lock = threading.Lock()
+        self.checkpoint = self._load_checkpoint()
+
+    def _on_usage(self, tokens):
+        """Acumula os tokens de cada sugestão no projeto em andamento na thread."""
+        self._local.tokens = getattr(self._local, 'tokens', 0) + tokens
+
+    def _load_checkpoint(self):
+        """
+        Carrega o checkpoint de uma execução anterior.
+
+        Returns:
+            dict: Projetos processados e falhas
+        """
+        if os.path.exists(self.checkpoint_path):
+            try:
+                with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                    checkpoint = json.load(f)
+                checkpoint.setdefault('processed', [])
+                checkpoint.setdefault('failed', {})
+                return checkpoint
+            except (OSError, ValueError) as e:
+                print(f"Erro ao carregar checkpoint, iniciando do zero: {str(e)}")
+        return {'processed': [], 'failed': {}}
+
+    def save_checkpoint(self):
+        """Grava o checkpoint de forma atômica."""
+        with self._lock:
+            self.checkpoint['updated_at'] = datetime.now().isoformat()
+            os.makedirs(os.path.dirname(self.checkpoint_path) or '.', exist_ok=True)
+            atomic_write_json(self.checkpoint_path, self.checkpoint)
+
+    def pending_projects(self):
+        """
+        Obtém os projetos a processar: sem categorização, fora do checkpoint e
+        sem uma sugestão válida para o texto atual.
+
+        Returns:
+            list: Códigos dos projetos
+        """
+        processed = {normalize_project_id(code) for code in self.checkpoint['processed']}
+        taxonomy = self.json_client.get_taxonomy()
+        cache = get_suggestion_cache(
+            Config.AI_SUGGESTION_CACHE_SIZE, Config.AI_SUGGESTION_CACHE_TTL_DAYS * 24 * 3600
+        )
+
+        pending = []
+        for project in self.json_client.get_excel_data(None, 'projetos'):
+            code = project.get('codigo_projeto')
+            if not code or project.get('_aia_n1_macroarea'):
+                continue
+            if normalize_project_id(code) in processed:
+                continue
+            if cache.lookup(self.json_client, code, suggestion_cache_key(project, taxonomy.version)):
+                continue
+            pending.append(code)
+            if self.limit and len(pending) >= self.limit:
+                break
+        return pending
+
+    def _estimate_tokens(self):
+        """Estimativa de tokens por projeto: média observada ou a capacidade do limite."""
+        if self._tokens_per_project:
+            return self._tokens_per_project
+        return min(4000, self.token_bucket.capacity or 4000)
+
+    def _classify(self, project_id):
+        """
+        Gera e salva a sugestão de um projeto respeitando os limites de taxa.
+
+        Args:
+            project_id: Código do projeto
+
+        Returns:
+            tuple: (sugestão, tokens consumidos)
+        """
+        estimate = self._estimate_tokens()
+        self.request_bucket.acquire(2)
+        self.token_bucket.acquire(estimate)
+
+        self._local.tokens = 0
+        try:
+            suggestion = generate_suggestion(project_id, self.openai_api_key, self.openai_client, use_local=True)
+        finally:
+            tokens = self._local.tokens
+            self.token_bucket.adjust(estimate - tokens)
+        return suggestion, tokens
+
+    def _record(self, project_id, error=None):
+        """Registra o resultado de um projeto no checkpoint."""
+        with self._lock:
+            if error is None:
+                self.checkpoint['processed'].append(project_id)
+                self.checkpoint['failed'].pop(project_id, None)
+            else:
+                self.checkpoint['failed'][project_id] = error
+
+    def run(self):
+        """
+        Processa os projetos pendentes.
+
+        Returns:
+            dict: Resumo da execução (projetos, falhas, tokens e vazão)
+        """
+        pending = self.pending_projects()
+        total = len(pending)
+        print(f"Projetos pendentes: {total} (já processados: {len(self.checkpoint['processed'])})")
+
+        # Treinar o classificador local antes do lote, para que os primeiros projetos já o usem
+        if Config.LOCAL_CLASSIFIER and total:
+            get_local_classifier(
+                self.json_client, Config.LOCAL_CLASSIFIER_MIN_SAMPLES, Config.LOCAL_CLASSIFIER_RETRAIN_SECONDS
+            )
+
+        started_at = time.monotonic()
+        done = 0
+        failed = 0
+        tokens_used = 0
+        queue = iter(pending)
+        in_flight = {}
+
+        def report():
+            elapsed = max(time.monotonic() - started_at, 1e-6)
+            print(
+                f"{done}/{total} projetos ({failed} falhas) | "
+                f"{done / elapsed * 60:.1f} projetos/min | {tokens_used / elapsed * 60:.0f} tokens/min"
+            )
+
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='lote-ia')
+        try:
+            while True:
+                # Manter no máximo 2x workers projetos em andamento
+                while len(in_flight) < self.workers * 2:
+                    project_id = next(queue, None)
+                    if project_id is None:
+                        break
+                    in_flight[executor.submit(self._classify, project_id)] = project_id
+                if not in_flight:
+                    break
+
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    project_id = in_flight.pop(future)
+                    done += 1
+                    try:
+                        suggestion, tokens = future.result()
+                        tokens_used += tokens
+                        if 'error' in suggestion:
+                            failed += 1
+                            self._record(project_id, error=suggestion['error'])
+                        elif suggestion.get('provisoria'):
+                            # OpenAI indisponível: a sugestão local provisória fica salva, mas o
+                            # projeto continua pendente para ser refeito numa execução retomada
+                            failed += 1
+                            self._record(project_id, error='OpenAI indisponível; sugestão provisória do classificador local')
+                        else:
+                            self._record(project_id)
+                    except Exception as e:
+                        failed += 1
+                        self._record(project_id, error=str(e))
+                        print(f"Erro ao classificar o projeto {project_id}: {str(e)}")
+
+                    if done - failed:
+                        self._tokens_per_project = max(1, tokens_used // (done - failed))
+                    if done % self.report_every == 0:
+                        self.save_checkpoint()
+                        report()
+        except KeyboardInterrupt:
+            print("Interrompido; o checkpoint foi salvo e a execução pode ser retomada")
+            for future in in_flight:
+                future.cancel()
+            raise
+        finally:
+            executor.shutdown(wait=True)
+            self.save_checkpoint()
+
+        report()
+        elapsed = time.monotonic() - started_at
+        return {
+            'projetos': done,
+            'falhas': failed,
+            'tokens': tokens_used,
+            'tokens_em_cache': self.openai_client.get_usage()['cached_tokens'],
+            'segundos': round(elapsed, 1),
+            'projetos_por_minuto': round(done / max(elapsed, 1e-6) * 60, 1),
+            'tokens_por_minuto': round(tokens_used / max(elapsed, 1e-6) * 60)
+        }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Gera sugestões da IA para os projetos ainda não categorizados')
+    parser.add_argument('--workers', type=int, default=Config.AI_SUGGESTION_WORKERS, help='Projetos em paralelo')
+    parser.add_argument('--rpm', type=int, default=Config.AI_BATCH_RPM, help='Requisições por minuto (0 desativa)')
+    parser.add_argument('--tpm', type=int, default=Config.AI_BATCH_TPM, help='Tokens por minuto (0 desativa)')
+    parser.add_argument('--limit', type=int, default=None, help='Quantidade máxima de projetos nesta execução')
+    parser.add_argument('--checkpoint', default=Config.AI_BATCH_CHECKPOINT_PATH, help='Arquivo de checkpoint')
+    parser.add_argument('--reset', action='store_true', help='Ignora o checkpoint e recomeça do zero')
+    args = parser.parse_args()
+
+    api_key = Config.get_openai_api_key()
+    if not api_key:
+        raise SystemExit("Chave da API OpenAI não configurada")
+
+    if args.reset and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+    classifier = BatchClassifier(
+        api_key, workers=args.workers, rpm=args.rpm, tpm=args.tpm,
+        checkpoint_path=args.checkpoint, limit=args.limit
+    )
+    summary = classifier.run()
+    print(f"Classificação em lote concluída: {summary}")
@@ -0,0 +1,78 @@
+from app.project_store import normalize_project_id
+
+# Campo do formato antigo (categorias.json / aba categorias) -> campo no projeto
+LEGACY_FIELDS = {
+    'microarea': '_aia_n1_macroarea',
+    'segmento': '_aia_n2_segmento',
+    'dominio': '_aia_n3_dominio_afeito',
+    'dominio_outros': '_aia_n3_dominio_outro',
+    'tecnologias_habilitadoras': 'tecnologia_habilitadora',
+    'areas_aplicacao': 'area_aplicacao',
+    'observacoes': 'observacoes'
+}
+
+# Campos do projeto que indicam que ele foi categorizado
+CATEGORY_FIELDS = ('_aia_n1_macroarea', '_aia_n2_segmento', '_aia_n3_dominio_afeito', '_aia_n3_dominio_outro')
+
+# Campos de uma categorização que não são gravados no projeto
+IGNORED_FIELDS = ('id_projeto', 'validation_info')
+
+
+def is_categorized(project):
+    """
+    Verifica se o projeto tem categorização.
+
+    Args:
+        project: Dicionário do projeto
+
+    Returns:
+        bool: True se algum campo de categorização estiver preenchido
+    """
+    return any(project.get(field) for field in CATEGORY_FIELDS)
+
+
+def to_project_fields(category_data):
+    """
+    Converte uma categorização (nos campos do projeto ou no formato antigo) nos campos do projeto.
+
+    Args:
+        category_data: Dicionário da categorização
+
+    Returns:
+        dict: Campos a gravar no projeto
+    """
+    fields = {}
+    for key, value in category_data.items():
+        if key in IGNORED_FIELDS:
+            continue
+        fields[LEGACY_FIELDS.get(key, key)] = value
+    return fields
+
+
+def to_legacy(project):
+    """
+    Monta a categorização do projeto no formato antigo do categorias.json.
+
+    Args:
+        project: Dicionário do projeto
+
+    Returns:
+        dict: Categorização com id_projeto e os campos antigos
+    """
+    record = {'id_projeto': project.get('codigo_projeto')}
+    for legacy_field, project_field in LEGACY_FIELDS.items():
+        record[legacy_field] = project.get(project_field)
+    return record
+
+
+def categorized_ids(projects):
+    """
+    Obtém o conjunto de projetos categorizados.
+
+    Args:
+        projects: Lista de projetos
+
+    Returns:
+        set: Códigos normalizados dos projetos categorizados
+    """
+    return {normalize_project_id(project.get('codigo_projeto')) for project in projects if is_categorized(project)}
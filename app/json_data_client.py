@@ -2,6 +2,17 @@ import json
 import os
 from datetime import datetime
 import copy
+import threading
+from app.categorization import is_categorized, to_legacy, to_project_fields
+from app.project_store import get_project_store
+from app.log_store import get_log_store
+from app.suggestion_store import get_suggestion_store
+from app.taxonomy import get_taxonomy
+from app.write_committer import get_write_committer
+from config import Config
+
+# Evita que duas requisições migrem o categorias.json ao mesmo tempo
+_migration_lock = threading.Lock()
 
 class JsonDataClient:
     """
@@ -13,22 +24,66 @@ class JsonDataClient:
         """Inicializa o cliente de dados JSON."""
         self.data_dir = 'app/data'
         
-        # Garantir que os arquivos necessários existam
-        self._ensure_files_exist()
+        # Armazenamento de projetos compartilhado pelo processo (carregado uma única vez)
+        self.project_store = get_project_store(os.path.join(self.data_dir, 'all_projetos.json'))
+        
+        # Log de categorizações em segmentos JSONL (importa o logs.json antigo na primeira execução)
+        self.log_store = get_log_store(
+            os.path.join(self.data_dir, 'logs'),
+            legacy_path=os.path.join(self.data_dir, 'logs.json')
+        )
+        
+        # Sugestões da IA indexadas por project_id (snapshot + journal de acréscimos)
+        self.suggestion_store = get_suggestion_store(
+            os.path.join(self.data_dir, 'ai_suggestions.json'),
+            compact_every=Config.AI_SUGGESTIONS_COMPACT_EVERY,
+            keep_history=Config.AI_SUGGESTIONS_HISTORY,
+            fsync=Config.COMMIT_FSYNC
+        )
+        
+        # Agrupador de gravações: cada arquivo é gravado uma vez por lote de requisições
+        self.committer = get_write_committer(
+            self.data_dir,
+            window=Config.COMMIT_WINDOW_MS / 1000.0,
+            fsync=Config.COMMIT_FSYNC
+        )
+        self.committer.register('projetos', self.project_store.flush)
+        self.committer.register('logs', self.log_store.flush)
+        
+        # A categorização fica apenas no projeto; incorporar um categorias.json antigo, se existir
+        self._migrate_categorias()
     
-    def _ensure_files_exist(self):
-        """Garante que todos os arquivos JSON necessários existam."""
-        # Verificar e criar categorias.json se não existir
+    def _migrate_categorias(self):
+        """
+        Incorpora o categorias.json antigo aos projetos que ainda não têm categorização.
+        Executado uma única vez; o arquivo antigo é mantido e deixa de ser gravado.
+        """
         categorias_path = os.path.join(self.data_dir, 'categorias.json')
-        if not os.path.exists(categorias_path):
-            with open(categorias_path, 'w', encoding='utf-8') as f:
-                json.dump([], f, ensure_ascii=False, indent=2)
+        marker_path = os.path.join(self.data_dir, 'categorias.migrado')
+        if not os.path.exists(categorias_path) or os.path.exists(marker_path):
+            return
         
-        # Verificar e criar logs.json se não existir
-        logs_path = os.path.join(self.data_dir, 'logs.json')
-        if not os.path.exists(logs_path):
-            with open(logs_path, 'w', encoding='utf-8') as f:
-                json.dump([], f, ensure_ascii=False, indent=2)
+        with _migration_lock:
+            if os.path.exists(marker_path):
+                return
+            
+            with open(categorias_path, 'r', encoding='utf-8') as f:
+                categorias = json.load(f)
+            
+            def apply():
+                changed = False
+                for categoria in categorias:
+                    project = self.project_store.get(categoria.get('id_projeto'))
+                    if project is not None and not is_categorized(project):
+                        changed = self.project_store.apply_update(
+                            categoria.get('id_projeto'), to_project_fields(categoria)
+                        ) or changed
+                return changed, ['projetos'] if changed else []
+            
+            self.committer.submit(apply)
+            with open(marker_path, 'w', encoding='utf-8') as f:
+                f.write(datetime.now().isoformat())
+            print(f"categorias.json incorporado aos projetos ({len(categorias)} registros)")
     
     def get_excel_data(self, file_path, sheet_name):
         """
@@ -44,19 +99,16 @@ class JsonDataClient:
         """
         try:
             if sheet_name == 'projetos':
-                # Carregar dados de projetos do all_projetos.json
-                with open(os.path.join(self.data_dir, 'all_projetos.json'), 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                # Obter dados de projetos do armazenamento em memória
+                return self.project_store.get_all()
             
             elif sheet_name == 'categorias':
-                # Carregar dados de categorias do categorias.json
-                with open(os.path.join(self.data_dir, 'categorias.json'), 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                # Visão derivada dos projetos categorizados, no formato antigo do categorias.json
+                return [to_legacy(project) for project in self.project_store.get_all() if is_categorized(project)]
             
             elif sheet_name == 'logs':
-                # Carregar dados de logs do logs.json
-                with open(os.path.join(self.data_dir, 'logs.json'), 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                # Carregar todos os logs a partir dos segmentos JSONL
+                return list(self.log_store.iter_logs())
             
             elif sheet_name == 'categorias_lists':
                 # Gerar listas de categorias a partir do aia.json
@@ -68,6 +120,15 @@ class JsonDataClient:
         except Exception as e:
             raise Exception(f"Erro ao ler dados JSON: {str(e)}")
     
+    def get_taxonomy(self):
+        """
+        Obtém a taxonomia pré-calculada do aia.json (recalculada apenas quando o arquivo muda).
+        
+        Returns:
+            Taxonomy: Árvore de categorias, listas ordenadas e índices reversos
+        """
+        return get_taxonomy(os.path.join(self.data_dir, 'aia.json'))
+    
     def get_categories_lists(self):
         """
         Obtém as listas de categorias a partir do arquivo aia.json.
@@ -76,96 +137,7 @@ class JsonDataClient:
             list: Lista de dicionários com as opções de categorias
         """
         try:
-            # Carregar dados do aia.json
-            with open(os.path.join(self.data_dir, 'aia.json'), 'r', encoding='utf-8') as f:
-                aia_data = json.load(f)
-            
-            # Extrair valores únicos para cada categoria
-            microareas = list(set(item['Macroárea'] for item in aia_data))
-            segmentos = list(set(item['Segmento'] for item in aia_data))
-            
-            # Criar mapeamento de domínios por microárea e segmento
-            dominios_por_microarea_segmento = {}
-            for item in aia_data:
-                microarea = item['Macroárea']
-                segmento = item['Segmento']
-                
-                if 'Domínios Afeitos' in item:
-                    if microarea not in dominios_por_microarea_segmento:
-                        dominios_por_microarea_segmento[microarea] = {}
-                    
-                    if segmento not in dominios_por_microarea_segmento[microarea]:
-                        dominios_por_microarea_segmento[microarea][segmento] = []
-                    
-                    domains = item['Domínios Afeitos'].split(';')
-                    for domain in domains:
-                        domain = domain.strip()
-                        if domain and domain not in dominios_por_microarea_segmento[microarea][segmento]:
-                            dominios_por_microarea_segmento[microarea][segmento].append(domain)
-            
-            # Extrair lista plana de todos os domínios para compatibilidade
-            dominios = []
-            for microarea_data in dominios_por_microarea_segmento.values():
-                for segmento_dominios in microarea_data.values():
-                    for dominio in segmento_dominios:
-                        if dominio not in dominios:
-                            dominios.append(dominio)
-            
-            # Criar lista de dicionários no formato esperado pelo sistema
-            result = []
-            
-            # Determinar o tamanho máximo das listas
-            max_length = max(len(microareas), len(segmentos), len(dominios))
-            
-            # Preencher com valores vazios para tecnologias_habilitadoras e areas_aplicacao
-            # (estas categorias não estão no aia.json)
-            tecnologias = ["Inteligência Artificial", "Internet das Coisas", "Blockchain", 
-                          "Computação em Nuvem", "Big Data", "Robótica", "Biotecnologia"]
-            areas = ["Saúde", "Agricultura", "Indústria", "Energia", "Transporte", 
-                    "Finanças", "Educação", "Segurança"]
-            
-            # Criar a lista de dicionários
-            for i in range(max_length):
-                item = {}
-                
-                # Adicionar microarea se disponível
-                if i < len(microareas):
-                    item['microarea'] = microareas[i]
-                else:
-                    item['microarea'] = None
-                
-                # Adicionar segmento se disponível
-                if i < len(segmentos):
-                    item['segmento'] = segmentos[i]
-                else:
-                    item['segmento'] = None
-                
-                # Adicionar dominio se disponível
-                if i < len(dominios):
-                    item['dominio'] = dominios[i]
-                else:
-                    item['dominio'] = None
-                
-                # Adicionar tecnologia habilitadora se disponível
-                if i < len(tecnologias):
-                    item['tecnologias_habilitadoras'] = tecnologias[i]
-                else:
-                    item['tecnologias_habilitadoras'] = None
-                
-                # Adicionar área de aplicação se disponível
-                if i < len(areas):
-                    item['areas_aplicacao'] = areas[i]
-                else:
-                    item['areas_aplicacao'] = None
-                
-                result.append(item)
-            
-            # Adicionar o mapeamento de domínios por microárea e segmento
-            result.append({
-                'dominios_por_microarea_segmento': dominios_por_microarea_segmento
-            })
-            
-            return result
+            return self.get_taxonomy().legacy_rows()
             
         except Exception as e:
             raise Exception(f"Erro ao gerar listas de categorias: {str(e)}")
@@ -185,53 +157,37 @@ class JsonDataClient:
             bool: True se a atualização for bem-sucedida
         """
         try:
-            if sheet_name == 'categorias':
-                # Atualizar dados de categorias no categorias.json
-                json_path = os.path.join(self.data_dir, 'categorias.json')
-                
-                # Carregar dados existentes
-                with open(json_path, 'r', encoding='utf-8') as f:
-                    existing_data = json.load(f)
-                
+            if sheet_name == 'projetos':
+                # Substituir todos os projetos (usado pela sincronização)
+                if isinstance(data, list):
+                    self.project_store.replace_all(data)
+            
+            elif sheet_name == 'categorias':
+                # As categorizações são gravadas nos próprios projetos
                 if isinstance(data, dict) and id_column is not None:
-                    # Atualizar um registro específico
-                    found = False
-                    for i, item in enumerate(existing_data):
-                        if str(item.get(id_column)) == str(data.get(id_column)):
-                            existing_data[i] = data
-                            found = True
-                            break
-                    
-                    # Se não encontrou, adicionar novo registro
-                    if not found:
-                        existing_data.append(data)
-                
+                    records = [data]
                 elif isinstance(data, list):
-                    # Substituir todos os dados
-                    existing_data = data
+                    records = data
+                else:
+                    records = []
+                
+                def apply():
+                    changed = False
+                    for record in records:
+                        changed = self.project_store.apply_update(
+                            record.get(id_column or 'id_projeto'), to_project_fields(record)
+                        ) or changed
+                    return changed, ['projetos'] if changed else []
                 
-                # Salvar dados atualizados
-                with open(json_path, 'w', encoding='utf-8') as f:
-                    json.dump(existing_data, f, ensure_ascii=False, indent=2)
+                self.committer.submit(apply)
             
             elif sheet_name == 'logs':
-                # Atualizar dados de logs no logs.json
-                json_path = os.path.join(self.data_dir, 'logs.json')
-                
-                # Carregar dados existentes
-                with open(json_path, 'r', encoding='utf-8') as f:
-                    existing_data = json.load(f)
-                
                 if isinstance(data, list):
-                    # Substituir ou adicionar dados
-                    existing_data = data
+                    # Substituir todo o histórico
+                    self.log_store.replace_all(data)
                 else:
-                    # Adicionar um único registro
-                    existing_data.append(data)
-                
-                # Salvar dados atualizados
-                with open(json_path, 'w', encoding='utf-8') as f:
-                    json.dump(existing_data, f, ensure_ascii=False, indent=2)
+                    # Acrescentar um único registro
+                    self.append_log(data)
             
             elif sheet_name == 'categorias_lists':
                 # Esta operação não é suportada diretamente, pois as listas são geradas do aia.json
@@ -246,6 +202,75 @@ class JsonDataClient:
         except Exception as e:
             raise Exception(f"Erro ao atualizar dados JSON: {str(e)}")
     
+    def data_version(self):
+        """
+        Obtém a versão atual dos projetos (e de suas categorizações), usada para invalidar índices derivados.
+        
+        Returns:
+            int: Versão do all_projetos.json
+        """
+        return self.project_store.current_version()
+    
+    def project_changes_since(self, version):
+        """
+        Obtém os projetos alterados desde uma versão, para atualização incremental de índices.
+        
+        Args:
+            version: Versão observada anteriormente (None se nunca observada)
+            
+        Returns:
+            tuple: (versão atual, conjunto de códigos alterados ou None para reprocessar tudo)
+        """
+        return self.project_store.changes_since(-1 if version is None else version)
+    
+    def append_log(self, log_data):
+        """
+        Acrescenta um registro ao log de categorizações.
+        
+        Args:
+            log_data: Dicionário com os dados do log (sem o campo id)
+            
+        Returns:
+            dict: Registro gravado, com o ID atribuído
+        """
+        def apply():
+            return self.log_store.stage(log_data), ['logs']
+        
+        return self.committer.submit(apply)
+    
+    def iter_logs(self):
+        """
+        Itera preguiçosamente sobre os logs de categorização, do mais antigo ao mais recente.
+        
+        Returns:
+            iterator: Registros de log
+        """
+        return self.log_store.iter_logs()
+    
+    def get_project_logs(self, project_id):
+        """
+        Obtém os logs de categorização de um projeto pelo índice por projeto.
+        
+        Args:
+            project_id: ID ou código do projeto
+            
+        Returns:
+            list: Registros do projeto em ordem crescente de ID
+        """
+        return self.log_store.get_by_project(project_id)
+    
+    def tail_logs(self, limit):
+        """
+        Obtém os últimos registros do log de categorizações.
+        
+        Args:
+            limit: Quantidade máxima de registros
+            
+        Returns:
+            list: Registros em ordem crescente de ID
+        """
+        return self.log_store.tail(limit)
+    
     def get_project_by_id(self, excel_path, project_id):
         """
         Obtém um projeto específico pelo ID.
@@ -258,16 +283,8 @@ class JsonDataClient:
             dict: Dados do projeto ou None se não encontrado
         """
         try:
-            # Carregar todos os projetos
-            with open(os.path.join(self.data_dir, 'all_projetos.json'), 'r', encoding='utf-8') as f:
-                projects = json.load(f)
-            
-            # Buscar o projeto pelo código do projeto
-            for project in projects:
-                if str(project.get('codigo_projeto')) == str(project_id):
-                    return project
-            
-            return None
+            # Buscar o projeto pelo código no índice em memória
+            return self.project_store.get(project_id)
             
         except Exception as e:
             raise Exception(f"Erro ao buscar projeto: {str(e)}")
@@ -284,38 +301,10 @@ class JsonDataClient:
             dict: Dados da categorização ou None se não encontrada
         """
         try:
-            # Primeiro, verificar se há categorização no all_projetos.json
             project = self.get_project_by_id(None, project_id)
-            
-            if project and (project.get('_aia_n1_macroarea') or project.get('_aia_n2_segmento') or 
-                           project.get('_aia_n3_dominio_afeito') or project.get('_aia_n3_dominio_outro')):
-                # Obter domínios separadamente
-                dominio_afeito = project.get('_aia_n3_dominio_afeito')
-                dominio_outro = project.get('_aia_n3_dominio_outro')
-                
+            if project and is_categorized(project):
                 # Converter para o formato esperado pelo template
-                return {
-                    'id_projeto': project_id,
-                    'microarea': project.get('_aia_n1_macroarea'),
-                    'segmento': project.get('_aia_n2_segmento'),
-                    'dominio': dominio_afeito,
-                    'dominio_outros': dominio_outro,
-                    'tecnologias_habilitadoras': project.get('tecnologia_habilitadora'),
-                    'areas_aplicacao': project.get('area_aplicacao'),
-                    'observacoes': project.get('observacoes')
-                }
-            
-            # Se não encontrou no all_projetos.json, buscar no categorias.json (para compatibilidade)
-            try:
-                with open(os.path.join(self.data_dir, 'categorias.json'), 'r', encoding='utf-8') as f:
-                    categories = json.load(f)
-                
-                # Buscar a categorização pelo código do projeto
-                for category in categories:
-                    if str(category.get('id_projeto')) == str(project_id):
-                        return category
-            except Exception as e:
-                print(f"Aviso: Erro ao buscar categorização em categorias.json: {str(e)}")
+                return to_legacy(project)
             
             return None
             
@@ -330,14 +319,7 @@ class JsonDataClient:
             list: Lista de dicionários com as sugestões da IA
         """
         try:
-            suggestions_path = os.path.join(self.data_dir, 'ai_suggestions.json')
-            if not os.path.exists(suggestions_path):
-                with open(suggestions_path, 'w', encoding='utf-8') as f:
-                    json.dump([], f, ensure_ascii=False, indent=2)
-                return []
-                
-            with open(suggestions_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return self.suggestion_store.get_all()
         except Exception as e:
             print(f"Erro ao ler sugestões da IA: {str(e)}")
             return []
@@ -352,11 +334,19 @@ class JsonDataClient:
         Returns:
             dict: Dados da sugestão da IA ou None se não encontrada
         """
-        suggestions = self.get_ai_suggestions()
-        for suggestion in suggestions:
-            if str(suggestion.get('project_id')) == str(project_id):
-                return suggestion
-        return None
+        return self.suggestion_store.get(project_id)
+    
+    def get_ai_suggestion_history(self, project_id):
+        """
+        Obtém as sugestões anteriores da IA para um projeto (com AI_SUGGESTIONS_HISTORY ativo).
+        
+        Args:
+            project_id: ID ou código do projeto
+            
+        Returns:
+            list: Sugestões substituídas, da mais antiga para a mais recente
+        """
+        return self.suggestion_store.get_history(project_id)
     
     def save_ai_suggestion(self, suggestion):
         """
@@ -368,23 +358,8 @@ class JsonDataClient:
         Returns:
             bool: True se a operação for bem-sucedida
         """
-        suggestions = self.get_ai_suggestions()
-        
-        # Verificar se já existe sugestão para este projeto
-        for i, existing in enumerate(suggestions):
-            if str(existing.get('project_id')) == str(suggestion.get('project_id')):
-                # Atualizar sugestão existente
-                suggestions[i] = suggestion
-                break
-        else:
-            # Adicionar nova sugestão
-            suggestions.append(suggestion)
-        
-        # Salvar no arquivo
-        suggestions_path = os.path.join(self.data_dir, 'ai_suggestions.json')
-        with open(suggestions_path, 'w', encoding='utf-8') as f:
-            json.dump(suggestions, f, ensure_ascii=False, indent=2)
-        
+        # Acrescenta uma linha ao journal em vez de regravar todo o arquivo
+        self.suggestion_store.put(suggestion)
         return True
     
     def update_project_data(self, project_id, category_data):
@@ -399,34 +374,40 @@ class JsonDataClient:
             bool: True se a atualização for bem-sucedida
         """
         try:
-            # Carregar todos os projetos
-            json_path = os.path.join(self.data_dir, 'all_projetos.json')
-            with open(json_path, 'r', encoding='utf-8') as f:
-                projects = json.load(f)
-            
-            # Buscar o projeto pelo código
-            found = False
-            for project in projects:
-                if str(project.get('codigo_projeto')) == str(project_id):
-                    # Atualizar os campos de categorização usando as chaves exatas do dicionário
-                    # Isso permite que o método seja mais flexível quanto aos nomes dos campos
-                    for key, value in category_data.items():
-                        # Ignorar o campo id_projeto que é apenas para referência
-                        # E também ignorar o campo validation_info
-                        if key != 'id_projeto' and key != 'validation_info':
-                            project[key] = value
-                    
-                    found = True
-                    break
-            
-            if not found:
-                return False
-            
-            # Salvar dados atualizados
-            with open(json_path, 'w', encoding='utf-8') as f:
-                json.dump(projects, f, ensure_ascii=False, indent=2)
+            # Ignorar os campos id_projeto (apenas referência) e validation_info
+            fields = to_project_fields(category_data)
             
-            return True
+            # Atualizar o projeto em memória; o all_projetos.json é gravado no próximo lote
+            def apply():
+                found = self.project_store.apply_update(project_id, fields)
+                return found, ['projetos'] if found else []
+            
+            return self.committer.submit(apply)
             
         except Exception as e:
             raise Exception(f"Erro ao atualizar dados do projeto: {str(e)}")
+    
+    def save_categorization(self, project_id, category_data, log_data):
+        """
+        Salva uma categorização (campos do projeto e log) como uma única mutação,
+        gravada no mesmo lote das demais requisições concorrentes.
+        
+        Args:
+            project_id: ID ou código do projeto
+            category_data: Campos de categorização a gravar no projeto
+            log_data: Registro de log (sem o campo id)
+            
+        Returns:
+            dict: Registro de log gravado, ou None se o projeto não foi encontrado
+        """
+        fields = to_project_fields(category_data)
+        
+        def apply():
+            if not self.project_store.apply_update(project_id, fields):
+                return None, []
+            return self.log_store.stage(log_data), ['projetos', 'logs']
+        
+        try:
+            return self.committer.submit(apply)
+        except Exception as e:
+            raise Exception(f"Erro ao salvar categorização: {str(e)}")
@@ -0,0 +1,442 @@
+import argparse
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from app.taxonomy_ranker import PROJECT_FIELDS, stems
+
+# Fração da probabilidade do melhor domínio a partir da qual outros domínios também
+# são sugeridos, e a quantidade máxima de domínios sugeridos
+DOMAIN_SHARE = 0.5
+MAX_DOMAINS = 3
+
+
+def confidence_label(probability):
+    """
+    Converte a probabilidade calibrada no nível de confiança usado nas sugestões.
+
+    Args:
+        probability: Probabilidade da macroárea/segmento sugeridos
+
+    Returns:
+        str: ALTA, MÉDIA ou BAIXA
+    """
+    if probability >= 0.8:
+        return 'ALTA'
+    if probability >= 0.5:
+        return 'MÉDIA'
+    return 'BAIXA'
+
+
+def split_values(value):
+    """Converte 'A;B' em ['A', 'B'], ignorando vazios e N/A."""
+    values = [item.strip() for item in str(value or '').split(';')]
+    return [item for item in values if item and item.lower() != 'n/a']
+
+
+class SparseDocuments:
+    """
+    Documentos TF-IDF em formato esparso (linha, coluna, valor), para treinar
+    sem montar a matriz densa projetos x vocabulário.
+    """
+
+    def __init__(self, rows, cols, values, count):
+        self.rows = rows
+        self.cols = cols
+        self.values = values
+        self.count = count
+        # Início de cada documento nos arrays (as linhas estão em ordem)
+        self.offsets = np.searchsorted(rows, np.arange(count + 1))
+
+    def document(self, i):
+        """Retorna (colunas, valores) do documento i."""
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.cols[start:end], self.values[start:end]
+
+    def subset(self, indices):
+        """Retorna os documentos indicados, renumerados na ordem de indices."""
+        rows, cols, values = [], [], []
+        for new_row, i in enumerate(indices):
+            doc_cols, doc_values = self.document(i)
+            rows.append(np.full(len(doc_cols), new_row))
+            cols.append(doc_cols)
+            values.append(doc_values)
+        if not rows:
+            return SparseDocuments(np.zeros(0, int), np.zeros(0, int), np.zeros(0), 0)
+        return SparseDocuments(np.concatenate(rows), np.concatenate(cols), np.concatenate(values), len(indices))
+
+
+class MultinomialNB:
+    """Naive Bayes multinomial sobre pesos TF-IDF, com rótulos possivelmente múltiplos."""
+
+    def __init__(self, n_classes, n_features, alpha=0.1):
+        self.n_classes = n_classes
+        self.n_features = n_features
+        self.alpha = alpha
+
+    def fit(self, documents, labels):
+        """
+        Treina o modelo.
+
+        Args:
+            documents: SparseDocuments
+            labels: Lista (por documento) de listas de índices de classe
+        """
+        feature_counts = np.zeros((self.n_classes, self.n_features))
+        class_counts = np.zeros(self.n_classes)
+        for i, classes in enumerate(labels):
+            if not classes:
+                continue
+            cols, values = documents.document(i)
+            weight = 1.0 / len(classes)
+            for c in classes:
+                np.add.at(feature_counts[c], cols, values * weight)
+                class_counts[c] += weight
+
+        smoothed = feature_counts + self.alpha
+        self.feature_log_prob = np.log(smoothed) - np.log(smoothed.sum(axis=1, keepdims=True))
+        self.class_log_prior = np.log((class_counts + self.alpha) / (class_counts + self.alpha).sum())
+        return self
+
+    def joint_log_likelihood(self, cols, values):
+        """Log-verossimilhança conjunta (não normalizada) de um documento para cada classe."""
+        return self.class_log_prior + self.feature_log_prob[:, cols] @ values
+
+
+def softmax(scores, temperature=1.0, mask=None):
+    """Probabilidades a partir de log-verossimilhanças, com temperatura e classes permitidas."""
+    scores = np.asarray(scores, dtype=float) / temperature
+    if mask is not None:
+        scores = np.where(mask, scores, -np.inf)
+    scores = scores - scores.max()
+    exp = np.exp(scores)
+    return exp / exp.sum()
+
+
+class LocalClassifier:
+    """
+    Classificador local treinado com as categorizações já validadas nos
+    projetos: Naive Bayes multinomial sobre TF-IDF para macroárea/segmento,
+    domínios afeitos e domínios afeitos outros. A probabilidade do segmento é
+    calibrada por temperatura, ajustada em validação cruzada.
+    """
+
+    def __init__(self, taxonomy, folds=5):
+        """
+        Inicializa o classificador.
+
+        Args:
+            taxonomy: Taxonomy do aia.json (segmentos e domínios válidos)
+            folds: Partições da validação cruzada usada na calibração
+        """
+        self.taxonomy = taxonomy
+        self.folds = folds
+        self.vocabulary = {}
+        self.idf = None
+        self.temperature = 1.0
+        self.metrics = {}
+        self.samples = 0
+
+    def _terms(self, project):
+        """Frequência ponderada dos radicais dos campos de texto do projeto."""
+        frequencies = {}
+        for field, weight in PROJECT_FIELDS.items():
+            for term in stems(project.get(field)):
+                frequencies[term] = frequencies.get(term, 0) + weight
+        return frequencies
+
+    def _vector(self, frequencies):
+        """Vetor TF-IDF normalizado (colunas, valores) a partir das frequências."""
+        known = [(self.vocabulary[t], f) for t, f in frequencies.items() if t in self.vocabulary]
+        if not known:
+            return np.zeros(0, int), np.zeros(0)
+        cols = np.array([c for c, _ in known])
+        values = (1 + np.log([f for _, f in known])) * self.idf[cols]
+        return cols, values / np.linalg.norm(values)
+
+    def _vectorize_all(self, term_lists):
+        """Monta os documentos esparsos de todos os projetos de treino."""
+        rows, cols, values = [], [], []
+        for row, frequencies in enumerate(term_lists):
+            doc_cols, doc_values = self._vector(frequencies)
+            rows.append(np.full(len(doc_cols), row))
+            cols.append(doc_cols)
+            values.append(doc_values)
+        return SparseDocuments(np.concatenate(rows), np.concatenate(cols), np.concatenate(values), len(term_lists))
+
+    def fit(self, projects, min_df=2):
+        """
+        Treina os modelos com os projetos categorizados.
+
+        Args:
+            projects: Lista de projetos (os sem macroárea/segmento válidos são ignorados)
+            min_df: Quantidade mínima de projetos em que um termo aparece
+
+        Returns:
+            LocalClassifier: O próprio classificador
+        """
+        tree = self.taxonomy.tree
+        examples = [
+            p for p in projects
+            if p.get('_aia_n2_segmento') in tree.get(p.get('_aia_n1_macroarea'), {})
+        ]
+        self.samples = len(examples)
+
+        # Classes: segmentos da taxonomia e todos os domínios (mais N/A para os domínios outros)
+        self.segments = [(m, s) for m, segments in tree.items() for s in segments]
+        self.segment_index = {segment: i for i, segment in enumerate(self.segments)}
+        self.domains = list(self.taxonomy.segment_by_domain) + ['N/A']
+        self.domain_index = {domain: i for i, domain in enumerate(self.domains)}
+
+        term_lists = [self._terms(p) for p in examples]
+        document_frequency = {}
+        for frequencies in term_lists:
+            for term in frequencies:
+                document_frequency[term] = document_frequency.get(term, 0) + 1
+        terms = [t for t, df in document_frequency.items() if df >= min_df]
+        self.vocabulary = {term: i for i, term in enumerate(terms)}
+        df = np.array([document_frequency[t] for t in terms], dtype=float)
+        self.idf = np.log((1 + len(examples)) / (1 + df)) + 1
+
+        if not examples or not terms:
+            self.segment_model = None
+            return self
+
+        documents = self._vectorize_all(term_lists)
+        segment_labels = [[self.segment_index[(p['_aia_n1_macroarea'], p['_aia_n2_segmento'])]] for p in examples]
+        domain_labels = [
+            [self.domain_index[d] for d in split_values(p.get('_aia_n3_dominio_afeito')) if d in self.domain_index]
+            for p in examples
+        ]
+        other_labels = [
+            [self.domain_index[d] for d in split_values(p.get('_aia_n3_dominio_outro')) if d in self.domain_index]
+            or [self.domain_index['N/A']]
+            for p in examples
+        ]
+
+        self._calibrate(documents, segment_labels)
+
+        n_features = len(self.vocabulary)
+        self.segment_model = MultinomialNB(len(self.segments), n_features).fit(documents, segment_labels)
+        self.domain_model = MultinomialNB(len(self.domains), n_features).fit(documents, domain_labels)
+        self.other_model = MultinomialNB(len(self.domains), n_features).fit(documents, other_labels)
+        return self
+
+    def _calibrate(self, documents, segment_labels):
+        """
+        Ajusta a temperatura que torna as probabilidades do segmento calibradas,
+        minimizando a log-verossimilhança negativa das previsões fora da partição.
+        """
+        n = documents.count
+        folds = min(self.folds, n)
+        if folds < 2:
+            return
+
+        order = np.random.default_rng(0).permutation(n)
+        scores = np.zeros((n, len(self.segments)))
+        for k in range(folds):
+            test = order[k::folds]
+            train = np.setdiff1d(order, test)
+            model = MultinomialNB(len(self.segments), len(self.vocabulary)).fit(
+                documents.subset(train), [segment_labels[i] for i in train]
+            )
+            for i in test:
+                scores[i] = model.joint_log_likelihood(*documents.document(i))
+
+        truth = np.array([labels[0] for labels in segment_labels])
+        best = None
+        for temperature in np.geomspace(0.05, 200, 60):
+            scaled = scores / temperature
+            scaled -= scaled.max(axis=1, keepdims=True)
+            log_probs = scaled - np.log(np.exp(scaled).sum(axis=1, keepdims=True))
+            loss = -log_probs[np.arange(n), truth].mean()
+            if best is None or loss < best[0]:
+                best = (loss, temperature, np.exp(log_probs))
+        _, self.temperature, probabilities = best
+
+        predicted = probabilities.argmax(axis=1)
+        confidence = probabilities.max(axis=1)
+        self.metrics = {
+            'amostras': int(n),
+            'acuracia_validacao': round(float((predicted == truth).mean()), 3),
+            'temperatura': round(float(self.temperature), 3),
+            'confianca_validacao': confidence,
+            'acerto_validacao': predicted == truth
+        }
+
+    @property
+    def ready(self):
+        """True se há um modelo treinado."""
+        return getattr(self, 'segment_model', None) is not None
+
+    def coverage(self, min_confidence):
+        """
+        Resultado da validação cruzada para um limite de confiança.
+
+        Args:
+            min_confidence: Probabilidade mínima para aceitar a sugestão local
+
+        Returns:
+            dict: Fração de projetos resolvidos localmente e a acurácia entre eles
+        """
+        if 'confianca_validacao' not in self.metrics:
+            return {'cobertura': 0.0, 'acuracia': None}
+        accepted = self.metrics['confianca_validacao'] >= min_confidence
+        return {
+            'cobertura': round(float(accepted.mean()), 3),
+            'acuracia': round(float(self.metrics['acerto_validacao'][accepted].mean()), 3) if accepted.any() else None
+        }
+
+    def _pick_domains(self, model, cols, values, allowed):
+        """Domínios com probabilidade próxima da melhor entre os permitidos."""
+        mask = np.zeros(len(self.domains), bool)
+        mask[[self.domain_index[d] for d in allowed if d in self.domain_index]] = True
+        if not mask.any():
+            return []
+        probabilities = softmax(model.joint_log_likelihood(cols, values), self.temperature, mask)
+        best = probabilities.max()
+        ranked = np.argsort(-probabilities)
+        return [self.domains[i] for i in ranked if mask[i] and probabilities[i] >= best * DOMAIN_SHARE][:MAX_DOMAINS]
+
+    def predict(self, project):
+        """
+        Sugere a categorização de um projeto.
+
+        Args:
+            project: Dicionário do projeto
+
+        Returns:
+            dict: Sugestão no formato das sugestões da IA, com 'probabilidade'
+                  calibrada; None se o modelo não estiver treinado ou o texto
+                  não tiver termos conhecidos
+        """
+        if not self.ready:
+            return None
+        cols, values = self._vector(self._terms(project))
+        if not len(cols):
+            return None
+
+        probabilities = softmax(self.segment_model.joint_log_likelihood(cols, values), self.temperature)
+        best = int(probabilities.argmax())
+        macroarea, segmento = self.segments[best]
+        probability = float(probabilities[best])
+
+        dominios = self._pick_domains(self.domain_model, cols, values, self.taxonomy.domains_of(macroarea, segmento))
+        outros_permitidos = [
+            d for s in self.taxonomy.segments_of(macroarea) if s != segmento
+            for d in self.taxonomy.domains_of(macroarea, s)
+        ]
+        outros = self._pick_domains(self.other_model, cols, values, outros_permitidos + ['N/A'])
+        outros = [d for d in outros if d != 'N/A'] if outros and outros[0] != 'N/A' else []
+
+        return {
+            '_aia_n1_macroarea': macroarea,
+            '_aia_n2_segmento': segmento,
+            '_aia_n3_dominio_afeito': ';'.join(dominios),
+            '_aia_n3_dominio_outro': ';'.join(outros) if outros else 'N/A',
+            'confianca': confidence_label(probability),
+            'justificativa': (
+                f"Sugestão do classificador local, treinado com {self.samples} projetos categorizados "
+                f"(probabilidade {probability:.0%})."
+            ),
+            'probabilidade': round(probability, 3),
+            'origem': 'classificador_local',
+            'timestamp': datetime.now().isoformat()
+        }
+
+
+_classifier = None
+_trained_at = None
+_trained_version = None
+_training = None
+_failed_at = None
+_classifier_lock = threading.Lock()
+
+
+def _train(json_client, taxonomy, version):
+    """Treina um novo classificador e o publica no lugar do anterior."""
+    global _classifier, _trained_at, _trained_version, _failed_at
+    started_at = time.time()
+    classifier = LocalClassifier(taxonomy).fit(json_client.get_excel_data(None, 'projetos'))
+    with _classifier_lock:
+        _classifier = classifier
+        _trained_at = time.time()
+        _trained_version = version
+        _failed_at = None
+    print(
+        f"Classificador local treinado com {classifier.samples} projetos em "
+        f"{_trained_at - started_at:.2f}s (acurácia na validação: {classifier.metrics.get('acuracia_validacao')})"
+    )
+
+
+def _train_in_background(json_client, taxonomy, version):
+    """Treino agendado por get_local_classifier; libera um novo agendamento ao terminar."""
+    global _training, _failed_at
+    try:
+        _train(json_client, taxonomy, version)
+    except Exception as e:
+        print(f"Erro ao treinar o classificador local: {str(e)}")
+        # Esperar retrain_after antes de tentar de novo, em vez de retreinar a cada chamada
+        with _classifier_lock:
+            _failed_at = time.time()
+    finally:
+        with _classifier_lock:
+            _training = None
+
+
+def get_local_classifier(json_client, min_samples=50, retrain_after=600, executor=None):
+    """
+    Obtém o classificador local compartilhado pelo processo, retreinando-o
+    quando os projetos mudaram e o treino anterior tem mais de retrain_after segundos.
+    Com executor, o treino roda em segundo plano e o modelo anterior continua
+    em uso até o novo ficar pronto; sem executor, o treino é feito na chamada.
+
+    Args:
+        json_client: Cliente de dados
+        min_samples: Quantidade mínima de projetos categorizados para usar o modelo
+        retrain_after: Intervalo mínimo (segundos) entre dois treinos
+        executor: Executor para o treino em segundo plano (ex.: o da SuggestionJobs)
+
+    Returns:
+        LocalClassifier: Classificador treinado, ou None se não houver dados
+                         suficientes ou o primeiro treino ainda não terminou
+    """
+    global _training
+    with _classifier_lock:
+        version = json_client.data_version()
+        taxonomy = json_client.get_taxonomy()
+        stale = (
+            _classifier is None
+            or _classifier.taxonomy is not taxonomy
+            or (version != _trained_version and time.time() - _trained_at > retrain_after)
+        )
+        # Após um treino com erro, a próxima tentativa espera retrain_after segundos
+        retry = _failed_at is None or time.time() - _failed_at > retrain_after
+        if stale and executor is not None and _training is None and retry:
+            _training = executor.submit(_train_in_background, json_client, taxonomy, version)
+
+    if stale and executor is None:
+        _train(json_client, taxonomy, version)
+
+    classifier = _classifier
+    if classifier is None or not classifier.ready or classifier.samples < min_samples:
+        return None
+    return classifier
+
+
+if __name__ == '__main__':
+    from app.storage import create_data_client
+    from config import Config
+
+    parser = argparse.ArgumentParser(description='Treina e avalia o classificador local com as categorizações existentes')
+    parser.add_argument('--min-confidence', type=float, default=Config.LOCAL_CLASSIFIER_MIN_CONFIDENCE,
+                        help='Probabilidade mínima para aceitar a sugestão local')
+    args = parser.parse_args()
+
+    json_client = create_data_client()
+    classifier = LocalClassifier(json_client.get_taxonomy()).fit(json_client.get_excel_data(None, 'projetos'))
+    metrics = {k: v for k, v in classifier.metrics.items() if k in ('amostras', 'acuracia_validacao', 'temperatura')}
+    print(f"Validação cruzada: {metrics}")
+    print(f"Com confiança >= {args.min_confidence}: {classifier.coverage(args.min_confidence)}")
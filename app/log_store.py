@@ -0,0 +1,331 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import deque
+
+from app.project_store import normalize_project_id
+
+
+class LogStore:
+    """
+    Log de categorizações somente de acréscimo, em segmentos JSONL.
+    Cada evento é gravado como uma linha no segmento atual e recebe um ID
+    monotônico de um contador persistido, sem reler o histórico.
+    """
+
+    SEGMENT_PREFIX = 'logs-'
+    SEGMENT_SUFFIX = '.jsonl'
+    COUNTER_FILE = 'counter.json'
+
+    def __init__(self, log_dir, legacy_path=None, segment_size=5000):
+        """
+        Inicializa o armazenamento de logs.
+
+        Args:
+            log_dir: Pasta onde ficam os segmentos e o contador
+            legacy_path: Caminho do logs.json antigo, importado na primeira execução
+            segment_size: Quantidade máxima de registros por segmento
+        """
+        self.log_dir = log_dir
+        self.legacy_path = legacy_path
+        self.segment_size = segment_size
+        self._lock = threading.RLock()
+        self._state = None
+        self._staged = []
+        self._by_project = None
+
+    def _segment_path(self, number):
+        return os.path.join(self.log_dir, f'{self.SEGMENT_PREFIX}{number:06d}{self.SEGMENT_SUFFIX}')
+
+    def _segment_numbers(self):
+        """Lista os números dos segmentos existentes, em ordem crescente."""
+        numbers = []
+        for name in os.listdir(self.log_dir):
+            if name.startswith(self.SEGMENT_PREFIX) and name.endswith(self.SEGMENT_SUFFIX):
+                number = name[len(self.SEGMENT_PREFIX):-len(self.SEGMENT_SUFFIX)]
+                if number.isdigit():
+                    numbers.append(int(number))
+        return sorted(numbers)
+
+    @staticmethod
+    def _read_segment(path):
+        """Lê os registros de um segmento, ignorando uma última linha truncada."""
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # Gravação interrompida no meio da linha
+                    continue
+
+    def _save_counter(self):
+        """Grava o contador de forma atômica."""
+        counter_path = os.path.join(self.log_dir, self.COUNTER_FILE)
+        tmp_path = counter_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._state, f)
+        os.replace(tmp_path, counter_path)
+
+    def _load_state(self):
+        """Carrega (ou reconstrói) o contador e o segmento atual."""
+        if self._state is not None:
+            return
+
+        if not os.path.isdir(self.log_dir):
+            os.makedirs(self.log_dir, exist_ok=True)
+            self._state = {'next_id': 1, 'segment': 1, 'segment_count': 0}
+            if self.legacy_path and os.path.exists(self.legacy_path):
+                with open(self.legacy_path, 'r', encoding='utf-8') as f:
+                    legacy_logs = json.load(f)
+                self._write_all(legacy_logs)
+            self._save_counter()
+            return
+
+        state = {'next_id': 1, 'segment': 1, 'segment_count': 0}
+        counter_path = os.path.join(self.log_dir, self.COUNTER_FILE)
+        if os.path.exists(counter_path):
+            with open(counter_path, 'r', encoding='utf-8') as f:
+                state.update(json.load(f))
+
+        # Conferir o último segmento: protege contra queda entre a gravação da linha e a do contador
+        numbers = self._segment_numbers()
+        if numbers:
+            last_segment = numbers[-1]
+            self._trim_partial_line(self._segment_path(last_segment))
+            last_records = list(self._read_segment(self._segment_path(last_segment)))
+            ids = [record.get('id') for record in last_records if isinstance(record.get('id'), int)]
+            state['segment'] = last_segment
+            state['segment_count'] = len(last_records)
+            if ids:
+                state['next_id'] = max(state['next_id'], max(ids) + 1)
+
+        self._state = state
+        self._save_counter()
+
+    @staticmethod
+    def _trim_partial_line(path):
+        """Remove uma última linha incompleta deixada por uma gravação interrompida."""
+        with open(path, 'rb+') as f:
+            content = f.read()
+            if content and not content.endswith(b'\n'):
+                f.truncate(content.rfind(b'\n') + 1)
+
+    def _write_all(self, logs):
+        """
+        Regrava todos os segmentos a partir de uma lista de registros.
+        Os novos segmentos são gravados primeiro numa pasta temporária e só
+        então trocados pelos atuais com os.replace, de modo que uma falha na
+        gravação não apaga o histórico existente.
+        """
+        tmp_dir = tempfile.mkdtemp(prefix='.rewrite-', dir=self.log_dir)
+        try:
+            state = {'next_id': 1, 'segment': 1, 'segment_count': 0}
+            for start in range(0, len(logs), self.segment_size):
+                chunk = logs[start:start + self.segment_size]
+                state['segment'] = start // self.segment_size + 1
+                state['segment_count'] = len(chunk)
+                name = os.path.basename(self._segment_path(state['segment']))
+                with open(os.path.join(tmp_dir, name), 'w', encoding='utf-8') as f:
+                    for record in chunk:
+                        f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+            # Trocar os segmentos um a um e remover os antigos que sobraram
+            new_count = state['segment'] if logs else 0
+            for name in sorted(os.listdir(tmp_dir)):
+                os.replace(os.path.join(tmp_dir, name), os.path.join(self.log_dir, name))
+            for number in self._segment_numbers():
+                if number > new_count:
+                    os.remove(self._segment_path(number))
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        self._state = state
+        ids = [record.get('id') for record in logs if isinstance(record.get('id'), int)]
+        self._state['next_id'] = max(ids) + 1 if ids else 1
+
+    def stage(self, record):
+        """
+        Atribui o próximo ID a um registro e o deixa pendente para gravação (grave com flush).
+
+        Args:
+            record: Dicionário com os dados do log (o campo 'id' é preenchido aqui)
+
+        Returns:
+            dict: O registro pendente, com o ID atribuído
+        """
+        with self._lock:
+            self._load_state()
+            record = dict(record)
+            record['id'] = self._state['next_id']
+            self._state['next_id'] += 1
+            self._staged.append(record)
+            return record
+
+    def flush(self, fsync=False):
+        """
+        Grava os registros pendentes com uma única escrita por segmento.
+
+        Args:
+            fsync: Se True, força a gravação em disco antes de retornar
+        """
+        with self._lock:
+            if not self._staged:
+                return
+
+            # Os registros só deixam a lista de pendentes depois de gravados: se a
+            # gravação falhar (disco cheio, permissão), o próximo flush tenta de novo
+            while self._staged:
+                if self._state['segment_count'] >= self.segment_size:
+                    self._state['segment'] += 1
+                    self._state['segment_count'] = 0
+
+                room = self.segment_size - self._state['segment_count']
+                chunk = self._staged[:room]
+                lines = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in chunk)
+                path = self._segment_path(self._state['segment'])
+                size = os.path.getsize(path) if os.path.exists(path) else 0
+                try:
+                    with open(path, 'a', encoding='utf-8') as f:
+                        f.write(lines)
+                        if fsync:
+                            f.flush()
+                            os.fsync(f.fileno())
+                except OSError:
+                    # Desfazer uma gravação parcial, para não corromper a próxima tentativa
+                    try:
+                        os.truncate(path, size)
+                    except OSError:
+                        pass
+                    raise
+                self._staged = self._staged[len(chunk):]
+                self._state['segment_count'] += len(chunk)
+                self._index_records(chunk)
+
+            self._save_counter()
+
+    def append(self, record):
+        """
+        Acrescenta um registro ao log, atribuindo o próximo ID.
+
+        Args:
+            record: Dicionário com os dados do log (o campo 'id' é preenchido aqui)
+
+        Returns:
+            dict: O registro gravado, com o ID atribuído
+        """
+        with self._lock:
+            record = self.stage(record)
+            self.flush()
+            return record
+
+    def replace_all(self, logs):
+        """
+        Substitui todo o histórico (usado pela sincronização com o SharePoint).
+
+        Args:
+            logs: Lista completa de registros de log
+        """
+        with self._lock:
+            self._load_state()
+            # O contador nunca retrocede, mesmo que o novo histórico tenha IDs menores
+            next_id = self._state['next_id']
+            self._write_all(logs)
+            self._state['next_id'] = max(self._state['next_id'], next_id)
+            self._save_counter()
+            self._by_project = None
+
+    def _index_records(self, records):
+        """Acrescenta registros gravados ao índice por projeto, se já construído."""
+        if self._by_project is None:
+            return
+        for record in records:
+            self._by_project.setdefault(normalize_project_id(record.get('id_projeto')), []).append(record)
+
+    def get_by_project(self, project_id):
+        """
+        Obtém os registros de um projeto pelo índice id_projeto -> registros.
+        O índice é construído na primeira consulta e mantido a cada gravação.
+
+        Args:
+            project_id: Código do projeto
+
+        Returns:
+            list: Cópias dos registros do projeto, em ordem crescente de ID
+        """
+        with self._lock:
+            if self._by_project is None:
+                self._by_project = {}
+                self._index_records(self.iter_logs())
+            records = self._by_project.get(normalize_project_id(project_id), [])
+            return [dict(record) for record in records]
+
+    def iter_logs(self):
+        """
+        Itera preguiçosamente sobre todos os registros, do mais antigo ao mais recente.
+
+        Yields:
+            dict: Registro de log
+        """
+        with self._lock:
+            self._load_state()
+            numbers = self._segment_numbers()
+
+        for number in numbers:
+            # Cada segmento é lido com a trava, para não cruzar com um replace_all;
+            # um segmento removido nesse meio tempo é ignorado
+            with self._lock:
+                path = self._segment_path(number)
+                records = list(self._read_segment(path)) if os.path.exists(path) else []
+            yield from records
+
+    def tail(self, limit):
+        """
+        Obtém os últimos registros do log, lendo apenas os segmentos necessários.
+
+        Args:
+            limit: Quantidade máxima de registros
+
+        Returns:
+            list: Registros em ordem crescente de ID
+        """
+        result = deque()
+        with self._lock:
+            self._load_state()
+            for number in reversed(self._segment_numbers()):
+                records = list(self._read_segment(self._segment_path(number)))
+                result.extendleft(reversed(records))
+                if len(result) >= limit:
+                    break
+
+        while len(result) > limit:
+            result.popleft()
+        return list(result)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_log_store(log_dir, legacy_path=None):
+    """
+    Obtém o LogStore compartilhado pelo processo para a pasta informada.
+
+    Args:
+        log_dir: Pasta dos segmentos de log
+        legacy_path: Caminho do logs.json antigo, importado na primeira execução
+
+    Returns:
+        LogStore: Instância única por caminho absoluto
+    """
+    key = os.path.abspath(log_dir)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = LogStore(key, legacy_path)
+            _stores[key] = store
+        return store
@@ -0,0 +1,183 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+import weakref
+
+import httpx
+
+from config import Config
+
+# Cabeçalhos da resposta que não são gravados: o corpo é salvo já decodificado
+SKIPPED_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding', 'connection', 'date', 'set-cookie')
+
+# Modos do cassete: grava as respostas reais, reproduz as gravadas ou reproduz e grava as que faltam
+CASSETTE_MODES = ('gravar', 'reproduzir', 'auto')
+
+
+def request_key(request, body):
+    """
+    Chave de uma requisição: método, caminho e corpo JSON canônico (modelo,
+    mensagens, parâmetros). Requisições iguais têm a mesma resposta gravada.
+
+    Args:
+        request: httpx.Request
+        body: Corpo da requisição (bytes)
+
+    Returns:
+        str: Hash da requisição
+    """
+    try:
+        payload = json.dumps(json.loads(body), ensure_ascii=False, sort_keys=True)
+    except ValueError:
+        payload = body.decode('utf-8', errors='replace')
+    content = f'{request.method} {request.url.path}\n{payload}'
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+class CassetteMiss(Exception):
+    """Requisição sem resposta gravada no modo de reprodução."""
+
+
+class CassetteTransport(httpx.AsyncBaseTransport):
+    """
+    Transporte HTTP do cliente OpenAI que grava as respostas em um arquivo
+    JSONL e as reproduz de forma determinística, sem acesso à rede.
+    """
+
+    def __init__(self, path, mode='auto', inner=None, replay_latency=False):
+        """
+        Inicializa o cassete.
+
+        Args:
+            path: Arquivo JSONL com as respostas gravadas
+            mode: 'gravar', 'reproduzir' ou 'auto' (ver CASSETTE_MODES)
+            inner: Transporte usado para as requisições reais (padrão: um httpx.AsyncHTTPTransport por event loop)
+            replay_latency: Se True, a reprodução espera o tempo de resposta gravado
+        """
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Modo de cassete desconhecido: {mode}")
+        self.path = path
+        self.mode = mode
+        self.inner = inner
+        self.replay_latency = replay_latency
+        self._lock = threading.Lock()
+        self._entries = self._load()
+        self._inner_by_loop = weakref.WeakKeyDictionary()
+
+    def _load(self):
+        """Carrega as respostas gravadas (a última gravação de cada chave prevalece)."""
+        entries = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    entries[entry['key']] = entry
+        return entries
+
+    def _record(self, entry):
+        """Acrescenta uma resposta ao arquivo."""
+        with self._lock:
+            self._entries[entry['key']] = entry
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def _inner_transport(self):
+        """Transporte das requisições reais (as conexões ficam presas ao event loop em uso)."""
+        if self.inner is not None:
+            return self.inner
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            inner = self._inner_by_loop.get(loop)
+            if inner is None:
+                inner = httpx.AsyncHTTPTransport()
+                self._inner_by_loop[loop] = inner
+            return inner
+
+    def __len__(self):
+        return len(self._entries)
+
+    async def handle_async_request(self, request):
+        """Responde com a gravação da requisição ou a encaminha (e grava) conforme o modo."""
+        body = await request.aread()
+        key = request_key(request, body)
+
+        if self.mode != 'gravar':
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is not None:
+                if self.replay_latency:
+                    await asyncio.sleep(entry.get('elapsed_ms', 0) / 1000.0)
+                return httpx.Response(
+                    entry['status'], headers=entry['headers'], content=entry['body'].encode('utf-8'), request=request
+                )
+            if self.mode == 'reproduzir':
+                raise CassetteMiss(f"Requisição sem resposta gravada no cassete {self.path} ({key})")
+
+        started_at = time.perf_counter()
+        response = await self._inner_transport().handle_async_request(request)
+        content = await response.aread()
+        elapsed_ms = round((time.perf_counter() - started_at) * 1000)
+
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in SKIPPED_HEADERS}
+        # Erros transitórios (429/5xx) não são gravados, para não serem reproduzidos para sempre
+        if response.status_code < 500 and response.status_code != 429:
+            self._record({
+                'key': key,
+                'status': response.status_code,
+                'headers': headers,
+                'body': content.decode('utf-8'),
+                'elapsed_ms': elapsed_ms
+            })
+        return httpx.Response(response.status_code, headers=headers, content=content, request=request)
+
+
+_cassettes = {}
+_cassettes_lock = threading.Lock()
+
+
+def get_cassette(path, mode='auto'):
+    """
+    Obtém o cassete compartilhado pelo processo para o arquivo informado.
+
+    Args:
+        path: Arquivo JSONL com as respostas gravadas
+        mode: Modo do cassete (usado apenas na criação)
+
+    Returns:
+        CassetteTransport: Instância única por caminho absoluto
+    """
+    key = os.path.abspath(path)
+    with _cassettes_lock:
+        cassette = _cassettes.get(key)
+        if cassette is None:
+            cassette = CassetteTransport(key, mode)
+            _cassettes[key] = cassette
+        return cassette
+
+
+def build_http_client(transport=None):
+    """
+    Monta o cliente HTTP do AsyncOpenAI com o transporte informado ou o
+    cassete configurado em OPENAI_CASSETTE_MODE.
+
+    Args:
+        transport: Transporte httpx (opcional)
+
+    Returns:
+        httpx.AsyncClient: Cliente HTTP, ou None para usar o padrão do SDK
+    """
+    if transport is None and Config.OPENAI_CASSETTE_MODE:
+        transport = get_cassette(Config.OPENAI_CASSETTE_PATH, Config.OPENAI_CASSETTE_MODE)
+    if transport is None:
+        return None
+    return httpx.AsyncClient(transport=transport, timeout=httpx.Timeout(600.0, connect=10.0))
@@ -0,0 +1,183 @@
+import threading
+
+from app.categorization import categorized_ids
+from app.project_store import normalize_project_id
+
+
+class ProjectListIndex:
+    """
+    Índices pré-calculados para a listagem de projetos: ordenações por
+    campo, listas invertidas por valor de filtro e o conjunto de projetos
+    categorizados. Construído uma vez por versão dos dados.
+    """
+
+    # Campos expostos em cada linha da listagem
+    ROW_FIELDS = ('codigo_projeto', 'titulo', 'status', 'unidade_embrapii', 'data_contrato')
+
+    # Filtros aceitos (parâmetro da API -> campo do projeto)
+    FILTER_FIELDS = {
+        'status': 'status',
+        'unidade_embrapii': 'unidade_embrapii',
+        'macroarea': '_aia_n1_macroarea'
+    }
+
+    # Chaves de ordenação aceitas
+    SORT_KEYS = ('padrao', 'titulo', 'codigo_projeto', 'status', 'unidade_embrapii', 'data_contrato')
+
+    def __init__(self, projects, categorized_ids):
+        """
+        Constrói os índices.
+
+        Args:
+            projects: Lista de projetos (na ordem do arquivo)
+            categorized_ids: Conjunto de códigos de projetos categorizados
+        """
+        self.rows = []
+        self.positions = {}
+        self._search_text = []
+        self.postings = {name: {} for name in self.FILTER_FIELDS}
+        self.categorized = set()
+
+        for position, project in enumerate(projects):
+            row = {field: project.get(field) for field in self.ROW_FIELDS}
+            row['macroarea'] = project.get('_aia_n1_macroarea')
+            row['categorizado'] = normalize_project_id(project.get('codigo_projeto')) in categorized_ids
+            self.positions.setdefault(normalize_project_id(row['codigo_projeto']), position)
+            self.rows.append(row)
+            self._search_text.append(
+                f"{row.get('titulo') or ''} {row.get('codigo_projeto') or ''}".lower()
+            )
+
+            if row['categorizado']:
+                self.categorized.add(position)
+
+            for name, field in self.FILTER_FIELDS.items():
+                value = project.get(field)
+                if value not in (None, ''):
+                    self.postings[name].setdefault(str(value), set()).add(position)
+
+        positions = range(len(self.rows))
+        self.orders = {
+            # Ordem original da página: não categorizados primeiro, depois categorizados
+            'padrao': sorted(positions, key=lambda i: self.rows[i]['categorizado'])
+        }
+        for key in self.SORT_KEYS[1:]:
+            self.orders[key] = sorted(positions, key=lambda i: self._sort_value(self.rows[i].get(key)))
+
+    @staticmethod
+    def _sort_value(value):
+        """Valor de ordenação que coloca vazios no final e ignora maiúsculas."""
+        if value in (None, ''):
+            return (1, '')
+        return (0, str(value).lower())
+
+    def facets(self):
+        """
+        Obtém os valores disponíveis para cada filtro.
+
+        Returns:
+            dict: Nome do filtro -> lista ordenada de valores
+        """
+        return {name: sorted(values) for name, values in self.postings.items()}
+
+    def query(self, filters=None, categorized=None, text=None, sort='padrao',
+              descending=False, offset=0, limit=50, ranked=None):
+        """
+        Consulta uma página de projetos.
+
+        Args:
+            filters: Dicionário filtro -> valor (chaves de FILTER_FIELDS)
+            categorized: True/False para filtrar por categorização, None para todos
+            text: Texto a buscar no título ou código (opcional)
+            sort: Chave de ordenação (uma de SORT_KEYS)
+            descending: Se True, inverte a ordenação
+            offset: Posição inicial da página
+            limit: Tamanho da página
+            ranked: Lista (codigo_projeto, score) da busca textual; quando informada,
+                    define a ordem e o conjunto de projetos, e o score vai em cada linha
+
+        Returns:
+            tuple: (total de projetos que atendem aos filtros, lista de linhas da página)
+        """
+        candidates = None
+        for name, value in (filters or {}).items():
+            if value in (None, ''):
+                continue
+            matches = self.postings.get(name, {}).get(str(value), set())
+            candidates = matches if candidates is None else candidates & matches
+
+        if categorized is not None:
+            if categorized:
+                candidates = self.categorized if candidates is None else candidates & self.categorized
+            else:
+                candidates = (set(range(len(self.rows))) - self.categorized
+                              if candidates is None else candidates - self.categorized)
+
+        scores = {}
+        if ranked is not None:
+            order = []
+            for code, score in ranked:
+                position = self.positions.get(code)
+                if position is not None:
+                    order.append(position)
+                    scores[position] = round(score, 4)
+        else:
+            order = self.orders.get(sort, self.orders['padrao'])
+            if descending:
+                order = order[::-1]
+
+        text = (text or '').strip().lower()
+        if candidates is None and not text:
+            # Sem filtros: a página sai direto da ordenação pré-calculada
+            page = order[offset:offset + limit]
+            return len(order), [self._row(i, scores) for i in page]
+
+        total = 0
+        page = []
+        for position in order:
+            if candidates is not None and position not in candidates:
+                continue
+            if text and text not in self._search_text[position]:
+                continue
+            if offset <= total < offset + limit:
+                page.append(self._row(position, scores))
+            total += 1
+
+        return total, page
+
+    def _row(self, position, scores):
+        """Cópia da linha da listagem, com o score da busca quando houver."""
+        row = dict(self.rows[position])
+        if position in scores:
+            row['score'] = scores[position]
+        return row
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def get_project_list_index(json_client):
+    """
+    Obtém o índice da listagem, reconstruindo-o apenas quando os dados mudam.
+
+    Args:
+        json_client: Cliente de dados (JsonDataClient ou SqliteDataClient)
+
+    Returns:
+        ProjectListIndex: Índice para a versão atual dos dados
+    """
+    key = type(json_client).__name__
+    version = json_client.data_version()
+
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached and cached[0] == version:
+            return cached[1]
+
+    projects = json_client.get_excel_data(None, 'projetos')
+    index = ProjectListIndex(projects, categorized_ids(projects))
+
+    with _cache_lock:
+        _cache[key] = (version, index)
+    return index
@@ -0,0 +1,288 @@
+import json
+import os
+import threading
+from collections import deque
+
+from app.write_committer import atomic_write_json
+
+
+def normalize_project_id(project_id):
+    """
+    Normaliza o código do projeto para uso como chave de índice.
+
+    Args:
+        project_id: Código do projeto (str, int ou None)
+
+    Returns:
+        str: Código normalizado ('' quando ausente)
+    """
+    if project_id is None:
+        return ''
+    return str(project_id).strip()
+
+
+class JsonRecordStore:
+    """
+    Armazena em memória os registros de um arquivo JSON (lista de objetos),
+    indexados por um campo chave. O arquivo só é relido quando seu
+    mtime/tamanho mudam.
+    """
+
+    # Quantidade de alterações pontuais lembradas para atualização incremental de índices
+    CHANGE_LOG_SIZE = 1000
+
+    def __init__(self, path, key_field):
+        """
+        Inicializa o armazenamento.
+
+        Args:
+            path: Caminho do arquivo JSON
+            key_field: Campo usado como chave do índice
+        """
+        self.path = path
+        self.key_field = key_field
+        self.version = 0
+        self._changes = deque(maxlen=self.CHANGE_LOG_SIZE)
+        self._full_change_version = 0
+        self._lock = threading.RLock()
+        self._records = []
+        self._index = {}
+        self._signature = None
+        self._dirty = False
+
+    def _file_signature(self):
+        """Retorna a assinatura (mtime, tamanho) atual do arquivo."""
+        stat = os.stat(self.path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _load(self, signature):
+        """Carrega o arquivo e reconstrói o índice."""
+        with open(self.path, 'r', encoding='utf-8') as f:
+            records = json.load(f)
+
+        self._set_records(records)
+        self._signature = signature
+        self.version += 1
+        self._full_change_version = self.version
+
+    def _set_records(self, records):
+        """Define a lista de registros e reconstrói o índice pelo campo chave."""
+        index = {}
+        for record in records:
+            # Manter a primeira ocorrência, como na busca linear original
+            index.setdefault(normalize_project_id(record.get(self.key_field)), record)
+
+        self._records = records
+        self._index = index
+
+    def _ensure_loaded(self):
+        """Recarrega os registros se o arquivo mudou desde a última leitura."""
+        # Alterações ainda não gravadas têm precedência sobre o arquivo
+        if self._dirty:
+            return
+        signature = self._file_signature()
+        if signature != self._signature:
+            self._load(signature)
+
+    def current_version(self):
+        """
+        Obtém a versão atual dos dados (muda a cada recarga ou alteração).
+
+        Returns:
+            int: Número da versão
+        """
+        with self._lock:
+            self._ensure_loaded()
+            return self.version
+
+    def changes_since(self, version):
+        """
+        Obtém as chaves alteradas desde uma versão conhecida.
+
+        Args:
+            version: Versão observada anteriormente
+
+        Returns:
+            tuple: (versão atual, conjunto de chaves alteradas ou None se for preciso
+                   reprocessar tudo, por recarga do arquivo ou histórico insuficiente)
+        """
+        with self._lock:
+            self._ensure_loaded()
+            if version == self.version:
+                return self.version, set()
+            if self._full_change_version > version:
+                return self.version, None
+            if not self._changes or self._changes[0][0] > version + 1:
+                return self.version, None
+            return self.version, {key for change_version, key in self._changes if change_version > version}
+
+    def get_all(self):
+        """
+        Obtém todos os registros.
+
+        Returns:
+            list: Cópias rasas dos registros, na ordem do arquivo
+        """
+        with self._lock:
+            self._ensure_loaded()
+            return [dict(record) for record in self._records]
+
+    def get(self, key):
+        """
+        Obtém um registro pela chave em O(1).
+
+        Args:
+            key: Valor do campo chave
+
+        Returns:
+            dict: Cópia do registro ou None se não encontrado
+        """
+        with self._lock:
+            self._ensure_loaded()
+            record = self._index.get(normalize_project_id(key))
+            return dict(record) if record is not None else None
+
+    def apply_update(self, key, fields):
+        """
+        Atualiza campos de um registro apenas em memória (grave com flush).
+
+        Args:
+            key: Valor do campo chave
+            fields: Dicionário com os campos a atualizar
+
+        Returns:
+            bool: True se o registro foi encontrado e atualizado
+        """
+        with self._lock:
+            self._ensure_loaded()
+            record = self._index.get(normalize_project_id(key))
+            if record is None:
+                return False
+
+            record.update(fields)
+            self._dirty = True
+            self.version += 1
+            self._changes.append((self.version, normalize_project_id(key)))
+            return True
+
+    def apply_upsert(self, record):
+        """
+        Substitui (ou acrescenta) um registro inteiro apenas em memória (grave com flush).
+
+        Args:
+            record: Registro completo, contendo o campo chave
+        """
+        with self._lock:
+            self._ensure_loaded()
+            key = normalize_project_id(record.get(self.key_field))
+            existing = self._index.get(key)
+            if existing is None:
+                self._records.append(record)
+            else:
+                position = next(i for i, item in enumerate(self._records) if item is existing)
+                self._records[position] = record
+            self._index[key] = record
+            self._dirty = True
+            self.version += 1
+            self._changes.append((self.version, key))
+
+    def update(self, key, fields):
+        """
+        Atualiza campos de um registro e grava o arquivo.
+
+        Args:
+            key: Valor do campo chave
+            fields: Dicionário com os campos a atualizar
+
+        Returns:
+            bool: True se o registro foi encontrado e atualizado
+        """
+        with self._lock:
+            if not self.apply_update(key, fields):
+                return False
+            self.flush()
+            return True
+
+    def replace_all(self, records):
+        """
+        Substitui todos os registros e grava o arquivo.
+
+        Args:
+            records: Lista completa de registros
+        """
+        with self._lock:
+            self._set_records(records)
+            self._dirty = True
+            self.version += 1
+            self._full_change_version = self.version
+            self.flush()
+
+    def flush(self, fsync=False):
+        """
+        Grava no arquivo as alterações pendentes (de forma atômica).
+
+        Args:
+            fsync: Se True, força a gravação em disco antes de retornar
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            atomic_write_json(self.path, self._records, fsync)
+            self._signature = self._file_signature()
+            self._dirty = False
+
+
+class ProjectStore(JsonRecordStore):
+    """
+    Armazena em memória os projetos do all_projetos.json, indexados pelo
+    codigo_projeto.
+    """
+
+    def __init__(self, path):
+        """
+        Inicializa o armazenamento de projetos.
+
+        Args:
+            path: Caminho do arquivo all_projetos.json
+        """
+        super().__init__(path, 'codigo_projeto')
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_record_store(path, key_field):
+    """
+    Obtém o JsonRecordStore compartilhado pelo processo para o arquivo informado.
+
+    Args:
+        path: Caminho do arquivo JSON
+        key_field: Campo usado como chave do índice
+
+    Returns:
+        JsonRecordStore: Instância única por caminho absoluto
+    """
+    key = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            if key_field == 'codigo_projeto':
+                store = ProjectStore(key)
+            else:
+                store = JsonRecordStore(key, key_field)
+            _stores[key] = store
+        return store
+
+
+def get_project_store(path):
+    """
+    Obtém o ProjectStore compartilhado pelo processo para o arquivo informado.
+
+    Args:
+        path: Caminho do arquivo all_projetos.json
+
+    Returns:
+        ProjectStore: Instância única por caminho absoluto
+    """
+    return get_record_store(path, 'codigo_projeto')
@@ -0,0 +1,118 @@
+import random
+import threading
+import time
+
+
+class CircuitOpenError(Exception):
+    """Chamada recusada porque o circuito está aberto (serviço com falhas seguidas)."""
+
+
+class CircuitBreaker:
+    """
+    Disjuntor de chamadas a um serviço externo. Após failure_threshold falhas
+    seguidas o circuito abre e as chamadas falham imediatamente por
+    reset_timeout segundos; depois disso uma chamada de teste é liberada
+    (meio aberto) e o resultado dela fecha ou reabre o circuito.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        """
+        Inicializa o disjuntor fechado.
+
+        Args:
+            failure_threshold: Falhas seguidas que abrem o circuito
+            reset_timeout: Segundos com o circuito aberto antes da chamada de teste
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'fechado'
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Verifica se uma chamada pode ser feita.
+
+        Raises:
+            CircuitOpenError: Se o circuito está aberto
+        """
+        with self._lock:
+            if self.state == 'aberto':
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    raise CircuitOpenError("Serviço indisponível (circuito aberto após falhas seguidas)")
+                self.state = 'meio_aberto'
+                self._trial_running = False
+            if self.state == 'meio_aberto':
+                if self._trial_running:
+                    raise CircuitOpenError("Serviço indisponível (aguardando a chamada de teste)")
+                self._trial_running = True
+
+    def record_success(self):
+        """Registra uma chamada bem-sucedida (fecha o circuito)."""
+        with self._lock:
+            if self.state != 'fechado':
+                print("Circuito da OpenAI fechado: chamadas normalizadas")
+            self.state = 'fechado'
+            self._failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        """Registra uma falha; abre o circuito no limite ou se a chamada de teste falhou."""
+        with self._lock:
+            self._failures += 1
+            if self.state == 'meio_aberto' or self._failures >= self.failure_threshold:
+                if self.state != 'aberto':
+                    print(f"Circuito da OpenAI aberto por {self.reset_timeout}s após {self._failures} falhas seguidas")
+                self.state = 'aberto'
+                self._opened_at = time.monotonic()
+                self._trial_running = False
+
+    def release(self):
+        """Libera a chamada de teste sem resultado (ex.: erro do próprio pedido, cancelamento)."""
+        with self._lock:
+            self._trial_running = False
+
+    @property
+    def is_open(self):
+        """True se as chamadas estão sendo recusadas."""
+        with self._lock:
+            return self.state == 'aberto' and time.monotonic() - self._opened_at < self.reset_timeout
+
+
+def backoff_delay(attempt, base_delay=0.5, max_delay=8.0):
+    """
+    Espera antes de uma nova tentativa: exponencial com jitter completo.
+
+    Args:
+        attempt: Número da tentativa que falhou (0 para a primeira)
+        base_delay: Espera base em segundos
+        max_delay: Espera máxima em segundos
+
+    Returns:
+        float: Segundos de espera
+    """
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+_breaker = None
+_breaker_lock = threading.Lock()
+
+
+def get_circuit_breaker(failure_threshold=5, reset_timeout=30):
+    """
+    Obtém o disjuntor das chamadas à OpenAI compartilhado pelo processo.
+
+    Args:
+        failure_threshold: Falhas seguidas que abrem o circuito (usado apenas na criação)
+        reset_timeout: Segundos com o circuito aberto (usado apenas na criação)
+
+    Returns:
+        CircuitBreaker: Instância única
+    """
+    global _breaker
+    with _breaker_lock:
+        if _breaker is None:
+            _breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        return _breaker
@@ -1,12 +1,17 @@
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify, current_app
-from app.json_data_client import JsonDataClient
+from app.storage import create_data_client
+from app.project_index import get_project_list_index
+from app.search_index import search_projects
+from app.suggestion_cache import get_suggestion_cache, suggestion_cache_key
+from app.suggestion_jobs import generate_local_suggestion, get_suggestion_jobs
 from app.excel_manager import ExcelManager
-from app.ai_integration import OpenAIClient
+from app.ai_integration import get_openai_client
 from app.sync_manager import SyncManager
 from config import Config
 import json
 import os
 from datetime import datetime
+from functools import lru_cache
 
 main = Blueprint('main', __name__)
 
@@ -29,107 +34,126 @@ def login():
     # Podemos redirecionar diretamente para a página de projetos
     return redirect(url_for('main.projects'))
 
+# Tamanho da página da listagem de projetos
+PROJECTS_PAGE_SIZE = 50
+PROJECTS_MAX_PAGE_SIZE = 500
+
 # Rota para listagem de projetos
 @main.route('/projects')
 def projects():
     try:
-        # Usar o novo cliente JSON
-        json_client = JsonDataClient()
-        
-        # Obter dados dos projetos
-        projects_data = json_client.get_excel_data(
-            None,  # Não precisamos mais do caminho do Excel
-            'projetos'
-        )
-        
-        # Obter dados de categorização
-        try:
-            categorias_data = json_client.get_excel_data(None, 'categorias')
-        except Exception as e:
-            print(f"Aviso: Erro ao carregar categorias: {str(e)}")
-            categorias_data = []
-        
-        # Criar um conjunto de IDs de projetos categorizados para busca rápida
-        categorized_project_ids = set()
-        for categoria in categorias_data:
-            project_id = categoria.get('id_projeto')
-            if project_id:
-                categorized_project_ids.add(project_id)
+        # Usar o cliente de dados configurado
+        json_client = create_data_client()
         
-        # Adicionar informação de categorização a cada projeto
-        for project in projects_data:
-            project_id = project.get('codigo_projeto')
-            project['categorizado'] = project_id in categorized_project_ids
+        # Obter o índice da listagem (reconstruído apenas quando os dados mudam)
+        index = get_project_list_index(json_client)
         
-        # Ordenar projetos: não categorizados primeiro, depois categorizados
-        projects_data = sorted(projects_data, key=lambda x: x.get('categorizado', False))
+        # Renderizar apenas a primeira página; as demais são buscadas pela API
+        total, projects_data = index.query(limit=PROJECTS_PAGE_SIZE)
         
-        return render_template('projects.html', projects=projects_data)
+        return render_template(
+            'projects.html',
+            projects=projects_data,
+            total_projects=total,
+            page_size=PROJECTS_PAGE_SIZE,
+            facets=index.facets()
+        )
         
     except Exception as e:
         flash(f'Erro ao carregar projetos: {str(e)}', 'error')
         return redirect(url_for('main.login'))
 
-# Função para registrar log de categorização
-def log_categorization(project_id, used_ai=False, validation_info=None, user_modified=False):
+# Consultar uma página de projetos a partir dos parâmetros da requisição
+def query_projects_page(index, ranked=None):
+    """
+    Aplica paginação, filtros e ordenação da requisição atual ao índice da listagem.
+    Retorna a resposta JSON da API.
+    """
+    # Paginação
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = request.args.get('limit', PROJECTS_PAGE_SIZE, type=int)
+    limit = min(max(limit, 1), PROJECTS_MAX_PAGE_SIZE)
+    
+    # Filtros
+    filters = {name: request.args.get(name) for name in index.FILTER_FIELDS}
+    categorized = request.args.get('categorized')
+    if categorized in ('true', '1', 'sim'):
+        categorized = True
+    elif categorized in ('false', '0', 'nao'):
+        categorized = False
+    else:
+        categorized = None
+    
+    # Ordenação
+    sort = request.args.get('sort', 'padrao')
+    if sort not in index.SORT_KEYS:
+        return jsonify({'error': f'Ordenação inválida: {sort}'}), 400
+    descending = request.args.get('order', 'asc') == 'desc'
+    
+    total, items = index.query(
+        filters=filters,
+        categorized=categorized,
+        text=None if ranked is not None else request.args.get('q'),
+        sort=sort,
+        descending=descending,
+        offset=offset,
+        limit=limit,
+        ranked=ranked
+    )
+    
+    return jsonify({
+        'total': total,
+        'offset': offset,
+        'limit': limit,
+        'items': items
+    })
+
+# API de listagem paginada de projetos
+@main.route('/api/projects', methods=['GET'])
+def api_projects():
     try:
-        json_client = JsonDataClient()
-        
-        # Obter logs existentes para determinar próximo ID
-        try:
-            logs = json_client.get_excel_data(
-                None,
-                'logs'
-            )
-            # Determinar o próximo ID
-            next_id = 1
-            if logs and len(logs) > 0:
-                ids = [log.get('id', 0) for log in logs]
-                next_id = max(ids) + 1
-        except Exception as e:
-            # Se o arquivo não existir ou ocorrer erro, começar do ID 1
-            print(f"Aviso: Não foi possível ler logs existentes: {str(e)}")
-            logs = []
-            next_id = 1
+        json_client = create_data_client()
+        return query_projects_page(get_project_list_index(json_client))
         
-        # Criar registro de log
-        log_data = {
-            'id': next_id,
-            'id_projeto': project_id,
-            'email': session.get('sharepoint_username', 'sistema'),
-            'data': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'ia': 'Sim' if used_ai else 'Não',
-            'user_modified': user_modified
-        }
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# API de busca textual (BM25) nos projetos, com os mesmos filtros da listagem
+@main.route('/api/projects/search', methods=['GET'])
+def api_projects_search():
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'error': 'Parâmetro q não fornecido'}), 400
         
-        # Adicionar informações de validação se disponíveis
-        if validation_info:
-            log_data['validation_info'] = validation_info
-        
-        # Adicionar o log ao arquivo JSON
-        if logs:
-            # Adicionar ao final da lista existente
-            logs.append(log_data)
-            json_client.update_excel_data(
-                None,
-                'logs',
-                logs
-            )
-        else:
-            # Criar lista com apenas este log
-            json_client.update_excel_data(
-                None,
-                'logs',
-                [log_data]
-            )
+        json_client = create_data_client()
+        ranked = search_projects(json_client, query)
+        return query_projects_page(get_project_list_index(json_client), ranked)
         
-        print(f"Log de categorização registrado: {log_data}")
-        return True
     except Exception as e:
-        print(f"Erro ao registrar log de categorização: {str(e)}")
-        return False
+        return jsonify({'error': str(e)}), 500
 
-# Função para extrair nome do email
+# Função para montar o registro de log de categorização
+def build_log_entry(project_id, used_ai=False, validation_info=None, user_modified=False):
+    """
+    Monta o registro de log de uma categorização (o ID é atribuído ao gravar).
+    """
+    log_data = {
+        'id_projeto': project_id,
+        'email': session.get('sharepoint_username', 'sistema'),
+        'data': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'ia': 'Sim' if used_ai else 'Não',
+        'user_modified': user_modified
+    }
+    
+    # Adicionar informações de validação se disponíveis
+    if validation_info:
+        log_data['validation_info'] = validation_info
+    
+    return log_data
+
+# Função para extrair nome do email (memoizada: poucos usuários, muitos logs)
+@lru_cache(maxsize=1024)
 def extract_name_from_email(email):
     """
     Extrai o nome do usuário a partir do email.
@@ -153,11 +177,10 @@ def get_project_logs(project_id):
     Obtém os logs de categorização para um projeto específico.
     """
     try:
-        json_client = JsonDataClient()
-        all_logs = json_client.get_excel_data(None, 'logs')
+        json_client = create_data_client()
         
-        # Filtrar logs pelo ID do projeto
-        project_logs = [log for log in all_logs if str(log.get('id_projeto')) == str(project_id)]
+        # Obter apenas os logs do projeto pelo índice por projeto
+        project_logs = json_client.get_project_logs(project_id)
         
         # Adicionar nome formatado para cada log
         for log in project_logs:
@@ -174,7 +197,7 @@ def get_project_logs(project_id):
 @main.route('/categorize/<project_id>/', methods=['GET', 'POST'])
 def categorize(project_id):
     try:
-        json_client = JsonDataClient()
+        json_client = create_data_client()
         
         if request.method == 'POST':
             # Processar o formulário de categorização
@@ -201,19 +224,15 @@ def categorize(project_id):
             # Verificar se o usuário modificou os campos (através de um campo oculto no form)
             user_modified = request.form.get('user_modified') == 'true'
             
-            # Atualizar diretamente no all_projetos.json
-            if json_client.update_project_data(project_id, category_data):
-                # Continuar salvando em categorias.json para compatibilidade
-                json_client.update_excel_data(
-                    None,
-                    'categorias',
-                    category_data,
-                    'id_projeto'
-                )
-                
-                # Registrar log da categorização
-                log_categorization(project_id, used_ai, None, user_modified)
-                
+            # Salvar no projeto e no log em uma única gravação agrupada
+            log_entry = json_client.save_categorization(
+                project_id,
+                category_data,
+                build_log_entry(project_id, used_ai, None, user_modified)
+            )
+            
+            if log_entry:
+                print(f"Log de categorização registrado: {log_entry}")
                 flash('Categorização salva com sucesso!', 'success')
             else:
                 flash('Erro: Projeto não encontrado para atualização', 'error')
@@ -238,94 +257,60 @@ def categorize(project_id):
         
         # Inicializar variável para a sugestão da IA
         ai_suggestion = None
+        suggestion_pending = False
         
-        # Verificar se devemos gerar uma nova sugestão da IA
-        should_generate_new_suggestion = True
+        # Regenerar a sugestão apenas quando solicitado explicitamente
+        regenerate = request.args.get('regenerar') == '1'
         
         # Não gerar nova sugestão se já existir categorização manual
         if existing and (existing.get('microarea') or existing.get('segmento') or 
                         existing.get('dominio') or existing.get('dominio_outros')):
-            should_generate_new_suggestion = False
             print(f"Categorização manual existente para o projeto {project_id}. Não gerando nova sugestão da IA.")
+            if existing_suggestion:
+                ai_suggestion = existing_suggestion
+                ai_suggestion['is_reused_suggestion'] = True
+                session['ai_suggestion'] = existing_suggestion
         
-        # Não gerar nova sugestão se já existir uma sugestão com confiança ALTA
-        elif existing_suggestion and existing_suggestion.get('confianca') == 'ALTA':
-            should_generate_new_suggestion = False
-            ai_suggestion = existing_suggestion
-            # Adicionar flag para indicar que estamos reutilizando uma sugestão existente
-            ai_suggestion['is_reused_suggestion'] = True
-            print(f"Sugestão da IA com confiança ALTA já existe para o projeto {project_id}. Usando sugestão existente.")
-        
-        # Gerar nova sugestão da IA se necessário
-        openai_api_key = Config.get_openai_api_key()
-        
-        if should_generate_new_suggestion and openai_api_key:
-            try:
-                # Obter dados do aia.json
-                with open('app/data/aia.json', 'r', encoding='utf-8') as f:
-                    aia_data = json.load(f)
-                
-                # Chamar OpenAI para sugerir categorias
-                openai_client = OpenAIClient(openai_api_key)
-                suggestion = openai_client.suggest_categories(project, None, aia_data)
-                
-                # Adicionar ID do projeto e flag para indicar que é uma sugestão da IA
-                suggestion['project_id'] = project_id
-                suggestion['is_ai_suggestion'] = True
-                
-                # Garantir que todos os campos tenham vírgulas entre eles e tratar o campo dominio_outro
-                for key in suggestion:
-                    if isinstance(suggestion[key], str):
-                        suggestion[key] = suggestion[key].strip()
-                
-                # Verificar se o campo _aia_n3_dominio_outro está vazio ou é N/A
-                if '_aia_n3_dominio_outro' in suggestion:
-                    dominio_outro = suggestion['_aia_n3_dominio_outro'].strip()
-                    if dominio_outro == '' or dominio_outro.lower() == 'n/a':
-                        suggestion['_aia_n3_dominio_outro'] = 'N/A'
-                
-                # Salvar sugestão
-                json_client.save_ai_suggestion(suggestion)
-                
-                # Atualizar a variável ai_suggestion
-                ai_suggestion = suggestion
-                
-                # Armazenar a sugestão na sessão para uso posterior
-                session['ai_suggestion'] = suggestion
-                
-                print(f"Sugestão da IA gerada com sucesso: {ai_suggestion}")
-            except Exception as e:
-                print(f"Erro ao obter sugestão da IA: {str(e)}")
-        elif existing_suggestion and not ai_suggestion:
-            # Se não geramos uma nova sugestão, mas existe uma sugestão anterior (não ALTA),
-            # usar a sugestão existente
-            ai_suggestion = existing_suggestion
-            # Adicionar flag para indicar que estamos reutilizando uma sugestão existente
-            ai_suggestion['is_reused_suggestion'] = True
-            session['ai_suggestion'] = existing_suggestion
-            print(f"Usando sugestão da IA existente para o projeto {project_id}.")
-        
-        # Obter listas de categorias
-        categories_lists = json_client.get_excel_data(
-            None,
-            'categorias_lists'
-        )
-        
-        # Organizar as listas por tipo
-        organized_lists = {}
-        for column in ['tecnologias_habilitadoras', 'areas_aplicacao', 'microarea', 'segmento', 'dominio']:
-            organized_lists[column] = list(set([item.get(column, '') for item in categories_lists if item.get(column)]))
-        
-        # Obter o mapeamento de domínios por microárea e segmento
-        dominios_por_microarea_segmento = None
-        for item in categories_lists:
-            if isinstance(item, dict) and 'dominios_por_microarea_segmento' in item:
-                dominios_por_microarea_segmento = item['dominios_por_microarea_segmento']
-                break
+        else:
+            # Reaproveitar a sugestão gerada com o mesmo texto do projeto, aia.json, modelo e prompt
+            cache_key = suggestion_cache_key(project, json_client.get_taxonomy().version)
+            cache = get_suggestion_cache(
+                Config.AI_SUGGESTION_CACHE_SIZE, Config.AI_SUGGESTION_CACHE_TTL_DAYS * 24 * 3600
+            )
+            cached = None if regenerate else cache.lookup(json_client, project_id, cache_key)
+            
+            # Sem sugestão reaproveitável: tentar o classificador local (instantâneo, sem a API)
+            local = None if cached or regenerate else generate_local_suggestion(project_id)
+            
+            openai_api_key = Config.get_openai_api_key()
+            
+            if cached:
+                ai_suggestion = cached
+                # Adicionar flag para indicar que estamos reutilizando uma sugestão existente
+                ai_suggestion['is_reused_suggestion'] = True
+                session['ai_suggestion'] = cached
+                print(f"Usando sugestão da IA em cache para o projeto {project_id}.")
+            
+            elif local:
+                ai_suggestion = local
+                session['ai_suggestion'] = local
+                print(f"Sugestão do classificador local para o projeto {project_id} "
+                      f"(probabilidade {local['probabilidade']:.0%}).")
+            
+            elif openai_api_key:
+                # Gerar nova sugestão em segundo plano; a página é exibida sem esperar a resposta
+                get_suggestion_jobs(Config.AI_SUGGESTION_WORKERS).submit(project_id, openai_api_key)
+                suggestion_pending = True
+                print(f"Sugestão da IA agendada para o projeto {project_id}.")
+            
+            elif existing_suggestion:
+                # Sem chave da API: exibir a última sugestão salva, mesmo desatualizada
+                ai_suggestion = existing_suggestion
+                ai_suggestion['is_reused_suggestion'] = True
+                session['ai_suggestion'] = existing_suggestion
         
-        # Adicionar o mapeamento às listas organizadas como string JSON
-        if dominios_por_microarea_segmento:
-            organized_lists['dominios_por_microarea_segmento_json'] = json.dumps(dominios_por_microarea_segmento)
+        # Obter listas de categorias e o mapeamento de domínios (JSON pré-calculado)
+        organized_lists = json_client.get_taxonomy().organized_lists()
         
         # Obter categorização existente
         existing = json_client.get_categorization_by_project_id(
@@ -354,6 +339,7 @@ def categorize(project_id):
             categories_lists=organized_lists,
             existing=existing,
             ai_suggestion=ai_suggestion,  # Passar a sugestão da IA para o template
+            suggestion_pending=suggestion_pending,  # Sugestão sendo gerada em segundo plano
             openai_enabled=(openai_api_key != ''),
             project_logs=project_logs  # Passar os logs do projeto para o template
         )
@@ -366,7 +352,7 @@ def categorize(project_id):
 @main.route('/lists', methods=['GET', 'POST'])
 def lists():
     try:
-        json_client = JsonDataClient()
+        json_client = create_data_client()
         
         if request.method == 'POST':
             # Processar o formulário de atualização de listas
@@ -394,16 +380,8 @@ def lists():
             flash('Funcionalidade não suportada com JSON local', 'warning')
             return redirect(url_for('main.lists'))
         
-        # Obter listas de categorias
-        categories_lists = json_client.get_excel_data(
-            None,
-            'categorias_lists'
-        )
-        
-        # Organizar as listas por tipo
-        organized_lists = {}
-        for column in ['tecnologias_habilitadoras', 'areas_aplicacao', 'microarea', 'segmento', 'dominio']:
-            organized_lists[column] = list(set([item.get(column, '') for item in categories_lists if item.get(column)]))
+        # Obter listas de categorias já organizadas por tipo
+        organized_lists = json_client.get_taxonomy().organized_lists()
         
         return render_template('lists.html', categories_lists=organized_lists)
         
@@ -415,33 +393,29 @@ def lists():
 @main.route('/logs')
 def view_logs():
     try:
-        json_client = JsonDataClient()
+        json_client = create_data_client()
         
-        # Obter logs
+        # Obter logs (todos, ou apenas os últimos N quando ?limit=N for informado)
+        limit = request.args.get('limit', type=int)
         try:
-            logs = json_client.get_excel_data(
-                None,
-                'logs'
-            )
+            if limit:
+                logs = json_client.tail_logs(limit)
+            else:
+                logs = list(json_client.iter_logs())
         except Exception as e:
             print(f"Erro ao obter logs: {str(e)}")
             logs = []
         
-        # Obter projetos para exibir nomes em vez de IDs
-        projects = json_client.get_excel_data(
-            None,
-            'projetos'
-        )
-        
-        # Criar mapeamento de ID para título do projeto
+        # Adicionar título do projeto aos logs, buscando cada projeto pelo código
         project_names = {}
-        for project in projects:
-            project_names[str(project.get('id'))] = project.get('titulo', 'Projeto sem título')
-        
-        # Adicionar título do projeto aos logs
         for log in logs:
             project_id = str(log.get('id_projeto'))
-            log['projeto_titulo'] = project_names.get(project_id, f"Projeto {project_id}")
+            if project_id not in project_names:
+                project = json_client.get_project_by_id(None, project_id)
+                project_names[project_id] = (
+                    project.get('titulo', 'Projeto sem título') if project else f"Projeto {project_id}"
+                )
+            log['projeto_titulo'] = project_names[project_id]
         
         return render_template('logs.html', logs=logs)
         
@@ -484,8 +458,8 @@ def suggest_categories():
         if not openai_api_key:
             return jsonify({'error': 'Chave da API OpenAI não configurada'}), 400
         
-        # Usar o cliente JSON
-        json_client = JsonDataClient()
+        # Usar o cliente de dados configurado
+        json_client = create_data_client()
         
         # Obter dados do projeto
         project = json_client.get_project_by_id(
@@ -496,27 +470,13 @@ def suggest_categories():
         if not project:
             return jsonify({'error': 'Projeto não encontrado'}), 404
         
-        # Obter listas de categorias
-        categories_lists_data = json_client.get_excel_data(
-            None,
-            'categorias_lists'
-        )
-        
-        # Organizar as listas por tipo
-        organized_lists = {}
-        for column in ['tecnologias_habilitadoras', 'areas_aplicacao', 'microarea', 'segmento', 'dominio']:
-            organized_lists[column] = list(set([item.get(column, '') for item in categories_lists_data if item.get(column)]))
-        
-        # Obter dados do aia.json
-        try:
-            with open('app/data/aia.json', 'r', encoding='utf-8') as f:
-                aia_data = json.load(f)
-        except Exception as e:
-            print(f"Aviso: Não foi possível carregar aia.json: {str(e)}")
-            aia_data = None
+        # Obter listas de categorias e os registros do aia.json
+        taxonomy = json_client.get_taxonomy()
+        organized_lists = taxonomy.organized_lists()
+        aia_data = taxonomy.records
         
         # Chamar OpenAI para sugerir categorias
-        openai_client = OpenAIClient(openai_api_key)
+        openai_client = get_openai_client(openai_api_key)
         suggestions = openai_client.suggest_categories(project, organized_lists, aia_data)
         
         # Verificar se há múltiplos domínios sugeridos e formatá-los corretamente
@@ -531,6 +491,32 @@ def suggest_categories():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Rota para acompanhar a geração da sugestão da IA em segundo plano
+@main.route('/api/suggestions/<project_id>/status', methods=['GET'])
+def suggestion_status(project_id):
+    try:
+        job = get_suggestion_jobs(Config.AI_SUGGESTION_WORKERS).status(project_id)
+        
+        if job is None:
+            # Sem job recente: usar a última sugestão salva, se houver
+            suggestion = create_data_client().get_ai_suggestion_by_project_id(project_id)
+            if not suggestion:
+                return jsonify({'status': 'none'})
+            job = {'status': 'done', 'suggestion': suggestion}
+        
+        if job['status'] == 'done':
+            # Armazenar a sugestão na sessão para uso na validação
+            session['ai_suggestion'] = job['suggestion']
+            return jsonify({'status': 'done', 'suggestion': job['suggestion']})
+        
+        if job['status'] == 'error':
+            return jsonify({'status': 'error', 'error': job['error']})
+        
+        return jsonify({'status': 'pending'})
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # Rota para validação de sugestões da IA
 @main.route('/api/validate-suggestion', methods=['POST'])
 def validate_suggestion():
@@ -554,8 +540,11 @@ def validate_suggestion():
         if not project_id:
             return jsonify({'error': 'ID do projeto não fornecido'}), 400
         
-        # Obter a sugestão da IA da sessão
+        # Obter a sugestão da IA da sessão (ou a última salva para o projeto, se a
+        # sugestão foi gerada em segundo plano e a sessão ainda não a recebeu)
         suggestion = session.get('ai_suggestion')
+        if not suggestion or str(suggestion.get('project_id')) != str(project_id):
+            suggestion = create_data_client().get_ai_suggestion_by_project_id(project_id) or suggestion
         
         if not suggestion:
             return jsonify({'error': 'Nenhuma sugestão da IA encontrada na sessão'}), 400
@@ -567,11 +556,11 @@ def validate_suggestion():
             return jsonify({'error': 'Chave da API OpenAI não configurada'}), 400
         
         # Processar a validação
-        openai_client = OpenAIClient(openai_api_key)
+        openai_client = get_openai_client(openai_api_key)
         result = openai_client.process_validation(suggestion, validation)
         
-        # Usar o cliente JSON
-        json_client = JsonDataClient()
+        # Usar o cliente de dados configurado
+        json_client = create_data_client()
         
         # Preparar dados para salvar - usar diretamente o resultado do process_validation
         # que agora já contém as chaves corretas (_aia_n1_macroarea, etc.)
@@ -587,31 +576,18 @@ def validate_suggestion():
         # Adicionar logs para depuração
         print(f"Dados a serem salvos: {category_data}")
         
-        # Atualizar no all_projetos.json
-        if json_client.update_project_data(project_id, category_data):
-            # Continuar salvando em categorias.json para compatibilidade
-            # Converter para o formato esperado pelo categorias.json
-            categorias_data = {
-                'id_projeto': project_id,
-                'microarea': result.get('_aia_n1_macroarea', ''),
-                'segmento': result.get('_aia_n2_segmento', ''),
-                'dominio': result.get('_aia_n3_dominio_afeito', ''),
-                'dominio_outros': result.get('_aia_n3_dominio_outro', '')
-                # Removido o campo validation_info
-            }
-            
-            json_client.update_excel_data(
-                None,
-                'categorias',
-                categorias_data,
-                'id_projeto'
-            )
-            
-            # Registrar log da categorização
-            # Neste caso, consideramos que o usuário modificou os campos se houver campos manuais no objeto de validação
-            user_modified = any(key.startswith('manual_') for key in validation.keys())
-            log_categorization(project_id, True, validation, user_modified)
-            
+        # Neste caso, consideramos que o usuário modificou os campos se houver campos manuais no objeto de validação
+        user_modified = any(key.startswith('manual_') for key in validation.keys())
+        
+        # Salvar projeto e log em uma única gravação agrupada
+        log_entry = json_client.save_categorization(
+            project_id,
+            category_data,
+            build_log_entry(project_id, True, validation, user_modified)
+        )
+        
+        if log_entry:
+            print(f"Log de categorização registrado: {log_entry}")
             return jsonify({'success': True, 'message': 'Validação processada com sucesso'})
         else:
             return jsonify({'error': 'Erro ao atualizar dados do projeto'}), 500
@@ -0,0 +1,258 @@
+import bisect
+import hashlib
+import math
+import re
+import threading
+import unicodedata
+
+from app.project_store import normalize_project_id
+
+# Campos indexados e o peso de cada um no cálculo da frequência dos termos
+SEARCH_FIELDS = {
+    'codigo_projeto': 1,
+    'titulo': 3,
+    'titulo_publico': 3,
+    'tags': 2,
+    'objetivo': 1,
+    'descricao_publica': 1
+}
+
+STOPWORDS = {
+    'a', 'ao', 'aos', 'as', 'com', 'da', 'das', 'de', 'do', 'dos', 'e', 'em',
+    'na', 'nas', 'no', 'nos', 'o', 'os', 'ou', 'para', 'pela', 'pelo', 'por',
+    'que', 'se', 'um', 'uma'
+}
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def normalize_text(text):
+    """
+    Remove acentos e converte para minúsculas (case folding).
+
+    Args:
+        text: Texto original
+
+    Returns:
+        str: Texto normalizado
+    """
+    decomposed = unicodedata.normalize('NFKD', str(text))
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def tokenize(text):
+    """
+    Divide o texto em termos normalizados, sem stopwords.
+
+    Args:
+        text: Texto original
+
+    Returns:
+        list: Termos encontrados
+    """
+    if not text:
+        return []
+    return [t for t in _TOKEN_RE.findall(normalize_text(text)) if len(t) > 1 and t not in STOPWORDS]
+
+
+class ProjectSearchIndex:
+    """
+    Índice invertido sobre os campos de texto dos projetos, com ranking BM25.
+    Atualizado incrementalmente: apenas os projetos alterados são reindexados.
+    """
+
+    def __init__(self, k1=1.2, b=0.75):
+        """
+        Inicializa um índice vazio.
+
+        Args:
+            k1: Parâmetro de saturação da frequência do termo (BM25)
+            b: Parâmetro de normalização pelo tamanho do documento (BM25)
+        """
+        self.k1 = k1
+        self.b = b
+        self.version = None
+        self._postings = {}
+        self._doc_terms = {}
+        self._doc_lengths = {}
+        self._doc_hashes = {}
+        self._total_length = 0
+        self._vocabulary = None
+
+    @staticmethod
+    def _document_hash(project):
+        """Hash dos campos indexados, usado para detectar alterações."""
+        content = '\x1f'.join(str(project.get(field) or '') for field in SEARCH_FIELDS)
+        return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+    def _remove(self, key):
+        """Remove um documento do índice."""
+        terms = self._doc_terms.pop(key, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(key, None)
+                if not postings:
+                    del self._postings[term]
+                    self._vocabulary = None
+        self._total_length -= self._doc_lengths.pop(key, 0)
+        self._doc_hashes.pop(key, None)
+
+    def _add(self, key, project, doc_hash):
+        """Indexa um documento."""
+        frequencies = {}
+        for field, weight in SEARCH_FIELDS.items():
+            for term in tokenize(project.get(field)):
+                frequencies[term] = frequencies.get(term, 0) + weight
+
+        for term, frequency in frequencies.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._vocabulary = None
+            postings[key] = frequency
+
+        length = sum(frequencies.values())
+        self._doc_terms[key] = list(frequencies)
+        self._doc_lengths[key] = length
+        self._doc_hashes[key] = doc_hash
+        self._total_length += length
+
+    def upsert(self, project):
+        """
+        Indexa (ou reindexa) um projeto, se seus campos de texto mudaram.
+
+        Args:
+            project: Dicionário do projeto
+        """
+        key = normalize_project_id(project.get('codigo_projeto'))
+        doc_hash = self._document_hash(project)
+        if self._doc_hashes.get(key) == doc_hash:
+            return
+        self._remove(key)
+        self._add(key, project, doc_hash)
+
+    def remove(self, key):
+        """
+        Remove um projeto do índice.
+
+        Args:
+            key: Código do projeto
+        """
+        self._remove(normalize_project_id(key))
+
+    def sync_all(self, projects):
+        """
+        Sincroniza o índice com a lista completa, reindexando apenas o que mudou.
+
+        Args:
+            projects: Lista completa de projetos
+        """
+        seen = set()
+        for project in projects:
+            seen.add(normalize_project_id(project.get('codigo_projeto')))
+            self.upsert(project)
+        for key in list(self._doc_hashes):
+            if key not in seen:
+                self._remove(key)
+
+    def _expand_prefix(self, prefix):
+        """Termos do vocabulário que começam com o prefixo (busca enquanto digita)."""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        terms = []
+        for term in self._vocabulary[start:]:
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        return terms
+
+    def search(self, query):
+        """
+        Busca projetos pelo texto, ordenados por relevância (BM25).
+
+        Args:
+            query: Texto da busca (o último termo também casa como prefixo)
+
+        Returns:
+            list: Tuplas (codigo_projeto, score) em ordem decrescente de score
+        """
+        terms = tokenize(query)
+        if not terms or not self._doc_lengths:
+            return []
+
+        # O último termo pode estar incompleto enquanto o usuário digita
+        query_terms = [[term] for term in terms[:-1]]
+        query_terms.append(self._expand_prefix(terms[-1]) or [terms[-1]])
+
+        total_docs = len(self._doc_lengths)
+        average_length = self._total_length / total_docs if total_docs else 0
+        scores = {}
+
+        for alternatives in query_terms:
+            # Para um termo expandido, cada documento conta apenas a melhor alternativa
+            best = {}
+            for term in alternatives:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (total_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for key, frequency in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[key] / average_length)
+                    score = idf * frequency * (self.k1 + 1) / (frequency + norm)
+                    if score > best.get(key, 0):
+                        best[key] = score
+            for key, score in best.items():
+                scores[key] = scores.get(key, 0) + score
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+_index = ProjectSearchIndex()
+_index_lock = threading.Lock()
+
+
+def _refresh_index(json_client):
+    """
+    Atualiza o índice compartilhado com os dados atuais (chamar com _index_lock).
+
+    Args:
+        json_client: Cliente de dados (JsonDataClient ou SqliteDataClient)
+    """
+    version, changed = json_client.project_changes_since(_index.version)
+    if version == _index.version:
+        return
+
+    if changed is None:
+        # Recarga completa: comparar hashes e reindexar só os projetos alterados
+        _index.sync_all(json_client.get_excel_data(None, 'projetos'))
+    else:
+        for key in changed:
+            project = json_client.get_project_by_id(None, key)
+            if project is None:
+                _index.remove(key)
+            else:
+                _index.upsert(project)
+
+    _index.version = version
+
+
+def search_projects(json_client, query):
+    """
+    Busca projetos no índice compartilhado, atualizado para os dados atuais.
+    A busca roda com o índice travado, para que outra requisição não o altere
+    no meio do cálculo dos scores.
+
+    Args:
+        json_client: Cliente de dados (JsonDataClient ou SqliteDataClient)
+        query: Texto da busca
+
+    Returns:
+        list: Tuplas (codigo_projeto, score) em ordem decrescente de score
+    """
+    with _index_lock:
+        _refresh_index(json_client)
+        return _index.search(query)
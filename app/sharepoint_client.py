@@ -2,40 +2,257 @@ from office365.runtime.auth.user_credential import UserCredential
 from office365.sharepoint.client_context import ClientContext
 from office365.sharepoint.files.file import File
 import pandas as pd
+import requests
+import hashlib
 import io
+import json
 import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from urllib.parse import urlparse
 
+from app.resilience import backoff_delay
+from app.workbook_cache import get_workbook_cache, workbook_version
+from app.write_committer import atomic_write_json
+from config import Config
+
+# Status HTTP que indicam sessão expirada ou credencial recusada
+AUTH_ERROR_STATUS = (401, 403)
+
+
+def is_connection_error(error):
+    """Verifica se o erro (ou algum erro que o originou) é de rede, com o SharePoint inacessível."""
+    while error is not None:
+        if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+# Biblioteca de documentos e nome de cada site, detectados uma vez e válidos por
+# SHAREPOINT_LIBRARY_TTL_SECONDS: {site_url: (biblioteca, nome do site, detectado em)}
+_site_info = {}
+_site_info_lock = threading.Lock()
+
+
+class ResolvedUrlCache:
+    """
+    Caminhos do SharePoint que funcionaram em cada site (por operação e caminho
+    lógico), gravados em disco para que as próximas execuções não precisem
+    testar os caminhos alternativos novamente.
+    """
+    
+    def __init__(self, path):
+        """
+        Args:
+            path: Arquivo JSON do cache (ex.: instance/sharepoint_urls.json)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._urls = self._load()
+    
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    @staticmethod
+    def _key(site_url, kind, path):
+        return f"{site_url.rstrip('/').lower()}|{kind}|{path}"
+    
+    def get(self, site_url, kind, path):
+        """
+        Obtém o caminho memorizado.
+        
+        Args:
+            site_url: URL do site do SharePoint
+            kind: Operação ('download', 'upload' ou 'biblioteca')
+            path: Caminho lógico (ex.: pasta/arquivo.xlsx)
+            
+        Returns:
+            str: URL relativa ao servidor, ou None
+        """
+        with self._lock:
+            return self._urls.get(self._key(site_url, kind, path))
+    
+    def set(self, site_url, kind, path, url):
+        """Memoriza o caminho que funcionou (grava em disco apenas se mudou)."""
+        key = self._key(site_url, kind, path)
+        with self._lock:
+            if self._urls.get(key) == url:
+                return
+            self._urls[key] = url
+            self._save()
+    
+    def discard(self, site_url, kind, path, url=None):
+        """Esquece o caminho memorizado (apenas se for igual a url, quando informada)."""
+        key = self._key(site_url, kind, path)
+        with self._lock:
+            if key not in self._urls or (url is not None and self._urls[key] != url):
+                return
+            del self._urls[key]
+            self._save()
+    
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            atomic_write_json(self.path, self._urls)
+        except OSError as e:
+            print(f"Erro ao gravar o cache de caminhos do SharePoint: {str(e)}")
+
+
+_url_cache = None
+_url_cache_lock = threading.Lock()
+
+
+def get_url_cache():
+    """
+    Obtém o cache de caminhos do SharePoint compartilhado pelo processo.
+    
+    Returns:
+        ResolvedUrlCache: Instância única (arquivo em SHAREPOINT_URL_CACHE_PATH)
+    """
+    global _url_cache
+    with _url_cache_lock:
+        if _url_cache is None:
+            _url_cache = ResolvedUrlCache(Config.SHAREPOINT_URL_CACHE_PATH)
+        return _url_cache
+
+
 class SharePointClient:
+    # Cliente conectado (ver OfflineSharePointClient)
+    offline = False
+    
     def __init__(self, site_url, username, password):
         """Inicializa o cliente do SharePoint com as credenciais do usuário."""
         try:
-            self.credentials = UserCredential(username, password)
-            self.ctx = ClientContext(site_url).with_credentials(self.credentials)
-            
-            # Testar a conexão
-            self.ctx.load(self.ctx.web)
-            self.ctx.execute_query()
-            print(f"Conexão estabelecida com: {site_url}")
-            
-            # Extrair o nome do site do URL
-            parsed_url = urlparse(site_url)
-            path_parts = parsed_url.path.strip('/').split('/')
-            if len(path_parts) >= 2 and path_parts[0] == 'sites':
-                self.site_name = path_parts[1]
-            else:
-                self.site_name = path_parts[-1] if path_parts else ""
-            print(f"Nome do site detectado: {self.site_name}")
-            
-            # Armazenar a URL do site
             self.site_url = site_url
+            self.username = username
+            self.credentials = UserCredential(username, password)
+            self.ctx = None
+            self.authenticated_at = None
+            self.url_cache = get_url_cache()
+            self.workbook_cache = get_workbook_cache()
+            self.chunk_size = int(Config.SHAREPOINT_CHUNK_SIZE_MB * 1024 * 1024)
+            # O ClientContext acumula as consultas pendentes: uma operação por vez
+            self._lock = threading.RLock()
             
-            # Detectar a biblioteca de documentos padrão
-            self.doc_library = self._detect_document_library()
-            print(f"Biblioteca de documentos detectada: {self.doc_library}")
+            self._authenticate()
+            self.doc_library, self.site_name = self._get_site_info()
         except Exception as e:
             raise Exception(f"Erro ao conectar ao SharePoint: {str(e)}")
     
+    def _authenticate(self):
+        """Cria um novo ClientContext autenticado e testa a conexão."""
+        self.authenticated_at = None
+        self.ctx = ClientContext(self.site_url).with_credentials(self.credentials)
+        
+        # Testar a conexão
+        self.ctx.load(self.ctx.web)
+        self.ctx.execute_query()
+        self.authenticated_at = time.monotonic()
+        print(f"Conexão estabelecida com: {self.site_url}")
+    
+    def _ensure_authenticated(self):
+        """Autentica novamente se a sessão passou de SHAREPOINT_AUTH_TTL_SECONDS ou falhou antes."""
+        if self.authenticated_at is None or time.monotonic() - self.authenticated_at > Config.SHAREPOINT_AUTH_TTL_SECONDS:
+            self._authenticate()
+    
+    @staticmethod
+    def _is_auth_error(error):
+        """Verifica se o erro (ou algum erro que o originou) é de sessão expirada."""
+        while error is not None:
+            response = getattr(error, 'response', None)
+            if getattr(response, 'status_code', None) in AUTH_ERROR_STATUS:
+                return True
+            error = error.__cause__ or error.__context__
+        return False
+    
+    @staticmethod
+    def _is_not_found_error(error):
+        """Verifica se o erro (ou algum erro que o originou) é de arquivo ou pasta inexistente (404)."""
+        while error is not None:
+            if getattr(getattr(error, 'response', None), 'status_code', None) == 404:
+                return True
+            error = error.__cause__ or error.__context__
+        return False
+    
+    @classmethod
+    def _is_transient_error(cls, error):
+        """Verifica se vale repetir a operação: sem rede, sessão expirada ou 429/5xx do SharePoint."""
+        if is_connection_error(error) or cls._is_auth_error(error):
+            return True
+        while error is not None:
+            status = getattr(getattr(error, 'response', None), 'status_code', None)
+            if status is not None and (status == 429 or status >= 500):
+                return True
+            error = error.__cause__ or error.__context__
+        return False
+    
+    def _run(self, operation):
+        """
+        Executa uma operação com a sessão válida; se o SharePoint recusar a
+        sessão, autentica novamente e repete a operação uma vez.
+        
+        Args:
+            operation: Função sem argumentos que usa self.ctx
+            
+        Returns:
+            O retorno de operation
+        """
+        with self._lock:
+            self._ensure_authenticated()
+            try:
+                return operation()
+            except Exception as e:
+                if not self._is_auth_error(e):
+                    raise
+                print("Sessão do SharePoint expirada, autenticando novamente...")
+                self._authenticate()
+                return operation()
+    
+    def _get_site_info(self):
+        """
+        Obtém a biblioteca de documentos e o nome do site, detectando-os apenas
+        na primeira conexão ao site ou quando passam de SHAREPOINT_LIBRARY_TTL_SECONDS.
+        
+        Returns:
+            tuple: (biblioteca de documentos, nome do site)
+        """
+        with _site_info_lock:
+            cached = _site_info.get(self.site_url)
+        if cached and time.monotonic() - cached[2] <= Config.SHAREPOINT_LIBRARY_TTL_SECONDS:
+            return cached[0], cached[1]
+        
+        # Extrair o nome do site do URL
+        parsed_url = urlparse(self.site_url)
+        path_parts = parsed_url.path.strip('/').split('/')
+        if len(path_parts) >= 2 and path_parts[0] == 'sites':
+            site_name = path_parts[1]
+        else:
+            site_name = path_parts[-1] if path_parts else ""
+        print(f"Nome do site detectado: {site_name}")
+        
+        # Detectar a biblioteca de documentos padrão
+        doc_library = self._run(self._detect_document_library)
+        print(f"Biblioteca de documentos detectada: {doc_library}")
+        
+        with _site_info_lock:
+            _site_info[self.site_url] = (doc_library, site_name, time.monotonic())
+        return doc_library, site_name
+    
+    def refresh(self):
+        """Renova a sessão e a biblioteca de documentos do site, se expiraram."""
+        with self._lock:
+            self._ensure_authenticated()
+        self.doc_library, self.site_name = self._get_site_info()
+    
     def _detect_document_library(self):
         """Detecta a biblioteca de documentos padrão."""
         try:
@@ -65,137 +282,529 @@ class SharePointClient:
     
     def _get_files_list(self, folder_name):
         """Obtém a lista de arquivos em uma pasta."""
-        conn = self.ctx
-        target_folder_url = f'{self.doc_library}/{folder_name}'
-        root_folder = conn.web.get_folder_by_server_relative_url(target_folder_url)
-        root_folder.expand(["Files", "Folders"]).get().execute_query()
-        return root_folder.files
+        def operation():
+            conn = self.ctx
+            target_folder_url = f'{self.doc_library}/{folder_name}'
+            root_folder = conn.web.get_folder_by_server_relative_url(target_folder_url)
+            root_folder.expand(["Files", "Folders"]).get().execute_query()
+            return root_folder.files
+        return self._run(operation)
     
-    def download_file(self, file_path):
+    def download_file(self, file_path, progress=None):
         """
         Baixa um arquivo do SharePoint usando o caminho relativo.
         
         Args:
             file_path: Caminho relativo do arquivo (pasta/arquivo.xlsx)
+            progress: Função chamada a cada parte baixada com (bytes baixados, tamanho total ou None)
             
         Returns:
             bytes: Conteúdo do arquivo
         """
-        try:
-            # Separar o caminho em pasta e nome do arquivo
-            folder_path = os.path.dirname(file_path)
-            file_name = os.path.basename(file_path)
-            
-            print(f"Baixando arquivo '{file_name}' da pasta '{folder_path}'")
+        with self.download_to_cache(file_path, progress) as (local_path, _):
+            with open(local_path, 'rb') as f:
+                return f.read()
+    
+    def download_file_to(self, file_path, dest_path, progress=None):
+        """
+        Baixa um arquivo do SharePoint direto para o disco, em partes, sem
+        carregá-lo inteiro na memória.
+        
+        Args:
+            file_path: Caminho relativo do arquivo (pasta/arquivo.xlsx)
+            dest_path: Caminho local de destino
+            progress: Função chamada a cada parte baixada com (bytes baixados, tamanho total ou None)
             
-            # Usar a abordagem que funciona em dados_app/office365_api/office365_api.py
-            file_url = f'/sites/{self.site_name}/{self.doc_library}/{folder_path}/{file_name}'
-            print(f"URL do arquivo: {file_url}")
+        Returns:
+            str: Caminho local de destino
+        """
+        with self.download_to_cache(file_path, progress) as (local_path, _):
+            shutil.copyfile(local_path, dest_path)
+        return dest_path
+    
+    @contextmanager
+    def download_to_cache(self, file_path, progress=None):
+        """
+        Garante a cópia local da versão atual do arquivo, baixando-a em partes
+        para o cache apenas se a versão mudou. Usar com with: a cópia fica
+        reservada até o fim do bloco e não é apagada por um download mais novo.
+        
+        Args:
+            file_path: Caminho relativo do arquivo (pasta/arquivo.xlsx)
+            progress: Função chamada a cada parte baixada com (bytes baixados, tamanho total ou None)
             
-            # Baixar o arquivo usando File.open_binary
-            file = File.open_binary(self.ctx, file_url)
+        Yields:
+            tuple: (caminho da cópia local, hash do conteúdo) (ver WorkbookCache)
+        """
+        local_path, content_hash = self._download_to_cache(file_path, progress)
+        try:
+            yield local_path, content_hash
+        finally:
+            self.workbook_cache.release(content_hash)
+    
+    def _download_to_cache(self, file_path, progress=None):
+        """Obtém a cópia local reservada (ver download_to_cache); o chamador a libera."""
+        def operation():
+            # A versão atual (metadados) decide se a cópia local ainda vale
+            properties = self._get_file_properties(file_path)
+            version = workbook_version(properties)
+            local_path, content_hash = self.workbook_cache.get_path(self.site_url, file_path, version)
+            if local_path is not None:
+                print(f"Arquivo lido do cache local (versão inalterada): {file_path}")
+                return local_path, content_hash
             
-            if file and file.content:
-                print(f"Arquivo baixado com sucesso: {file_path}")
-                return file.content
-            else:
-                raise Exception(f"Arquivo vazio ou não encontrado: {file_path}")
+            total = properties.get('file_size') if properties else None
+            chunk_downloaded = (lambda done: progress(done, total)) if progress else None
+            tmp_path = self.workbook_cache.temp_path()
+            try:
+                with open(tmp_path, 'wb') as f:
+                    self._download_file(file_path, f, chunk_downloaded)
+            except Exception:
+                os.remove(tmp_path)
+                raise
+            return self.workbook_cache.put_file(self.site_url, file_path, version, tmp_path)
         
+        try:
+            return self._run(operation)
         except Exception as e:
-            # Tentar abordagem alternativa com caminhos diferentes
+            if not is_connection_error(e):
+                raise
+            # SharePoint inacessível: usar a última cópia baixada (somente leitura)
+            local_path, entry = self.workbook_cache.latest_path(self.site_url, file_path)
+            if local_path is None:
+                raise
+            print(f"SharePoint inacessível; usando a cópia local de {entry['cached_at']}: {file_path}")
+            return local_path, entry['sha256']
+    
+    def _download_file(self, file_path, file_object, chunk_downloaded=None):
+        """Grava o arquivo em file_object (ver download_file), tentando os caminhos alternativos."""
+        # Separar o caminho em pasta e nome do arquivo
+        folder_path = os.path.dirname(file_path)
+        file_name = os.path.basename(file_path)
+        
+        print(f"Baixando arquivo '{file_name}' da pasta '{folder_path}'")
+        
+        # Caminho que funcionou da última vez e, depois, o formato usado em
+        # dados_app/office365_api/office365_api.py
+        primary_urls = [
+            self.url_cache.get(self.site_url, 'download', file_path),
+            f'/sites/{self.site_name}/{self.doc_library}/{folder_path}/{file_name}'
+        ]
+        tried = []
+        first_error = None
+        for file_url in dict.fromkeys(url for url in primary_urls if url):
+            tried.append(file_url)
             try:
-                print("Tentando abordagem alternativa...")
-                
-                # Tentar construir diferentes URLs possíveis, começando com o formato que funcionou para upload
-                possible_urls = [
-                    f'/sites/{self.site_name}/Documentos Compartilhados/{folder_path}/{file_name}',
-                    f'/sites/{self.site_name}/Shared Documents/{folder_path}/{file_name}',
-                    f'/sites/{self.site_name}/Documents/{folder_path}/{file_name}',
-                    f'/sites/{self.site_name}/Documentos/{folder_path}/{file_name}',
-                    f'{self.doc_library}/{folder_path}/{file_name}',
-                    f'{self.doc_library}/{file_path}',
-                    f'Shared Documents/{file_path}',
-                    f'Documents/{file_path}',
-                    f'Documentos Compartilhados/{file_path}',
-                    f'Documentos/{file_path}'
-                ]
-                
-                for url in possible_urls:
-                    try:
-                        print(f"Tentando URL: {url}")
-                        file = File.open_binary(self.ctx, url)
-                        if file and file.content:
-                            print(f"Arquivo baixado com sucesso usando URL: {url}")
-                            return file.content
-                    except Exception as url_error:
-                        print(f"Falha com URL {url}: {str(url_error)}")
-                        continue
-                
-                raise Exception(f"Todas as tentativas de download falharam para: {file_path}")
-            except Exception as alt_error:
-                raise Exception(f"Erro ao baixar arquivo: {str(e)} / Alternativa: {str(alt_error)}")
+                print(f"URL do arquivo: {file_url}")
+                return self._download_from(file_path, file_url, file_object, chunk_downloaded)
+            except Exception as e:
+                # Sessão expirada, sem rede ou limite de requisições (429/5xx): os caminhos
+                # alternativos falhariam pelo mesmo motivo e a URL conhecida continua válida
+                if self._is_transient_error(e):
+                    raise
+                print(f"Falha com URL {file_url}: {str(e)}")
+                if self._is_not_found_error(e):
+                    self.url_cache.discard(self.site_url, 'download', file_path, file_url)
+                first_error = first_error or e
+        
+        print("Tentando abordagem alternativa...")
+        try:
+            # Localizar o arquivo listando a pasta a partir da URL real da biblioteca
+            file_url = self._find_file_in_folder(folder_path, file_name)
+            if file_url and file_url not in tried:
+                tried.append(file_url)
+                return self._download_from(file_path, file_url, file_object, chunk_downloaded)
+        except Exception as e:
+            if self._is_transient_error(e):
+                raise
+            print(f"Falha ao localizar o arquivo pela listagem da pasta: {str(e)}")
+            if self._is_not_found_error(e):
+                self.url_cache.discard(self.site_url, 'biblioteca', self.doc_library)
+        
+        # Último recurso: verificar os caminhos conhecidos em paralelo
+        possible_urls = [
+            f'/sites/{self.site_name}/Documentos Compartilhados/{folder_path}/{file_name}',
+            f'/sites/{self.site_name}/Shared Documents/{folder_path}/{file_name}',
+            f'/sites/{self.site_name}/Documents/{folder_path}/{file_name}',
+            f'/sites/{self.site_name}/Documentos/{folder_path}/{file_name}',
+            f'{self.doc_library}/{folder_path}/{file_name}',
+            f'{self.doc_library}/{file_path}',
+            f'Shared Documents/{file_path}',
+            f'Documents/{file_path}',
+            f'Documentos Compartilhados/{file_path}',
+            f'Documentos/{file_path}'
+        ]
+        file_url = self._probe_urls([url for url in possible_urls if url not in tried], self._file_exists)
+        if file_url:
+            return self._download_from(file_path, file_url, file_object, chunk_downloaded)
+        
+        raise Exception(f"Erro ao baixar arquivo: {str(first_error)} / Alternativa: "
+                        f"Todas as tentativas de download falharam para: {file_path}") from first_error
+    
+    def _download_from(self, file_path, file_url, file_object, chunk_downloaded=None):
+        """Grava em partes o arquivo da URL informada em file_object e memoriza a URL que funcionou."""
+        try:
+            file = self.ctx.web.get_file_by_server_relative_path(file_url)
+            file.download_session(file_object, chunk_downloaded, self.chunk_size).execute_query()
+        except Exception:
+            # Descartar as consultas pendentes da tentativa que falhou
+            self.ctx.clear()
+            raise
+        if file_object.tell() == 0:
+            raise Exception(f"Arquivo vazio ou não encontrado: {file_path}")
+        
+        self.url_cache.set(self.site_url, 'download', file_path, file_url)
+        print(f"Arquivo baixado com sucesso usando URL: {file_url}")
+    
+    def get_file_properties(self, file_path):
+        """
+        Obtém os metadados de um arquivo sem baixá-lo (os mesmos campos de
+        office365_api.SharePoint.get_file_properties_from_folder, mais o ETag).
+        
+        Args:
+            file_path: Caminho relativo do arquivo (pasta/arquivo.xlsx)
+            
+        Returns:
+            dict: Metadados do arquivo, ou None se o arquivo não foi localizado
+        """
+        return self._run(lambda: self._get_file_properties(file_path))
+    
+    def _get_file_properties(self, file_path):
+        """Consulta os metadados pelo caminho memorizado no último download ou pelo caminho padrão."""
+        folder_path = os.path.dirname(file_path)
+        file_name = os.path.basename(file_path)
+        file_url = (self.url_cache.get(self.site_url, 'download', file_path)
+                    or f'/sites/{self.site_name}/{self.doc_library}/{folder_path}/{file_name}')
+        try:
+            file = self.ctx.web.get_file_by_server_relative_path(file_url).get().execute_query()
+        except Exception as e:
+            if self._is_auth_error(e):
+                raise
+            print(f"Metadados indisponíveis para {file_path}: {str(e)}")
+            return None
+        
+        return {
+            'file_id': file.unique_id,
+            'file_name': file.name,
+            'major_version': file.major_version,
+            'minor_version': file.minor_version,
+            'file_size': file.length,
+            'time_last_modified': str(file.time_last_modified),
+            'etag': file.properties.get('ETag')
+        }
     
-    def upload_file(self, file_content, file_path):
+    def upload_file(self, file_content, file_path, progress=None):
         """
-        Faz upload de um arquivo para o SharePoint.
+        Faz upload de um arquivo para o SharePoint. Arquivos maiores que
+        SHAREPOINT_CHUNK_SIZE_MB são enviados em partes (ver upload_file_from_path).
         
         Args:
             file_content: Conteúdo do arquivo em bytes
             file_path: Caminho relativo de destino no SharePoint (pasta/arquivo.xlsx)
+            progress: Função chamada a cada parte enviada com (bytes enviados, tamanho total)
             
         Returns:
             bool: True se o upload for bem-sucedido
         """
-        try:
-            # Separar o caminho em pasta e nome do arquivo
-            folder_path = os.path.dirname(file_path)
-            file_name = os.path.basename(file_path)
-            
-            print(f"Fazendo upload de '{file_name}' para a pasta '{folder_path}'")
-            
-            # Usar a mesma abordagem que é usada em dados_app/office365_api/office365_api.py
-            target_folder_url = f'/sites/{self.site_name}/{self.doc_library}'
-            if folder_path:
-                target_folder_url += f'/{folder_path}'
-            
-            # Obter a pasta e fazer upload do arquivo
-            target_folder = self.ctx.web.get_folder_by_server_relative_path(target_folder_url)
-            target_folder.upload_file(file_name, file_content).execute_query()
+        if len(file_content) > self.chunk_size:
+            return self._upload_stream(io.BytesIO(file_content), len(file_content), file_path, progress)
+        
+        result = self._run(lambda: self._upload_file(file_content, file_path))
+        if progress:
+            progress(len(file_content), len(file_content))
+        return result
+    
+    def upload_file_from_path(self, local_path, file_path, progress=None):
+        """
+        Faz upload de um arquivo local para o SharePoint. Acima de
+        SHAREPOINT_CHUNK_SIZE_MB o arquivo é lido e enviado em partes, sem ser
+        carregado inteiro na memória; se a conexão cair, apenas a parte em
+        andamento é enviada novamente.
+        
+        Args:
+            local_path: Caminho do arquivo local
+            file_path: Caminho relativo de destino no SharePoint (pasta/arquivo.xlsx)
+            progress: Função chamada a cada parte enviada com (bytes enviados, tamanho total)
             
-            print(f"Upload concluído com sucesso: {file_path}")
-            return True
+        Returns:
+            bool: True se o upload for bem-sucedido
+        """
+        size = os.path.getsize(local_path)
+        with open(local_path, 'rb') as f:
+            if size <= self.chunk_size:
+                return self.upload_file(f.read(), file_path, progress)
+            return self._upload_stream(f, size, file_path, progress)
+    
+    def _upload_file(self, file_content, file_path):
+        """Faz o upload do arquivo (ver upload_file), tentando os caminhos alternativos."""
+        # Separar o caminho em pasta e nome do arquivo
+        folder_path = os.path.dirname(file_path)
+        file_name = os.path.basename(file_path)
+        
+        print(f"Fazendo upload de '{file_name}' para a pasta '{folder_path}'")
+        
+        # Pasta que funcionou da última vez e, depois, a mesma abordagem que é
+        # usada em dados_app/office365_api/office365_api.py
+        suffix = f'/{folder_path}' if folder_path else ''
+        primary_urls = [
+            self.url_cache.get(self.site_url, 'upload', folder_path),
+            f'/sites/{self.site_name}/{self.doc_library}{suffix}'
+        ]
+        tried = []
+        first_error = None
+        for folder_url in dict.fromkeys(url for url in primary_urls if url):
+            tried.append(folder_url)
+            try:
+                return self._upload_to(file_content, file_path, folder_url)
+            except Exception as e:
+                # Sessão expirada, sem rede ou limite de requisições (429/5xx): os caminhos
+                # alternativos falhariam pelo mesmo motivo e a URL conhecida continua válida
+                if self._is_transient_error(e):
+                    raise
+                print(f"Falha com URL {folder_url}: {str(e)}")
+                if self._is_not_found_error(e):
+                    self.url_cache.discard(self.site_url, 'upload', folder_path, folder_url)
+                first_error = first_error or e
+        
+        print("Tentando abordagem alternativa para upload...")
+        try:
+            # Pasta a partir da URL real da biblioteca (o título pode diferir da URL)
+            folder_url = self._library_root_url() + suffix
+            if folder_url not in tried:
+                tried.append(folder_url)
+                return self._upload_to(file_content, file_path, folder_url)
+        except Exception as e:
+            if self._is_transient_error(e):
+                raise
+            print(f"Falha com a URL da biblioteca: {str(e)}")
+            if self._is_not_found_error(e):
+                self.url_cache.discard(self.site_url, 'biblioteca', self.doc_library)
+        
+        # Último recurso: verificar as pastas conhecidas em paralelo e enviar para a primeira existente
+        possible_urls = self._alternative_upload_folders(suffix)
+        folder_url = self._probe_urls([url for url in possible_urls if url not in tried], self._folder_exists)
+        if folder_url:
+            return self._upload_to(file_content, file_path, folder_url)
+        
+        raise Exception(f"Erro ao fazer upload: {str(first_error)} / Alternativa: Todas as tentativas de upload falharam") from first_error
+    
+    def _alternative_upload_folders(self, suffix):
+        """Pastas de destino alternativas (bibliotecas com os nomes mais comuns)."""
+        return [
+            f'/sites/{self.site_name}/Shared Documents{suffix}',
+            f'/sites/{self.site_name}/Documents{suffix}',
+            f'/sites/{self.site_name}/Documentos Compartilhados{suffix}',
+            f'/sites/{self.site_name}/Documentos{suffix}',
+            f'/{self.doc_library}{suffix}'
+        ]
+    
+    def _upload_stream(self, file_object, size, file_path, progress=None):
+        """Envia o arquivo em partes (ver upload_file_from_path)."""
+        folder_path = os.path.dirname(file_path)
+        file_name = os.path.basename(file_path)
+        
+        print(f"Fazendo upload de '{file_name}' para a pasta '{folder_path}' em partes "
+              f"de {self.chunk_size // (1024 * 1024)} MB ({size / (1024 * 1024):.1f} MB)")
+        
+        with self._lock:
+            self._ensure_authenticated()
+            folder_url = self._resolve_upload_folder(folder_path)
+            self._upload_in_chunks(file_object, size, folder_url, file_name, progress)
+        
+        self.url_cache.set(self.site_url, 'upload', folder_path, folder_url)
+        print(f"Upload concluído com sucesso usando URL: {folder_url}")
+        return True
+    
+    def _resolve_upload_folder(self, folder_path):
+        """
+        Localiza a pasta de destino de um upload sem enviar o arquivo: a pasta
+        memorizada ou, se ela não existir mais, a primeira pasta candidata existente.
+        
+        Returns:
+            str: URL relativa ao servidor da pasta
+        """
+        suffix = f'/{folder_path}' if folder_path else ''
+        cached_url = self.url_cache.get(self.site_url, 'upload', folder_path)
+        if cached_url and self._exists_quietly(self._folder_exists, cached_url):
+            return cached_url
+        
+        candidates = [f'/sites/{self.site_name}/{self.doc_library}{suffix}']
+        try:
+            candidates.append(self._library_root_url() + suffix)
         except Exception as e:
-            # Tentar abordagem alternativa
+            if self._is_transient_error(e):
+                raise
+            print(f"Falha com a URL da biblioteca: {str(e)}")
+        
+        folder_url = self._probe_urls(candidates + self._alternative_upload_folders(suffix), self._folder_exists)
+        if not folder_url:
+            raise Exception(f"Erro ao fazer upload: pasta de destino não encontrada: {folder_path}")
+        return folder_url
+    
+    def _upload_in_chunks(self, file_object, size, folder_url, file_name, progress=None):
+        """
+        Envia o arquivo por uma sessão de upload do SharePoint (StartUpload,
+        ContinueUpload e FinishUpload), como em office365_api.SharePoint.upload_file_in_chunks,
+        repetindo apenas a parte que falhou.
+        
+        Args:
+            file_object: Arquivo aberto em modo binário (posicionável)
+            size: Tamanho total em bytes (maior que uma parte)
+            folder_url: URL relativa ao servidor da pasta de destino
+            file_name: Nome do arquivo de destino
+            progress: Função chamada a cada parte enviada com (bytes enviados, tamanho total)
+        """
+        file_url = f'{folder_url}/{file_name}'
+        
+        # A sessão de upload precisa que o arquivo exista; um arquivo existente
+        # mantém o conteúdo atual até a última parte ser enviada
+        created = False
+        if not self._exists_quietly(self._file_exists, file_url):
+            folder = self.ctx.web.get_folder_by_server_relative_path(folder_url)
+            folder.files.add(file_name, b'', True).execute_query()
+            created = True
+        
+        upload_id = str(uuid.uuid4())
+        offset = 0
+        try:
+            while offset < size:
+                file_object.seek(offset)
+                chunk = file_object.read(self.chunk_size)
+                self._send_chunk(file_url, upload_id, offset, chunk, offset + len(chunk) >= size)
+                offset += len(chunk)
+                if progress:
+                    progress(offset, size)
+        except Exception:
+            # Descartar as partes já enviadas; o conteúdo anterior do arquivo é mantido
             try:
-                print("Tentando abordagem alternativa para upload...")
-                
-                # Tentar com diferentes caminhos de pasta
-                possible_urls = [
-                    f'/sites/{self.site_name}/{self.doc_library}',
-                    f'/sites/{self.site_name}/Shared Documents',
-                    f'/sites/{self.site_name}/Documents',
-                    f'/sites/{self.site_name}/Documentos Compartilhados',
-                    f'/sites/{self.site_name}/Documentos',
-                    f'/{self.doc_library}'
-                ]
-                
-                if folder_path:
-                    possible_urls = [f"{url}/{folder_path}" for url in possible_urls]
-                
-                for url in possible_urls:
-                    try:
-                        print(f"Tentando URL: {url}")
-                        target_folder = self.ctx.web.get_folder_by_server_relative_path(url)
-                        target_folder.upload_file(file_name, file_content).execute_query()
-                        print(f"Upload concluído com sucesso usando URL: {url}")
-                        return True
-                    except Exception as url_error:
-                        print(f"Falha com URL {url}: {str(url_error)}")
-                        continue
-                
-                raise Exception("Todas as tentativas de upload falharam")
-            except Exception as alt_error:
-                raise Exception(f"Erro ao fazer upload: {str(e)} / Alternativa: {str(alt_error)}")
+                self.ctx.web.get_file_by_server_relative_path(file_url).cancel_upload(upload_id).execute_query()
+            except Exception as cancel_error:
+                self.ctx.clear()
+                print(f"Falha ao cancelar a sessão de upload: {str(cancel_error)}")
+            # Remover o arquivo vazio criado para a sessão, para não deixar uma planilha
+            # de 0 bytes no lugar do arquivo
+            if created:
+                try:
+                    self.ctx.web.get_file_by_server_relative_path(file_url).delete_object().execute_query()
+                except Exception as delete_error:
+                    self.ctx.clear()
+                    print(f"Falha ao remover o arquivo vazio {file_url}: {str(delete_error)}")
+            raise
+    
+    def _send_chunk(self, file_url, upload_id, offset, chunk, is_last):
+        """Envia uma parte da sessão de upload, com novas tentativas em falhas temporárias."""
+        for attempt in range(Config.SHAREPOINT_UPLOAD_RETRIES + 1):
+            try:
+                file = self.ctx.web.get_file_by_server_relative_path(file_url)
+                if offset == 0:
+                    file.start_upload(upload_id, chunk)
+                elif is_last:
+                    file.finish_upload(upload_id, offset, chunk)
+                else:
+                    file.continue_upload(upload_id, offset, chunk)
+                self.ctx.execute_query()
+                return
+            except Exception as e:
+                self.ctx.clear()
+                if attempt >= Config.SHAREPOINT_UPLOAD_RETRIES or not self._is_transient_error(e):
+                    raise
+                delay = backoff_delay(attempt, base_delay=1.0, max_delay=30.0)
+                print(f"Falha ao enviar a parte a partir do byte {offset} ({str(e)}); nova tentativa em {delay:.1f}s")
+                time.sleep(delay)
+                if self._is_auth_error(e):
+                    self._authenticate()
+    
+    def _exists_quietly(self, exists, url):
+        """Executa a verificação de existência tratando erros (exceto sessão expirada, rede e 429/5xx) como inexistente."""
+        try:
+            return exists(url)
+        except Exception as e:
+            if self._is_transient_error(e):
+                raise
+            return False
+    
+    def _upload_to(self, file_content, file_path, folder_url):
+        """Envia o arquivo para a pasta informada e memoriza a pasta que funcionou."""
+        print(f"Tentando URL: {folder_url}")
+        target_folder = self.ctx.web.get_folder_by_server_relative_path(folder_url)
+        target_folder.upload_file(os.path.basename(file_path), file_content).execute_query()
+        
+        self.url_cache.set(self.site_url, 'upload', os.path.dirname(file_path), folder_url)
+        print(f"Upload concluído com sucesso usando URL: {folder_url}")
+        return True
+    
+    def _library_root_url(self):
+        """
+        URL relativa ao servidor da pasta raiz da biblioteca de documentos
+        (ex.: '/sites/Site/Shared Documents' para a biblioteca 'Documentos').
+        """
+        root_url = self.url_cache.get(self.site_url, 'biblioteca', self.doc_library)
+        if root_url:
+            return root_url
+        
+        root_folder = self.ctx.web.lists.get_by_title(self.doc_library).root_folder
+        root_folder.get().execute_query()
+        root_url = root_folder.server_relative_url.rstrip('/')
+        self.url_cache.set(self.site_url, 'biblioteca', self.doc_library, root_url)
+        return root_url
+    
+    def _find_file_in_folder(self, folder_path, file_name):
+        """
+        Localiza um arquivo listando a pasta (uma consulta em vez de uma por caminho candidato).
+        
+        Returns:
+            str: URL relativa ao servidor do arquivo, ou None se não estiver na pasta
+        """
+        folder_url = self._library_root_url() + (f'/{folder_path}' if folder_path else '')
+        folder = self.ctx.web.get_folder_by_server_relative_path(folder_url)
+        folder.expand(["Files"]).get().execute_query()
+        
+        for file in folder.files:
+            if file.name.lower() == file_name.lower():
+                return file.server_relative_url
+        return None
+    
+    def _file_exists(self, url):
+        """Verifica se o arquivo existe (usa um contexto próprio; pode rodar em paralelo)."""
+        ctx = self.ctx.clone(self.site_url)
+        file = ctx.web.get_file_by_server_relative_path(url).get().execute_query()
+        return file.exists is not False
+    
+    def _folder_exists(self, url):
+        """Verifica se a pasta existe (usa um contexto próprio; pode rodar em paralelo)."""
+        ctx = self.ctx.clone(self.site_url)
+        folder = ctx.web.get_folder_by_server_relative_path(url).get().execute_query()
+        return folder.exists is not False
+    
+    def _probe_urls(self, urls, exists):
+        """
+        Verifica em paralelo quais caminhos existem.
+        
+        Args:
+            urls: Caminhos candidatos, em ordem de preferência
+            exists: Função que recebe um caminho e retorna True se ele existe
+            
+        Returns:
+            str: Primeiro caminho existente na ordem informada, ou None
+        """
+        if not urls:
+            return None
+        
+        def check(url):
+            try:
+                return exists(url)
+            except Exception:
+                return False
+        
+        urls = list(dict.fromkeys(urls))
+        print(f"Verificando {len(urls)} caminhos alternativos em paralelo...")
+        with ThreadPoolExecutor(max_workers=min(len(urls), Config.SHAREPOINT_PROBE_WORKERS)) as executor:
+            found = list(executor.map(check, urls))
+        
+        url = next((url for url, ok in zip(urls, found) if ok), None)
+        if url is None:
+            print("Nenhum caminho alternativo encontrado")
+        return url
     
     def get_excel_data(self, file_path, sheet_name):
         """
@@ -209,12 +818,10 @@ class SharePointClient:
             list: Lista de dicionários com os dados da planilha
         """
         try:
-            # Baixar o arquivo
-            file_content = self.download_file(file_path)
-            
-            # Usar pandas para ler o Excel
-            excel_file = io.BytesIO(file_content)
-            df = pd.read_excel(excel_file, sheet_name=sheet_name)
+            # Baixar o arquivo para o cache local e usar pandas para ler o Excel
+            # (cada versão da planilha é lida uma única vez)
+            with self.download_to_cache(file_path) as (local_path, content_hash):
+                df = self.workbook_cache.read_excel(local_path, content_hash, sheet_name)
             
             # Converter para lista de dicionários
             records = df.to_dict('records')
@@ -238,44 +845,41 @@ class SharePointClient:
             bool: True se a atualização for bem-sucedida
         """
         try:
-            # Baixar o arquivo
-            file_content = self.download_file(file_path)
-            
-            # Ler todas as abas do Excel
-            excel_file = io.BytesIO(file_content)
-            xlsx = pd.ExcelFile(excel_file)
-            sheet_names = xlsx.sheet_names
-            
-            # Criar um buffer para o novo arquivo
-            output = io.BytesIO()
-            
-            # Criar um escritor Excel
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                # Processar cada aba
-                for sheet in sheet_names:
-                    # Ler a aba atual
-                    df = pd.read_excel(excel_file, sheet_name=sheet)
-                    
-                    # Se for a aba que queremos atualizar
-                    if sheet == sheet_name:
-                        if isinstance(data, dict) and id_column is not None:
-                            # Atualizar um registro específico
-                            idx = df[df[id_column] == data[id_column]].index
-                            if len(idx) > 0:
-                                # Atualizar registro existente
-                                for key, value in data.items():
-                                    df.loc[idx[0], key] = value
+            # Baixar o arquivo para o cache local (reservado enquanto as abas são lidas)
+            with self.download_to_cache(file_path) as (local_path, content_hash):
+                # Ler todas as abas do Excel
+                sheet_names = list(self.workbook_cache.read_workbook(local_path, content_hash))
+                
+                # Criar um buffer para o novo arquivo
+                output = io.BytesIO()
+                
+                # Criar um escritor Excel
+                with pd.ExcelWriter(output, engine='openpyxl') as writer:
+                    # Processar cada aba
+                    for sheet in sheet_names:
+                        # Ler a aba atual
+                        df = self.workbook_cache.read_excel(local_path, content_hash, sheet)
+                        
+                        # Se for a aba que queremos atualizar
+                        if sheet == sheet_name:
+                            if isinstance(data, dict) and id_column is not None:
+                                # Atualizar um registro específico
+                                idx = df[df[id_column] == data[id_column]].index
+                                if len(idx) > 0:
+                                    # Atualizar registro existente
+                                    for key, value in data.items():
+                                        df.loc[idx[0], key] = value
+                                else:
+                                    # Adicionar novo registro
+                                    df = pd.concat([df, pd.DataFrame([data])], ignore_index=True)
+                            elif isinstance(data, list):
+                                # Substituir todos os dados
+                                df = pd.DataFrame(data)
                             else:
-                                # Adicionar novo registro
-                                df = pd.concat([df, pd.DataFrame([data])], ignore_index=True)
-                        elif isinstance(data, list):
-                            # Substituir todos os dados
-                            df = pd.DataFrame(data)
-                        else:
-                            raise ValueError("Formato de dados inválido para atualização")
-                    
-                    # Salvar a aba no novo arquivo
-                    df.to_excel(writer, sheet_name=sheet, index=False)
+                                raise ValueError("Formato de dados inválido para atualização")
+                        
+                        # Salvar a aba no novo arquivo
+                        df.to_excel(writer, sheet_name=sheet, index=False)
             
             # Obter o conteúdo atualizado
             output.seek(0)
@@ -309,3 +913,88 @@ class SharePointClient:
             return None
         except Exception as e:
             raise Exception(f"Erro ao obter categorização: {str(e)}")
+
+
+class OfflineSharePointClient(SharePointClient):
+    """
+    Cliente somente leitura usado quando o SharePoint está inacessível: serve a
+    última cópia baixada de cada arquivo (ver WorkbookCache) e recusa uploads.
+    """
+    offline = True
+    
+    def __init__(self, site_url):
+        """
+        Args:
+            site_url: URL do site do SharePoint cujas cópias locais serão usadas
+        """
+        self.site_url = site_url
+        self.workbook_cache = get_workbook_cache()
+    
+    @classmethod
+    def from_cache(cls, site_url, file_path):
+        """
+        Cria o cliente se houver uma cópia local do arquivo informado.
+        
+        Returns:
+            OfflineSharePointClient: Cliente somente leitura, ou None sem cópia local
+        """
+        client = cls(site_url)
+        return client if client.workbook_cache.latest_entry(site_url, file_path) else None
+    
+    def get_file_properties(self, file_path):
+        """Metadados da última versão baixada do arquivo."""
+        entry = self.workbook_cache.latest_entry(self.site_url, file_path)
+        return entry['version'] if entry else None
+    
+    def _download_to_cache(self, file_path, progress=None):
+        """Obtém a última cópia baixada do arquivo (reservada, ver download_to_cache)."""
+        local_path, entry = self.workbook_cache.latest_path(self.site_url, file_path)
+        if local_path is None:
+            raise Exception(f"SharePoint inacessível e sem cópia local de: {file_path}")
+        print(f"SharePoint inacessível; usando a cópia local de {entry['cached_at']}: {file_path}")
+        return local_path, entry['sha256']
+    
+    def upload_file(self, file_content, file_path, progress=None):
+        """Uploads não são possíveis sem conexão."""
+        raise Exception("SharePoint inacessível: modo somente leitura, o upload não foi realizado")
+    
+    def upload_file_from_path(self, local_path, file_path, progress=None):
+        """Uploads não são possíveis sem conexão."""
+        raise Exception("SharePoint inacessível: modo somente leitura, o upload não foi realizado")
+
+
+_pool = {}
+_pool_lock = threading.Lock()
+
+
+def get_sharepoint_client(site_url, username, password):
+    """
+    Obtém o cliente do SharePoint compartilhado pelo processo para o site e o
+    usuário informados, reaproveitando a sessão autenticada entre as requisições.
+    
+    Args:
+        site_url: URL do site do SharePoint
+        username: Nome de usuário do SharePoint
+        password: Senha do SharePoint (uma senha diferente cria um novo cliente)
+        
+    Returns:
+        SharePointClient: Cliente autenticado
+    """
+    key = (site_url.rstrip('/').lower(), username.lower())
+    password_hash = hashlib.sha256(password.encode('utf-8')).hexdigest()
+    with _pool_lock:
+        pooled = _pool.get(key)
+        if pooled is not None and pooled[0] == password_hash:
+            client = pooled[1]
+        else:
+            client = SharePointClient(site_url, username, password)
+            _pool[key] = (password_hash, client)
+    try:
+        client.refresh()
+    except Exception as e:
+        # Credencial recusada: o cliente sai do pool e a próxima conexão começa do zero
+        with _pool_lock:
+            if _pool.get(key, (None, None))[1] is client:
+                del _pool[key]
+        raise Exception(f"Erro ao conectar ao SharePoint: {str(e)}")
+    return client
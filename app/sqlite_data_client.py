@@ -0,0 +1,565 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+
+from app.categorization import is_categorized, to_legacy, to_project_fields
+from app.log_store import LogStore
+from app.project_store import normalize_project_id
+from app.suggestion_store import SuggestionStore
+from app.taxonomy import get_taxonomy
+from config import Config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projetos (
+    codigo_projeto TEXT PRIMARY KEY,
+    id_projeto TEXT,
+    posicao INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_projetos_id_projeto ON projetos (id_projeto);
+CREATE INDEX IF NOT EXISTS idx_projetos_posicao ON projetos (posicao);
+
+CREATE TABLE IF NOT EXISTS logs (
+    id INTEGER PRIMARY KEY,
+    id_projeto TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_logs_id_projeto ON logs (id_projeto);
+
+CREATE TABLE IF NOT EXISTS ai_suggestions (
+    project_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS ai_suggestions_history (
+    id INTEGER PRIMARY KEY,
+    project_id TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ai_suggestions_history_project_id ON ai_suggestions_history (project_id);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('data_version', 0);
+"""
+
+# Gatilhos que incrementam a versão dos dados a cada alteração nos projetos
+for _event in ('INSERT', 'UPDATE', 'DELETE'):
+    SCHEMA += f"""
+CREATE TRIGGER IF NOT EXISTS trg_projetos_{_event.lower()}_version AFTER {_event} ON projetos
+BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'data_version';
+END;
+"""
+
+
+class SqliteDataClient:
+    """
+    Cliente de dados baseado em SQLite (modo WAL).
+    Implementa a mesma interface do JsonDataClient, mas cada gravação
+    atualiza apenas a linha afetada em vez de reescrever o arquivo inteiro.
+    """
+
+    _local = threading.local()
+
+    def __init__(self, db_path=None, data_dir='app/data'):
+        """
+        Inicializa o cliente SQLite.
+
+        Args:
+            db_path: Caminho do arquivo do banco (padrão: instance/data.db)
+            data_dir: Pasta com o aia.json usado para as listas de categorias
+        """
+        self.db_path = db_path or os.path.join('instance', 'data.db')
+        self.data_dir = data_dir
+        self._ensure_schema()
+
+    def _connect(self):
+        """Obtém a conexão da thread atual, criando-a se necessário."""
+        connections = getattr(self._local, 'connections', None)
+        if connections is None:
+            connections = self._local.connections = {}
+
+        conn = connections.get(self.db_path)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            connections[self.db_path] = conn
+        return conn
+
+    def _ensure_schema(self):
+        """Cria as tabelas e índices se ainda não existirem."""
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        conn.commit()
+
+        # Bancos antigos têm a tabela categorias: incorporá-la aos projetos e removê-la
+        legacy = conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'categorias'"
+        ).fetchone()
+        if legacy:
+            with conn:
+                categorias = [json.loads(row[0]) for row in conn.execute('SELECT data FROM categorias')]
+                self._merge_legacy_categorias(conn, categorias)
+                conn.execute('DROP TABLE categorias')
+
+    def _merge_legacy_categorias(self, conn, categorias):
+        """Grava categorizações antigas nos projetos que ainda não têm categorização."""
+        for categoria in categorias:
+            key = normalize_project_id(categoria.get('id_projeto'))
+            row = conn.execute('SELECT data FROM projetos WHERE codigo_projeto = ?', (key,)).fetchone()
+            if row is None:
+                continue
+            if not is_categorized(json.loads(row[0])):
+                self._update_project(conn, key, to_project_fields(categoria))
+
+    @staticmethod
+    def _dumps(data):
+        return json.dumps(data, ensure_ascii=False)
+
+    def _select_data(self, query, params=()):
+        """Executa uma consulta e retorna a coluna data decodificada."""
+        rows = self._connect().execute(query, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def data_version(self):
+        """
+        Obtém a versão atual dos projetos (e de suas categorizações), usada para invalidar índices derivados.
+
+        Returns:
+            int: Contador incrementado pelos gatilhos a cada alteração
+        """
+        row = self._connect().execute("SELECT value FROM meta WHERE key = 'data_version'").fetchone()
+        return row[0] if row else 0
+
+    def project_changes_since(self, version):
+        """
+        Obtém os projetos alterados desde uma versão, para atualização incremental de índices.
+
+        Args:
+            version: Versão observada anteriormente (None se nunca observada)
+
+        Returns:
+            tuple: (versão atual, None) - o banco não guarda quais linhas mudaram,
+                   então o índice compara os projetos pelo hash do conteúdo
+        """
+        return self.data_version(), None
+
+    def get_excel_data(self, file_path, sheet_name):
+        """
+        Emula o comportamento do método get_excel_data do SharePointClient,
+        mas usando o banco SQLite.
+
+        Args:
+            file_path: Ignorado, mantido para compatibilidade
+            sheet_name: Nome da "aba" (tipo de dados) a ser carregada
+
+        Returns:
+            list: Lista de dicionários com os dados solicitados
+        """
+        try:
+            if sheet_name == 'projetos':
+                return self._select_data('SELECT data FROM projetos ORDER BY posicao')
+
+            elif sheet_name == 'categorias':
+                # Visão derivada dos projetos categorizados, no formato antigo do categorias.json
+                projects = self._select_data('SELECT data FROM projetos ORDER BY posicao')
+                return [to_legacy(project) for project in projects if is_categorized(project)]
+
+            elif sheet_name == 'logs':
+                return self._select_data('SELECT data FROM logs ORDER BY id')
+
+            elif sheet_name == 'categorias_lists':
+                return self.get_categories_lists()
+
+            else:
+                raise ValueError(f"Tipo de dados desconhecido: {sheet_name}")
+
+        except Exception as e:
+            raise Exception(f"Erro ao ler dados SQLite: {str(e)}")
+
+    def get_taxonomy(self):
+        """
+        Obtém a taxonomia pré-calculada do aia.json (recalculada apenas quando o arquivo muda).
+
+        Returns:
+            Taxonomy: Árvore de categorias, listas ordenadas e índices reversos
+        """
+        # A taxonomia continua vindo do aia.json, que não faz parte do banco
+        return get_taxonomy(os.path.join(self.data_dir, 'aia.json'))
+
+    def get_categories_lists(self):
+        """
+        Obtém as listas de categorias a partir do arquivo aia.json.
+
+        Returns:
+            list: Lista de dicionários com as opções de categorias
+        """
+        try:
+            return self.get_taxonomy().legacy_rows()
+
+        except Exception as e:
+            raise Exception(f"Erro ao gerar listas de categorias: {str(e)}")
+
+    def update_excel_data(self, file_path, sheet_name, data, id_column=None):
+        """
+        Emula o comportamento do método update_excel_data do SharePointClient,
+        mas gravando no banco SQLite.
+
+        Args:
+            file_path: Ignorado, mantido para compatibilidade
+            sheet_name: Nome da "aba" (tipo de dados) a ser atualizada
+            data: Dados para atualização (dict para registro único, list para múltiplos)
+            id_column: Nome da coluna de ID para atualização de registro específico
+
+        Returns:
+            bool: True se a atualização for bem-sucedida
+        """
+        try:
+            conn = self._connect()
+            with conn:
+                if sheet_name == 'projetos':
+                    if isinstance(data, list):
+                        conn.execute('DELETE FROM projetos')
+                        self._insert_projects(conn, data)
+
+                elif sheet_name == 'categorias':
+                    # As categorizações são gravadas nos próprios projetos
+                    if isinstance(data, dict) and id_column is not None:
+                        self._update_project(conn, data.get(id_column), to_project_fields(data))
+                    elif isinstance(data, list):
+                        for item in data:
+                            self._update_project(conn, item.get('id_projeto'), to_project_fields(item))
+
+                elif sheet_name == 'logs':
+                    if isinstance(data, list):
+                        conn.execute('DELETE FROM logs')
+                        self._insert_logs(conn, data)
+                    else:
+                        self._insert_logs(conn, [data])
+
+                elif sheet_name == 'categorias_lists':
+                    # As listas são geradas a partir do aia.json
+                    pass
+
+                else:
+                    raise ValueError(f"Tipo de dados desconhecido para atualização: {sheet_name}")
+
+            return True
+
+        except Exception as e:
+            raise Exception(f"Erro ao atualizar dados SQLite: {str(e)}")
+
+    def _insert_projects(self, conn, projects):
+        """Insere uma lista de projetos preservando a ordem original."""
+        conn.executemany(
+            'INSERT OR IGNORE INTO projetos (codigo_projeto, id_projeto, posicao, data) VALUES (?, ?, ?, ?)',
+            [
+                (
+                    normalize_project_id(project.get('codigo_projeto')),
+                    normalize_project_id(project.get('id')),
+                    position,
+                    self._dumps(project)
+                )
+                for position, project in enumerate(projects)
+            ]
+        )
+
+    def _insert_logs(self, conn, logs):
+        """Insere registros de log, gerando o ID quando ausente."""
+        for log in logs:
+            log_id = log.get('id')
+            cursor = conn.execute(
+                'INSERT OR REPLACE INTO logs (id, id_projeto, data) VALUES (?, ?, ?)',
+                (log_id, normalize_project_id(log.get('id_projeto')), self._dumps(log))
+            )
+            if log_id is None:
+                log['id'] = cursor.lastrowid
+                conn.execute('UPDATE logs SET data = ? WHERE id = ?', (self._dumps(log), cursor.lastrowid))
+
+    def append_log(self, log_data):
+        """
+        Acrescenta um registro ao log de categorizações.
+
+        Args:
+            log_data: Dicionário com os dados do log (sem o campo id)
+
+        Returns:
+            dict: Registro gravado, com o ID atribuído
+        """
+        record = dict(log_data)
+        record.pop('id', None)
+        conn = self._connect()
+        with conn:
+            self._insert_logs(conn, [record])
+        return record
+
+    def iter_logs(self):
+        """
+        Itera preguiçosamente sobre os logs de categorização, do mais antigo ao mais recente.
+
+        Yields:
+            dict: Registro de log
+        """
+        for row in self._connect().execute('SELECT data FROM logs ORDER BY id'):
+            yield json.loads(row[0])
+
+    def get_project_logs(self, project_id):
+        """
+        Obtém os logs de categorização de um projeto (consulta pelo índice id_projeto).
+
+        Args:
+            project_id: ID ou código do projeto
+
+        Returns:
+            list: Registros do projeto em ordem crescente de ID
+        """
+        return self._select_data(
+            'SELECT data FROM logs WHERE id_projeto = ? ORDER BY id',
+            (normalize_project_id(project_id),)
+        )
+
+    def tail_logs(self, limit):
+        """
+        Obtém os últimos registros do log de categorizações.
+
+        Args:
+            limit: Quantidade máxima de registros
+
+        Returns:
+            list: Registros em ordem crescente de ID
+        """
+        rows = self._select_data('SELECT data FROM logs ORDER BY id DESC LIMIT ?', (limit,))
+        return list(reversed(rows))
+
+    def get_project_by_id(self, excel_path, project_id):
+        """
+        Obtém um projeto específico pelo ID.
+
+        Args:
+            excel_path: Ignorado, mantido para compatibilidade
+            project_id: ID ou código do projeto a ser buscado
+
+        Returns:
+            dict: Dados do projeto ou None se não encontrado
+        """
+        try:
+            rows = self._select_data(
+                'SELECT data FROM projetos WHERE codigo_projeto = ?',
+                (normalize_project_id(project_id),)
+            )
+            return rows[0] if rows else None
+
+        except Exception as e:
+            raise Exception(f"Erro ao buscar projeto: {str(e)}")
+
+    def get_categorization_by_project_id(self, excel_path, project_id):
+        """
+        Obtém a categorização de um projeto pelo ID.
+
+        Args:
+            excel_path: Ignorado, mantido para compatibilidade
+            project_id: ID ou código do projeto
+
+        Returns:
+            dict: Dados da categorização ou None se não encontrada
+        """
+        try:
+            project = self.get_project_by_id(None, project_id)
+            if project and is_categorized(project):
+                return to_legacy(project)
+            return None
+
+        except Exception as e:
+            raise Exception(f"Erro ao buscar categorização: {str(e)}")
+
+    def get_ai_suggestions(self):
+        """
+        Obtém todas as sugestões da IA.
+
+        Returns:
+            list: Lista de dicionários com as sugestões da IA
+        """
+        try:
+            return self._select_data('SELECT data FROM ai_suggestions ORDER BY rowid')
+        except Exception as e:
+            print(f"Erro ao ler sugestões da IA: {str(e)}")
+            return []
+
+    def get_ai_suggestion_by_project_id(self, project_id):
+        """
+        Obtém a sugestão da IA para um projeto específico.
+
+        Args:
+            project_id: ID ou código do projeto
+
+        Returns:
+            dict: Dados da sugestão da IA ou None se não encontrada
+        """
+        rows = self._select_data(
+            'SELECT data FROM ai_suggestions WHERE project_id = ?',
+            (normalize_project_id(project_id),)
+        )
+        return rows[0] if rows else None
+
+    def save_ai_suggestion(self, suggestion):
+        """
+        Salva uma sugestão da IA.
+
+        Args:
+            suggestion: Dicionário com a sugestão da IA
+
+        Returns:
+            bool: True se a operação for bem-sucedida
+        """
+        project_id = normalize_project_id(suggestion.get('project_id'))
+        conn = self._connect()
+        with conn:
+            if Config.AI_SUGGESTIONS_HISTORY:
+                # Guardar a sugestão anterior antes de substituí-la
+                conn.execute(
+                    'INSERT INTO ai_suggestions_history (project_id, data) '
+                    'SELECT project_id, data FROM ai_suggestions WHERE project_id = ?',
+                    (project_id,)
+                )
+            conn.execute(
+                'INSERT OR REPLACE INTO ai_suggestions (project_id, data) VALUES (?, ?)',
+                (project_id, self._dumps(suggestion))
+            )
+        return True
+
+    def get_ai_suggestion_history(self, project_id):
+        """
+        Obtém as sugestões anteriores da IA para um projeto (com AI_SUGGESTIONS_HISTORY ativo).
+
+        Args:
+            project_id: ID ou código do projeto
+
+        Returns:
+            list: Sugestões substituídas, da mais antiga para a mais recente
+        """
+        return self._select_data(
+            'SELECT data FROM ai_suggestions_history WHERE project_id = ? ORDER BY id',
+            (normalize_project_id(project_id),)
+        )
+
+    def _update_project(self, conn, project_id, fields):
+        """Atualiza campos de um projeto com um UPDATE de linha única. Retorna False se não existir."""
+        key = normalize_project_id(project_id)
+        row = conn.execute('SELECT data FROM projetos WHERE codigo_projeto = ?', (key,)).fetchone()
+        if row is None:
+            return False
+
+        project = json.loads(row[0])
+        project.update(fields)
+        conn.execute('UPDATE projetos SET data = ? WHERE codigo_projeto = ?', (self._dumps(project), key))
+        return True
+
+    def update_project_data(self, project_id, category_data):
+        """
+        Atualiza os dados de categorização do projeto com um UPDATE de linha única.
+
+        Args:
+            project_id: ID ou código do projeto a ser atualizado
+            category_data: Dicionário com os dados de categorização
+
+        Returns:
+            bool: True se a atualização for bem-sucedida
+        """
+        try:
+            conn = self._connect()
+            with conn:
+                # Ignorar os campos id_projeto e validation_info
+                return self._update_project(conn, project_id, to_project_fields(category_data))
+
+        except Exception as e:
+            raise Exception(f"Erro ao atualizar dados do projeto: {str(e)}")
+
+    def save_categorization(self, project_id, category_data, log_data):
+        """
+        Salva uma categorização (campos do projeto e log) em uma única transação.
+
+        Args:
+            project_id: ID ou código do projeto
+            category_data: Campos de categorização a gravar no projeto
+            log_data: Registro de log (sem o campo id)
+
+        Returns:
+            dict: Registro de log gravado, ou None se o projeto não foi encontrado
+        """
+        try:
+            conn = self._connect()
+            with conn:
+                if not self._update_project(conn, project_id, to_project_fields(category_data)):
+                    return None
+
+                record = dict(log_data)
+                record.pop('id', None)
+                self._insert_logs(conn, [record])
+
+            return record
+
+        except Exception as e:
+            raise Exception(f"Erro ao salvar categorização: {str(e)}")
+
+
+def import_json_files(data_dir='app/data', db_path=None):
+    """
+    Importa os arquivos JSON atuais para o banco SQLite (substitui o conteúdo).
+
+    Args:
+        data_dir: Pasta com all_projetos.json, categorias.json, os logs e ai_suggestions.json
+        db_path: Caminho do banco de destino (padrão: instance/data.db)
+
+    Returns:
+        dict: Quantidade de registros importados por tabela
+    """
+    def load(file_name):
+        path = os.path.join(data_dir, file_name)
+        if not os.path.exists(path):
+            return []
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    client = SqliteDataClient(db_path, data_dir)
+    projetos = load('all_projetos.json')
+    categorias = load('categorias.json')
+    # Logs e sugestões incluem o que ainda está nos segmentos/journal JSONL
+    logs = list(LogStore(os.path.join(data_dir, 'logs'), os.path.join(data_dir, 'logs.json')).iter_logs())
+    suggestions = SuggestionStore(os.path.join(data_dir, 'ai_suggestions.json')).get_all()
+
+    client.update_excel_data(None, 'projetos', projetos)
+    client.update_excel_data(None, 'logs', logs)
+
+    conn = client._connect()
+    with conn:
+        # Um categorias.json ainda não migrado completa os projetos sem categorização
+        client._merge_legacy_categorias(conn, categorias)
+        conn.execute('DELETE FROM ai_suggestions')
+        conn.executemany(
+            'INSERT OR REPLACE INTO ai_suggestions (project_id, data) VALUES (?, ?)',
+            [(normalize_project_id(s.get('project_id')), client._dumps(s)) for s in suggestions]
+        )
+
+    return {
+        'projetos': len(projetos),
+        'categorias': len(client.get_excel_data(None, 'categorias')),
+        'logs': len(logs),
+        'ai_suggestions': len(suggestions)
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Importa os arquivos JSON para o banco SQLite')
+    parser.add_argument('--data-dir', default='app/data', help='Pasta com os arquivos JSON')
+    parser.add_argument('--db', default=os.path.join('instance', 'data.db'), help='Arquivo do banco SQLite')
+    args = parser.parse_args()
+
+    counts = import_json_files(args.data_dir, args.db)
+    print(f"Importação concluída: {counts}")
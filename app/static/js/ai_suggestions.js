@@ -586,11 +586,65 @@ function initAiSuggestions() {
     });
 }
 
+/**
+ * Aguarda a sugestão da IA gerada em segundo plano, consultando o status periodicamente
+ * @param {string} statusUrl - URL de /api/suggestions/<id>/status
+ */
+function waitForAiSuggestion(statusUrl) {
+    const pollInterval = 2000;
+    const maxAttempts = 90;
+    let attempts = 0;
+    
+    // A página já pode ser usada enquanto a IA trabalha: esconder o overlay de carregamento
+    if (typeof aiLoading !== 'undefined' && localStorage.getItem('aiLoadingActive') === 'true') {
+        aiLoading.completeProgress();
+    }
+    
+    function showFailure(message) {
+        $('#aiSuggestionPending .spinner-border').remove();
+        $('#aiSuggestionPendingText').text(message);
+    }
+    
+    function poll() {
+        attempts++;
+        $.getJSON(statusUrl, function(data) {
+            if (data.status === 'done' && data.suggestion) {
+                // Disponibilizar a sugestão como se tivesse vindo do template
+                window.aiSuggestionData = $.extend({ is_ai_suggestion: true }, data.suggestion);
+                $('#used_ai').val('true');
+                $('#aiSuggestionPending').addClass('d-none');
+                $('#aiSuggestionResult').removeClass('d-none');
+                $('#aiSuggestionSection').attr('data-pending', 'false');
+                initAiSuggestions();
+            } else if (data.status === 'pending' && attempts < maxAttempts) {
+                setTimeout(poll, pollInterval);
+            } else if (data.status === 'pending') {
+                showFailure('A classificação da IA está demorando. Recarregue a página mais tarde.');
+            } else {
+                console.error("Erro ao gerar sugestão da IA:", data.error);
+                showFailure('Não foi possível gerar a classificação da IA');
+            }
+        }).fail(function() {
+            if (attempts < maxAttempts) {
+                setTimeout(poll, pollInterval);
+            } else {
+                showFailure('Não foi possível gerar a classificação da IA');
+            }
+        });
+    }
+    
+    poll();
+}
+
 // Initialize when document is ready
 $(document).ready(function() {
     // Check if we're on the categorize page
     if ($('#aiSuggestionSection').length > 0) {
-        initAiSuggestions();
+        if ($('#aiSuggestionSection').attr('data-pending') === 'true') {
+            waitForAiSuggestion($('#aiSuggestionSection').attr('data-status-url'));
+        } else {
+            initAiSuggestions();
+        }
     } else {
         // Se não estamos na página de categorização, garantir que o overlay seja escondido
         if (typeof aiLoading !== 'undefined' && localStorage.getItem('aiLoadingActive') === 'true') {
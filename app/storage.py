@@ -0,0 +1,16 @@
+from config import Config
+
+
+def create_data_client():
+    """
+    Cria o cliente de dados configurado em STORAGE_BACKEND.
+
+    Returns:
+        JsonDataClient ou SqliteDataClient: Cliente com a interface de dados da aplicação
+    """
+    if Config.STORAGE_BACKEND == 'sqlite':
+        from app.sqlite_data_client import SqliteDataClient
+        return SqliteDataClient(Config.SQLITE_DB_PATH)
+
+    from app.json_data_client import JsonDataClient
+    return JsonDataClient()
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from app.ai_integration import OpenAIClient
+from config import Config
+
+
+def suggestion_cache_key(project, taxonomy_version):
+    """
+    Calcula a chave de cache de uma sugestão: muda quando o texto do projeto,
+    o aia.json, o modo de classificação (e o pré-ranking), o modelo ou a versão do prompt mudam.
+
+    Args:
+        project: Dicionário do projeto
+        taxonomy_version: Versão (hash) do aia.json
+
+    Returns:
+        str: Chave da sugestão
+    """
+    mode = Config.AI_SUGGESTION_MODE
+    content = {
+        'projeto': [str(project.get(field) or '') for field in OpenAIClient.PROJECT_FIELDS],
+        'aia': taxonomy_version,
+        'modelo': OpenAIClient.model_for(mode),
+        'prompt': OpenAIClient.PROMPT_VERSION
+    }
+    # O modo padrão não entra na chave, para manter válidas as chaves já gravadas
+    if mode != 'duas_etapas':
+        content['modo'] = mode
+    elif Config.AI_PRERANK:
+        content['pre_ranking'] = [Config.AI_PRERANK_TOP_K, Config.AI_PRERANK_MIN_SCORE]
+    content = json.dumps(content, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+class SuggestionCache:
+    """
+    Cache LRU com validade (TTL) das sugestões da IA, indexado pela chave de
+    cache. Evita novas chamadas pagas enquanto as entradas da sugestão não mudam.
+    """
+
+    def __init__(self, max_entries=1000, ttl=30 * 24 * 3600):
+        """
+        Inicializa o cache.
+
+        Args:
+            max_entries: Quantidade máxima de sugestões em memória (LRU)
+            ttl: Validade das sugestões em segundos
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def is_expired(self, suggestion):
+        """
+        Verifica se uma sugestão passou da validade, pelo seu timestamp.
+
+        Args:
+            suggestion: Dicionário da sugestão
+
+        Returns:
+            bool: True se a sugestão está vencida
+        """
+        timestamp = suggestion.get('timestamp')
+        if not timestamp:
+            return False
+        try:
+            created = datetime.fromisoformat(str(timestamp)).timestamp()
+        except ValueError:
+            return False
+        return time.time() - created > self.ttl
+
+    def get(self, key):
+        """
+        Obtém uma sugestão válida pela chave.
+
+        Args:
+            key: Chave de cache
+
+        Returns:
+            dict: Cópia da sugestão ou None se ausente/vencida
+        """
+        with self._lock:
+            suggestion = self._entries.get(key)
+            if suggestion is None:
+                return None
+            if self.is_expired(suggestion):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return dict(suggestion)
+
+    def put(self, key, suggestion):
+        """
+        Guarda uma sugestão, descartando as menos usadas acima do limite.
+
+        Args:
+            key: Chave de cache
+            suggestion: Dicionário da sugestão
+        """
+        with self._lock:
+            self._entries[key] = dict(suggestion)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def lookup(self, json_client, project_id, key):
+        """
+        Procura uma sugestão reaproveitável para o projeto: primeiro no cache,
+        depois na sugestão salva do projeto (se gerada com as mesmas entradas).
+
+        Args:
+            json_client: Cliente de dados
+            project_id: ID ou código do projeto
+            key: Chave de cache calculada para o projeto
+
+        Returns:
+            dict: Sugestão válida ou None se for preciso gerar uma nova
+        """
+        suggestion = self.get(key)
+        if suggestion is not None:
+            suggestion['project_id'] = project_id
+            return suggestion
+
+        stored = json_client.get_ai_suggestion_by_project_id(project_id)
+        if not stored or 'error' in stored or stored.get('provisoria') or self.is_expired(stored):
+            return None
+
+        # Sugestões antigas não têm chave: são mantidas até uma regeneração explícita
+        if stored.get('cache_key') not in (None, key):
+            return None
+
+        self.put(key, stored)
+        return stored
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_suggestion_cache(max_entries=1000, ttl=30 * 24 * 3600):
+    """
+    Obtém o cache de sugestões compartilhado pelo processo.
+
+    Args:
+        max_entries: Quantidade máxima de sugestões em memória (usado apenas na criação)
+        ttl: Validade das sugestões em segundos (usado apenas na criação)
+
+    Returns:
+        SuggestionCache: Instância única
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SuggestionCache(max_entries, ttl)
+        return _cache
@@ -0,0 +1,249 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.ai_integration import get_openai_client
+from app.local_classifier import get_local_classifier
+from app.storage import create_data_client
+from app.suggestion_cache import get_suggestion_cache, suggestion_cache_key
+from config import Config
+
+
+def generate_suggestion(project_id, openai_api_key, openai_client=None, use_local=False):
+    """
+    Gera a sugestão da IA para um projeto e a salva no armazenamento de sugestões.
+
+    Args:
+        project_id: ID ou código do projeto
+        openai_api_key: Chave da API OpenAI
+        openai_client: OpenAIClient a reutilizar (opcional; ex.: para acumular o uso da API)
+        use_local: Se True, tenta antes o classificador local (ver generate_local_suggestion)
+
+    Returns:
+        dict: Sugestão gerada
+    """
+    json_client = create_data_client()
+    project = json_client.get_project_by_id(None, project_id)
+    if not project:
+        raise Exception(f"Projeto {project_id} não encontrado")
+
+    taxonomy = json_client.get_taxonomy()
+    if use_local:
+        suggestion = _local_prediction(json_client, project)
+        if suggestion is not None:
+            return _save_suggestion(json_client, project_id, project, taxonomy, suggestion)
+
+    # Chamar OpenAI para sugerir categorias com os registros do aia.json
+    openai_client = openai_client or get_openai_client(openai_api_key)
+    suggestion = openai_client.suggest_categories(project, None, taxonomy.records)
+
+    # OpenAI indisponível (erro ou circuito aberto): usar o classificador local, mesmo com baixa confiança
+    if 'error' in suggestion and Config.AI_LOCAL_FALLBACK:
+        fallback = _local_prediction(json_client, project, min_confidence=0.0, required=False)
+        if fallback is not None:
+            print(f"OpenAI indisponível para o projeto {project_id} ({suggestion['error']}); usando o classificador local")
+            fallback['justificativa'] = f"OpenAI indisponível. {fallback['justificativa']}"
+            # Sugestão provisória: não é reaproveitada pelo cache quando a OpenAI voltar
+            fallback['provisoria'] = True
+            suggestion = fallback
+    return _save_suggestion(json_client, project_id, project, taxonomy, suggestion)
+
+
+def generate_local_suggestion(project_id):
+    """
+    Gera a sugestão com o classificador local, sem chamar a API, e a salva
+    quando a confiança calibrada atinge LOCAL_CLASSIFIER_MIN_CONFIDENCE.
+
+    Args:
+        project_id: ID ou código do projeto
+
+    Returns:
+        dict: Sugestão salva ou None (classificador desativado, sem dados
+              suficientes ou com baixa confiança: usar a OpenAI)
+    """
+    if not Config.LOCAL_CLASSIFIER:
+        return None
+    json_client = create_data_client()
+    project = json_client.get_project_by_id(None, project_id)
+    if not project:
+        return None
+    suggestion = _local_prediction(json_client, project)
+    if suggestion is None:
+        return None
+    return _save_suggestion(json_client, project_id, project, json_client.get_taxonomy(), suggestion)
+
+
+def _local_prediction(json_client, project, min_confidence=None, required=True):
+    """
+    Sugestão do classificador local.
+
+    Args:
+        json_client: Cliente de dados
+        project: Dicionário do projeto
+        min_confidence: Probabilidade mínima (padrão: LOCAL_CLASSIFIER_MIN_CONFIDENCE)
+        required: Se True, exige LOCAL_CLASSIFIER ativado; se False, basta
+                  LOCAL_CLASSIFIER ou AI_LOCAL_FALLBACK
+
+    Returns:
+        dict: Sugestão ou None (desativado, sem dados suficientes, modelo ainda
+              em treino ou abaixo da confiança mínima)
+    """
+    if not Config.LOCAL_CLASSIFIER and (required or not Config.AI_LOCAL_FALLBACK):
+        return None
+    # O treino roda na fila de sugestões; até terminar, vale o modelo anterior
+    classifier = get_local_classifier(
+        json_client, Config.LOCAL_CLASSIFIER_MIN_SAMPLES, Config.LOCAL_CLASSIFIER_RETRAIN_SECONDS,
+        executor=get_suggestion_jobs(Config.AI_SUGGESTION_WORKERS).executor
+    )
+    if classifier is None:
+        return None
+    if min_confidence is None:
+        min_confidence = Config.LOCAL_CLASSIFIER_MIN_CONFIDENCE
+    suggestion = classifier.predict(project)
+    if suggestion is None or suggestion['probabilidade'] < min_confidence:
+        return None
+    return suggestion
+
+
+def _save_suggestion(json_client, project_id, project, taxonomy, suggestion):
+    """
+    Normaliza e salva uma sugestão, registrando-a no cache de sugestões.
+
+    Args:
+        json_client: Cliente de dados
+        project_id: ID ou código do projeto
+        project: Dicionário do projeto
+        taxonomy: Taxonomia usada na sugestão
+        suggestion: Sugestão gerada
+
+    Returns:
+        dict: Sugestão salva
+    """
+    # Adicionar ID do projeto e flag para indicar que é uma sugestão da IA
+    suggestion['project_id'] = project_id
+    suggestion['is_ai_suggestion'] = True
+
+    # Remover espaços extras dos campos de texto
+    for key in suggestion:
+        if isinstance(suggestion[key], str):
+            suggestion[key] = suggestion[key].strip()
+
+    # Verificar se o campo _aia_n3_dominio_outro está vazio ou é N/A
+    if '_aia_n3_dominio_outro' in suggestion:
+        dominio_outro = suggestion['_aia_n3_dominio_outro'].strip()
+        if dominio_outro == '' or dominio_outro.lower() == 'n/a':
+            suggestion['_aia_n3_dominio_outro'] = 'N/A'
+
+    # Registrar as entradas usadas, para reaproveitar a sugestão enquanto elas não mudarem
+    cache_key = suggestion_cache_key(project, taxonomy.version)
+    suggestion['cache_key'] = cache_key
+
+    json_client.save_ai_suggestion(suggestion)
+    if 'error' not in suggestion and not suggestion.get('provisoria'):
+        get_suggestion_cache(
+            Config.AI_SUGGESTION_CACHE_SIZE, Config.AI_SUGGESTION_CACHE_TTL_DAYS * 24 * 3600
+        ).put(cache_key, suggestion)
+    return suggestion
+
+
+class SuggestionJobs:
+    """
+    Fila de geração de sugestões da IA em segundo plano. Cada projeto tem no
+    máximo um job em andamento; o resultado fica disponível para consulta
+    (polling) por job_ttl segundos.
+    """
+
+    def __init__(self, max_workers=4, job_ttl=600):
+        """
+        Inicializa a fila.
+
+        Args:
+            max_workers: Quantidade de sugestões geradas em paralelo
+            job_ttl: Tempo (segundos) que o resultado de um job fica disponível
+        """
+        self.job_ttl = job_ttl
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='sugestao-ia')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _prune(self):
+        """Remove jobs finalizados há mais de job_ttl segundos."""
+        now = time.time()
+        expired = [
+            project_id for project_id, job in self._jobs.items()
+            if job['status'] != 'pending' and now - job['finished_at'] > self.job_ttl
+        ]
+        for project_id in expired:
+            del self._jobs[project_id]
+
+    def submit(self, project_id, openai_api_key):
+        """
+        Agenda a geração da sugestão, se não houver um job em andamento para o projeto.
+
+        Args:
+            project_id: ID ou código do projeto
+            openai_api_key: Chave da API OpenAI
+
+        Returns:
+            dict: Estado do job ({'status': 'pending'|'done'|'error', ...})
+        """
+        key = str(project_id).strip()
+        with self._lock:
+            self._prune()
+            job = self._jobs.get(key)
+            if job is not None and job['status'] == 'pending':
+                return dict(job)
+
+            job = {'status': 'pending', 'suggestion': None, 'error': None,
+                   'started_at': time.time(), 'finished_at': None}
+            self._jobs[key] = job
+
+        self.executor.submit(self._run, key, job, openai_api_key)
+        return dict(job)
+
+    def _run(self, project_id, job, openai_api_key):
+        """Executa o job e registra o resultado."""
+        try:
+            suggestion = generate_suggestion(project_id, openai_api_key)
+            print(f"Sugestão da IA gerada com sucesso para o projeto {project_id}")
+            with self._lock:
+                job.update(status='done', suggestion=suggestion, finished_at=time.time())
+        except Exception as e:
+            print(f"Erro ao obter sugestão da IA: {str(e)}")
+            with self._lock:
+                job.update(status='error', error=str(e), finished_at=time.time())
+
+    def status(self, project_id):
+        """
+        Obtém o estado do job de um projeto.
+
+        Args:
+            project_id: ID ou código do projeto
+
+        Returns:
+            dict: Estado do job ou None se não houver job recente
+        """
+        with self._lock:
+            job = self._jobs.get(str(project_id).strip())
+            return dict(job) if job is not None else None
+
+
+_jobs = None
+_jobs_lock = threading.Lock()
+
+
+def get_suggestion_jobs(max_workers=4):
+    """
+    Obtém a fila de sugestões compartilhada pelo processo.
+
+    Args:
+        max_workers: Quantidade de sugestões geradas em paralelo (usado apenas na criação)
+
+    Returns:
+        SuggestionJobs: Instância única
+    """
+    global _jobs
+    with _jobs_lock:
+        if _jobs is None:
+            _jobs = SuggestionJobs(max_workers)
+        return _jobs
@@ -0,0 +1,236 @@
+import json
+import os
+import threading
+
+from app.project_store import normalize_project_id
+from app.write_committer import atomic_write_json
+
+
+class SuggestionStore:
+    """
+    Sugestões da IA indexadas por project_id. O ai_suggestions.json é o
+    snapshot; cada gravação apenas acrescenta uma linha ao journal JSONL,
+    que é incorporado ao snapshot a cada compact_every gravações.
+    """
+
+    def __init__(self, path, compact_every=500, keep_history=False, fsync=False):
+        """
+        Inicializa o armazenamento de sugestões.
+
+        Args:
+            path: Caminho do snapshot ai_suggestions.json
+            compact_every: Quantidade de linhas no journal que dispara a compactação
+            keep_history: Se True, as sugestões substituídas vão para o arquivo de histórico
+            fsync: Se True, força a gravação em disco a cada sugestão salva
+        """
+        self.path = path
+        base = os.path.splitext(path)[0]
+        self.journal_path = f'{base}.journal.jsonl'
+        self.history_path = f'{base}.history.jsonl'
+        self.compact_every = compact_every
+        self.keep_history = keep_history
+        self.fsync = fsync
+        self._lock = threading.RLock()
+        self._suggestions = None
+        self._superseded = []
+        self._journal_count = 0
+        self._signature = None
+
+    def _file_signature(self):
+        """Retorna a assinatura (mtime, tamanho) do snapshot e do journal."""
+        signature = []
+        for path in (self.path, self.journal_path):
+            if os.path.exists(path):
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            else:
+                signature.append(None)
+        return tuple(signature)
+
+    def _ensure_loaded(self):
+        """Carrega o snapshot e reaplica o journal se algum dos arquivos mudou."""
+        signature = self._file_signature()
+        if self._suggestions is not None and signature == self._signature:
+            return
+
+        suggestions = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for suggestion in json.load(f):
+                    # Manter a primeira ocorrência, como na busca linear original
+                    suggestions.setdefault(normalize_project_id(suggestion.get('project_id')), suggestion)
+
+        superseded = []
+        journal_count = 0
+        if os.path.exists(self.journal_path):
+            self._trim_partial_line()
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for number, line in enumerate(f, 1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        suggestion = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Linha corrompida: ignorar, sem impedir a leitura das demais sugestões
+                        print(f"Linha {number} inválida no journal de sugestões ignorada: {self.journal_path}")
+                        continue
+                    key = normalize_project_id(suggestion.get('project_id'))
+                    if self.keep_history and key in suggestions:
+                        superseded.append(suggestions[key])
+                    suggestions[key] = suggestion
+                    journal_count += 1
+
+        self._suggestions = suggestions
+        self._superseded = superseded
+        self._journal_count = journal_count
+        self._signature = self._file_signature()
+
+    def _trim_partial_line(self):
+        """Remove uma última linha incompleta deixada por uma gravação interrompida."""
+        with open(self.journal_path, 'rb+') as f:
+            content = f.read()
+            if content and not content.endswith(b'\n'):
+                f.truncate(content.rfind(b'\n') + 1)
+
+    def get(self, project_id):
+        """
+        Obtém a sugestão atual de um projeto em O(1).
+
+        Args:
+            project_id: ID ou código do projeto
+
+        Returns:
+            dict: Cópia da sugestão ou None se não encontrada
+        """
+        with self._lock:
+            self._ensure_loaded()
+            suggestion = self._suggestions.get(normalize_project_id(project_id))
+            return dict(suggestion) if suggestion is not None else None
+
+    def get_all(self):
+        """
+        Obtém a sugestão atual de cada projeto.
+
+        Returns:
+            list: Cópias das sugestões
+        """
+        with self._lock:
+            self._ensure_loaded()
+            return [dict(suggestion) for suggestion in self._suggestions.values()]
+
+    def put(self, suggestion):
+        """
+        Salva a sugestão de um projeto, acrescentando uma linha ao journal.
+
+        Args:
+            suggestion: Dicionário com a sugestão (deve conter project_id)
+        """
+        with self._lock:
+            self._ensure_loaded()
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(suggestion, ensure_ascii=False) + '\n')
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            key = normalize_project_id(suggestion.get('project_id'))
+            if self.keep_history and key in self._suggestions:
+                self._superseded.append(self._suggestions[key])
+            self._suggestions[key] = suggestion
+            self._journal_count += 1
+            self._signature = self._file_signature()
+
+            if self._journal_count >= self.compact_every:
+                self.compact()
+
+    def compact(self):
+        """Incorpora o journal ao snapshot e move as sugestões substituídas para o histórico."""
+        with self._lock:
+            self._ensure_loaded()
+            if self.keep_history and self._superseded:
+                with open(self.history_path, 'a', encoding='utf-8') as f:
+                    for suggestion in self._superseded:
+                        f.write(json.dumps(suggestion, ensure_ascii=False) + '\n')
+
+            atomic_write_json(self.path, list(self._suggestions.values()), self.fsync)
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+
+            self._superseded = []
+            self._journal_count = 0
+            self._signature = self._file_signature()
+
+    def replace_all(self, suggestions):
+        """
+        Substitui todas as sugestões e grava um novo snapshot.
+
+        Args:
+            suggestions: Lista completa de sugestões
+        """
+        with self._lock:
+            self._ensure_loaded()
+            self._superseded = []
+            self._suggestions = {}
+            for suggestion in suggestions:
+                self._suggestions.setdefault(normalize_project_id(suggestion.get('project_id')), suggestion)
+            self.compact()
+
+    def get_history(self, project_id):
+        """
+        Obtém as sugestões anteriores de um projeto (somente com keep_history).
+
+        Args:
+            project_id: ID ou código do projeto
+
+        Returns:
+            list: Sugestões substituídas, da mais antiga para a mais recente
+        """
+        key = normalize_project_id(project_id)
+        with self._lock:
+            self._ensure_loaded()
+            history = []
+            if os.path.exists(self.history_path):
+                with open(self.history_path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            suggestion = json.loads(line)
+                        except json.JSONDecodeError:
+                            continue
+                        if normalize_project_id(suggestion.get('project_id')) == key:
+                            history.append(suggestion)
+
+            history.extend(
+                dict(suggestion) for suggestion in self._superseded
+                if normalize_project_id(suggestion.get('project_id')) == key
+            )
+            return history
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_suggestion_store(path, compact_every=500, keep_history=False, fsync=False):
+    """
+    Obtém o SuggestionStore compartilhado pelo processo para o arquivo informado.
+
+    Args:
+        path: Caminho do snapshot ai_suggestions.json
+        compact_every: Linhas no journal que disparam a compactação (usado apenas na criação)
+        keep_history: Se True, guarda as sugestões substituídas (usado apenas na criação)
+        fsync: Se True, força a gravação em disco a cada sugestão (usado apenas na criação)
+
+    Returns:
+        SuggestionStore: Instância única por caminho absoluto
+    """
+    key = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = SuggestionStore(key, compact_every, keep_history, fsync)
+            _stores[key] = store
+        return store
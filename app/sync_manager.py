@@ -1,10 +1,11 @@
 import os
 import json
 import pandas as pd
-import io
+import tempfile
 from datetime import datetime
-from app.sharepoint_client import SharePointClient
-from app.json_data_client import JsonDataClient
+from app.sharepoint_client import OfflineSharePointClient, get_sharepoint_client, is_connection_error
+from app.workbook_cache import get_workbook_cache, workbook_version
+from app.storage import create_data_client
 from config import Config
 import logging
 from dotenv import load_dotenv
@@ -29,7 +30,7 @@ class SyncManager:
         Args:
             sharepoint_client: Cliente SharePoint opcional. Se não fornecido, será criado a partir das configurações.
         """
-        self.json_client = JsonDataClient()
+        self.json_client = create_data_client()
         self.sharepoint_client = sharepoint_client
         self.excel_path = Config.SHAREPOINT_EXCEL_PATH
         self.data_dir = 'app/data'
@@ -56,10 +57,18 @@ class SyncManager:
                 logger.error("Credenciais do SharePoint incompletas")
                 return False
                 
-            self.sharepoint_client = SharePointClient(site_url, username, password)
+            # Reaproveita a sessão autenticada do site/usuário entre as requisições
+            self.sharepoint_client = get_sharepoint_client(site_url, username, password)
             return True
         except Exception as e:
             logger.error(f"Erro ao conectar ao SharePoint: {str(e)}")
+            # SharePoint inacessível: seguir somente leitura com a última planilha baixada
+            if site_url and is_connection_error(e):
+                offline_client = OfflineSharePointClient.from_cache(site_url, self.excel_path)
+                if offline_client:
+                    logger.warning("SharePoint inacessível: usando a última planilha baixada (somente leitura)")
+                    self.sharepoint_client = offline_client
+                    return True
             return False
     
     def json_to_excel(self):
@@ -73,43 +82,37 @@ class SyncManager:
             if not self.sharepoint_client:
                 return {"success": False, "message": "Cliente SharePoint não inicializado"}
             
-            # Carregar dados dos arquivos JSON
-            all_projetos_path = os.path.join(self.data_dir, 'all_projetos.json')
-            categorias_path = os.path.join(self.data_dir, 'categorias.json')
-            logs_path = os.path.join(self.data_dir, 'logs.json')
-            
-            with open(all_projetos_path, 'r', encoding='utf-8') as f:
-                projetos = json.load(f)
-            
-            with open(categorias_path, 'r', encoding='utf-8') as f:
-                categorias = json.load(f)
-            
-            with open(logs_path, 'r', encoding='utf-8') as f:
-                logs = json.load(f)
+            # Carregar dados locais pelo cliente de dados configurado
+            projetos = self.json_client.get_excel_data(None, 'projetos')
+            categorias = self.json_client.get_excel_data(None, 'categorias')
+            logs = self.json_client.get_excel_data(None, 'logs')
             
             # Criar DataFrames
             df_projetos = pd.DataFrame(projetos)
             df_categorias = pd.DataFrame(categorias)
             df_logs = pd.DataFrame(logs)
             
-            # Criar um buffer para o arquivo Excel
-            output = io.BytesIO()
-            
-            # Criar um escritor Excel
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                df_projetos.to_excel(writer, sheet_name='projetos', index=False)
-                df_categorias.to_excel(writer, sheet_name='categorias', index=False)
-                df_logs.to_excel(writer, sheet_name='logs', index=False)
-            
-            # Obter o conteúdo do buffer
-            output.seek(0)
-            excel_content = output.getvalue()
+            # Gravar o Excel em um arquivo temporário, enviado em partes se for grande
+            os.makedirs('instance', exist_ok=True)
+            fd, excel_path = tempfile.mkstemp(suffix='.xlsx', dir='instance')
+            os.close(fd)
+            try:
+                # Criar um escritor Excel
+                with pd.ExcelWriter(excel_path, engine='openpyxl') as writer:
+                    df_projetos.to_excel(writer, sheet_name='projetos', index=False)
+                    df_categorias.to_excel(writer, sheet_name='categorias', index=False)
+                    df_logs.to_excel(writer, sheet_name='logs', index=False)
+                
+                # Fazer upload para o SharePoint
+                self.sharepoint_client.upload_file_from_path(
+                    excel_path, self.excel_path, progress=self._log_progress('Upload')
+                )
+            finally:
+                os.remove(excel_path)
             
-            # Fazer upload para o SharePoint
-            self.sharepoint_client.upload_file(excel_content, self.excel_path)
-            
-            # Registrar timestamp da sincronização
-            self._save_sync_timestamp('upload')
+            # Registrar timestamp da sincronização; a planilha enviada corresponde aos
+            # dados locais, então o próximo download pode ser evitado se ela não mudar
+            self._save_sync_timestamp('upload', self._get_remote_fingerprint())
             
             return {
                 "success": True, 
@@ -123,10 +126,13 @@ class SyncManager:
             logger.error(f"Erro ao converter JSON para Excel: {str(e)}")
             return {"success": False, "message": f"Erro: {str(e)}"}
     
-    def excel_to_json(self):
+    def excel_to_json(self, force=False):
         """
         Baixa o arquivo Excel do SharePoint e converte para arquivos JSON locais.
         
+        Args:
+            force: Se True, baixa a planilha mesmo que ela não tenha mudado desde a última sincronização
+        
         Returns:
             dict: Resultado da operação com status e mensagem
         """
@@ -134,32 +140,41 @@ class SyncManager:
             if not self.sharepoint_client:
                 return {"success": False, "message": "Cliente SharePoint não inicializado"}
             
-            # Baixar o arquivo Excel do SharePoint
-            excel_content = self.sharepoint_client.download_file(self.excel_path)
-            
-            # Ler as abas do Excel
-            excel_file = io.BytesIO(excel_content)
+            # Verificar pelos metadados (ETag, data de modificação e tamanho) se a
+            # planilha mudou desde a última sincronização, antes de baixá-la
+            fingerprint = self._get_remote_fingerprint()
+            if not force and fingerprint and fingerprint == self._load_sync_config().get('sync_fingerprint'):
+                projetos = self._load_existing('projetos')
+                if projetos:
+                    self._save_sync_timestamp('download', fingerprint)
+                    return {
+                        "success": True,
+                        "message": f"{self.excel_path} não mudou desde a última sincronização; dados locais mantidos",
+                        "projetos": len(projetos),
+                        "categorias": len(self._load_existing('categorias')),
+                        "logs": len(self._load_existing('logs'))
+                    }
+            
+            # Baixar o arquivo Excel do SharePoint para o cache local (em partes, direto em disco)
+            # e ler as abas enquanto a cópia está reservada (cada versão da planilha é
+            # interpretada uma única vez)
+            workbook_cache = get_workbook_cache()
+            with self.sharepoint_client.download_to_cache(self.excel_path, progress=self._log_progress('Download')) as (excel_path, excel_hash):
+                df_projetos = workbook_cache.read_excel(excel_path, excel_hash, 'projetos')
+                df_categorias = workbook_cache.read_excel(excel_path, excel_hash, 'categorias')
+                df_logs = workbook_cache.read_excel(excel_path, excel_hash, 'logs')
             
             # Ler projetos
-            df_projetos = pd.read_excel(excel_file, sheet_name='projetos')
             # Substituir valores NaN por None (que se torna null em JSON)
             df_projetos = df_projetos.replace({pd.NA: None})
             projetos = df_projetos.to_dict('records')
             
-            # Resetar o ponteiro do arquivo
-            excel_file.seek(0)
-            
             # Ler categorias
-            df_categorias = pd.read_excel(excel_file, sheet_name='categorias')
             # Substituir valores NaN por None (que se torna null em JSON)
             df_categorias = df_categorias.replace({pd.NA: None})
             categorias = df_categorias.to_dict('records')
             
-            # Resetar o ponteiro do arquivo
-            excel_file.seek(0)
-            
             # Ler logs
-            df_logs = pd.read_excel(excel_file, sheet_name='logs')
             # Substituir valores NaN por None (que se torna null em JSON)
             df_logs = df_logs.replace({pd.NA: None})
             logs = df_logs.to_dict('records')
@@ -169,26 +184,21 @@ class SyncManager:
             categorias_mescladas = self._merge_categories(categorias)
             logs_mesclados = self._merge_logs(logs)
             
-            # Salvar os arquivos JSON
-            all_projetos_path = os.path.join(self.data_dir, 'all_projetos.json')
-            categorias_path = os.path.join(self.data_dir, 'categorias.json')
-            logs_path = os.path.join(self.data_dir, 'logs.json')
-            
-            with open(all_projetos_path, 'w', encoding='utf-8') as f:
-                json.dump(projetos_mesclados, f, ensure_ascii=False, indent=2)
-            
-            with open(categorias_path, 'w', encoding='utf-8') as f:
-                json.dump(categorias_mescladas, f, ensure_ascii=False, indent=2)
-            
-            with open(logs_path, 'w', encoding='utf-8') as f:
-                json.dump(logs_mesclados, f, ensure_ascii=False, indent=2)
+            # Salvar os dados pelo cliente de dados configurado
+            self.json_client.update_excel_data(None, 'projetos', projetos_mesclados)
+            self.json_client.update_excel_data(None, 'categorias', categorias_mescladas)
+            self.json_client.update_excel_data(None, 'logs', logs_mesclados)
             
             # Registrar timestamp da sincronização
-            self._save_sync_timestamp('download')
+            self._save_sync_timestamp('download', fingerprint)
+            
+            message = f"Dados baixados e convertidos com sucesso de {self.excel_path}"
+            if self.sharepoint_client.offline:
+                message += " (SharePoint inacessível: usada a última cópia baixada)"
             
             return {
                 "success": True, 
-                "message": f"Dados baixados e convertidos com sucesso de {self.excel_path}",
+                "message": message,
                 "projetos": len(projetos_mesclados),
                 "categorias": len(categorias_mescladas),
                 "logs": len(logs_mesclados)
@@ -198,6 +208,22 @@ class SyncManager:
             logger.error(f"Erro ao converter Excel para JSON: {str(e)}")
             return {"success": False, "message": f"Erro: {str(e)}"}
     
+    def _load_existing(self, sheet_name):
+        """
+        Carrega os dados locais existentes de um tipo, retornando lista vazia se não existirem.
+        
+        Args:
+            sheet_name: Tipo de dados ('projetos', 'categorias' ou 'logs')
+            
+        Returns:
+            list: Dados locais existentes
+        """
+        try:
+            return self.json_client.get_excel_data(None, sheet_name)
+        except Exception as e:
+            logger.warning(f"Dados locais de {sheet_name} indisponíveis: {str(e)}")
+            return []
+    
     def _merge_projects(self, new_projects):
         """
         Mescla projetos novos com os existentes, preservando categorizações.
@@ -221,12 +247,7 @@ class SyncManager:
             ]
             
             # Carregar projetos existentes
-            all_projetos_path = os.path.join(self.data_dir, 'all_projetos.json')
-            if os.path.exists(all_projetos_path):
-                with open(all_projetos_path, 'r', encoding='utf-8') as f:
-                    existing_projects = json.load(f)
-            else:
-                existing_projects = []
+            existing_projects = self._load_existing('projetos')
             
             # Criar dicionário de projetos existentes para fácil acesso
             existing_dict = {str(p.get('codigo_projeto')): p for p in existing_projects}
@@ -287,12 +308,7 @@ class SyncManager:
         """
         try:
             # Carregar categorias existentes
-            categorias_path = os.path.join(self.data_dir, 'categorias.json')
-            if os.path.exists(categorias_path):
-                with open(categorias_path, 'r', encoding='utf-8') as f:
-                    existing_categories = json.load(f)
-            else:
-                existing_categories = []
+            existing_categories = self._load_existing('categorias')
             
             # Criar dicionário de categorias existentes para fácil acesso
             existing_dict = {str(c.get('id_projeto')): c for c in existing_categories}
@@ -337,12 +353,7 @@ class SyncManager:
         """
         try:
             # Carregar logs existentes
-            logs_path = os.path.join(self.data_dir, 'logs.json')
-            if os.path.exists(logs_path):
-                with open(logs_path, 'r', encoding='utf-8') as f:
-                    existing_logs = json.load(f)
-            else:
-                existing_logs = []
+            existing_logs = self._load_existing('logs')
             
             # Criar dicionário de logs existentes para fácil acesso
             existing_dict = {str(l.get('id')): l for l in existing_logs}
@@ -378,12 +389,55 @@ class SyncManager:
             # Em caso de erro, retornar os novos logs
             return new_logs
     
-    def _save_sync_timestamp(self, sync_type):
+    @staticmethod
+    def _log_progress(action):
+        """
+        Cria a função de progresso das transferências com o SharePoint.
+        
+        Args:
+            action: Nome da transferência exibido no log ('Upload' ou 'Download')
+            
+        Returns:
+            function: Função (bytes transferidos, tamanho total ou None)
+        """
+        def progress(done, total):
+            if total:
+                logger.info(f"{action}: {done / 1048576:.1f} de {total / 1048576:.1f} MB ({done * 100 // total}%)")
+            else:
+                logger.info(f"{action}: {done / 1048576:.1f} MB")
+        return progress
+    
+    def _get_remote_fingerprint(self):
+        """
+        Obtém a identificação da versão da planilha no SharePoint (ETag, data
+        de modificação e tamanho), sem baixá-la.
+        
+        Returns:
+            dict: Identificação da versão, ou None se os metadados não estiverem disponíveis
+        """
+        try:
+            return workbook_version(self.sharepoint_client.get_file_properties(self.excel_path))
+        except Exception as e:
+            logger.warning(f"Metadados da planilha indisponíveis: {str(e)}")
+            return None
+    
+    def _load_sync_config(self):
+        """Carrega o arquivo de configuração local (timestamps e versão da última sincronização)."""
+        try:
+            if os.path.exists(Config.CONFIG_FILE):
+                with open(Config.CONFIG_FILE, 'r') as f:
+                    return json.load(f)
+        except Exception as e:
+            logger.error(f"Erro ao ler configuração de sincronização: {str(e)}")
+        return {}
+    
+    def _save_sync_timestamp(self, sync_type, fingerprint=None):
         """
         Salva o timestamp da última sincronização.
         
         Args:
             sync_type: Tipo de sincronização ('upload' ou 'download')
+            fingerprint: Versão da planilha no SharePoint após a sincronização (opcional)
         """
         try:
             config_file = Config.CONFIG_FILE
@@ -400,6 +454,12 @@ class SyncManager:
             else:
                 config['last_download_sync'] = timestamp
             
+            # Versão da planilha que corresponde aos dados locais (sem ela, o próximo download é completo)
+            if fingerprint:
+                config['sync_fingerprint'] = fingerprint
+            else:
+                config.pop('sync_fingerprint', None)
+            
             with open(config_file, 'w') as f:
                 json.dump(config, f)
                 
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import threading
+
+# Listas fixas que não fazem parte do aia.json
+TECNOLOGIAS_HABILITADORAS = [
+    "Inteligência Artificial", "Internet das Coisas", "Blockchain",
+    "Computação em Nuvem", "Big Data", "Robótica", "Biotecnologia"
+]
+AREAS_APLICACAO = [
+    "Saúde", "Agricultura", "Indústria", "Energia", "Transporte",
+    "Finanças", "Educação", "Segurança"
+]
+
+
+class Taxonomy:
+    """
+    Taxonomia de categorias (Macroárea -> Segmento -> Domínios Afeitos)
+    pré-calculada a partir do aia.json. Construída uma vez por versão do arquivo.
+    """
+
+    def __init__(self, records, version=None):
+        """
+        Constrói a árvore, as listas ordenadas e os índices reversos.
+
+        Args:
+            records: Lista de registros do aia.json
+            version: Identificador da versão do arquivo (hash do conteúdo)
+        """
+        self.records = records
+        self.version = version
+
+        # Árvore macroárea -> segmento -> domínios (na ordem do arquivo, sem repetição)
+        self.tree = {}
+        seen = {}
+        macroareas = set()
+        segmentos = set()
+        for item in records:
+            macroarea = item['Macroárea']
+            segmento = item['Segmento']
+            macroareas.add(macroarea)
+            segmentos.add(segmento)
+
+            if 'Domínios Afeitos' not in item:
+                continue
+
+            domains = self.tree.setdefault(macroarea, {}).setdefault(segmento, [])
+            known = seen.setdefault((macroarea, segmento), set())
+            for domain in item['Domínios Afeitos'].split(';'):
+                domain = domain.strip()
+                if domain and domain not in known:
+                    known.add(domain)
+                    domains.append(domain)
+
+        # Índice reverso domínio -> (macroárea, segmento) da primeira ocorrência
+        self.segment_by_domain = {}
+        for macroarea, segments in self.tree.items():
+            for segmento, domains in segments.items():
+                for domain in domains:
+                    self.segment_by_domain.setdefault(domain, (macroarea, segmento))
+
+        self.macroareas = sorted(macroareas)
+        self.segmentos = sorted(segmentos)
+        self.dominios = sorted(self.segment_by_domain)
+
+        # JSON da árvore usado pelo JavaScript da página de categorização
+        self.tree_json = json.dumps(self.tree)
+
+        self._lists = {
+            'tecnologias_habilitadoras': TECNOLOGIAS_HABILITADORAS,
+            'areas_aplicacao': AREAS_APLICACAO,
+            'microarea': self.macroareas,
+            'segmento': self.segmentos,
+            'dominio': self.dominios
+        }
+        self._legacy_rows = self._build_legacy_rows()
+
+    def _build_legacy_rows(self):
+        """Monta as linhas no formato antigo de categorias_lists (colunas preenchidas com None)."""
+        rows = []
+        max_length = max(len(values) for values in self._lists.values())
+        for i in range(max_length):
+            rows.append({
+                column: values[i] if i < len(values) else None
+                for column, values in self._lists.items()
+            })
+        rows.append({'dominios_por_microarea_segmento': self.tree})
+        return rows
+
+    def segments_of(self, macroarea):
+        """
+        Obtém os segmentos de uma macroárea.
+
+        Args:
+            macroarea: Nome da macroárea
+
+        Returns:
+            list: Segmentos, na ordem do arquivo
+        """
+        return list(self.tree.get(macroarea, {}))
+
+    def domains_of(self, macroarea, segmento):
+        """
+        Obtém os domínios afeitos de um segmento.
+
+        Args:
+            macroarea: Nome da macroárea
+            segmento: Nome do segmento
+
+        Returns:
+            list: Domínios, na ordem do arquivo
+        """
+        return list(self.tree.get(macroarea, {}).get(segmento, []))
+
+    def organized_lists(self):
+        """
+        Obtém as listas usadas pelas páginas de categorização e de listas.
+
+        Returns:
+            dict: Coluna -> lista ordenada de valores, mais a árvore em JSON
+        """
+        lists = {column: list(values) for column, values in self._lists.items()}
+        lists['dominios_por_microarea_segmento_json'] = self.tree_json
+        return lists
+
+    def legacy_rows(self):
+        """
+        Obtém as listas no formato antigo da aba categorias_lists.
+
+        Returns:
+            list: Lista de dicionários com as opções de categorias
+        """
+        return [dict(row) for row in self._legacy_rows]
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def get_taxonomy(path):
+    """
+    Obtém a taxonomia do aia.json, reconstruindo-a apenas quando o arquivo muda (mtime/tamanho).
+
+    Args:
+        path: Caminho do arquivo aia.json
+
+    Returns:
+        Taxonomy: Taxonomia da versão atual do arquivo
+    """
+    key = os.path.abspath(path)
+    stat = os.stat(key)
+    signature = (stat.st_mtime_ns, stat.st_size)
+
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached and cached[0] == signature:
+            return cached[1]
+
+    with open(key, 'rb') as f:
+        content = f.read()
+    taxonomy = Taxonomy(json.loads(content.decode('utf-8')), hashlib.sha1(content).hexdigest())
+
+    with _cache_lock:
+        _cache[key] = (signature, taxonomy)
+    return taxonomy
@@ -0,0 +1,145 @@
+import numpy as np
+
+from app.search_index import tokenize
+
+# Campos do projeto usados no pré-ranking e o peso de cada um
+PROJECT_FIELDS = {
+    'titulo': 2,
+    'titulo_publico': 2,
+    'tags': 1,
+    'objetivo': 1,
+    'descricao_publica': 1
+}
+
+
+def stem(term):
+    """
+    Radical simplificado de um termo (sem plural e limitado a 6 letras), para que
+    variações como "alimento"/"alimentos"/"alimentar" casem entre si.
+
+    Args:
+        term: Termo normalizado
+
+    Returns:
+        str: Radical do termo
+    """
+    if len(term) > 4 and term.endswith('s'):
+        term = term[:-1]
+    return term[:6]
+
+
+def stems(text):
+    """Radicais dos termos de um texto."""
+    return [stem(term) for term in tokenize(text)]
+
+
+class TaxonomyRanker:
+    """
+    Pré-ranking léxico dos segmentos do aia.json para um projeto: TF-IDF sobre
+    os nomes de macroárea, segmento e domínios, com similaridade de cosseno
+    calculada com NumPy. Usado para enviar à IA apenas os segmentos candidatos.
+    """
+
+    def __init__(self, records):
+        """
+        Monta a matriz TF-IDF dos segmentos.
+
+        Args:
+            records: Lista de registros do aia.json
+        """
+        self.records = records
+
+        # Um documento por (macroárea, segmento); o nome do segmento pesa em dobro
+        documents = {}
+        for item in records:
+            key = (item.get('Macroárea'), item.get('Segmento'))
+            terms = documents.setdefault(key, [])
+            terms += stems(key[0]) + stems(key[1]) * 2 + stems(item.get('Domínios Afeitos', ''))
+        self.segments = list(documents)
+
+        self.vocabulary = {}
+        for terms in documents.values():
+            for term in terms:
+                self.vocabulary.setdefault(term, len(self.vocabulary))
+
+        counts = np.zeros((len(self.segments), len(self.vocabulary)))
+        for row, terms in enumerate(documents.values()):
+            np.add.at(counts[row], [self.vocabulary[term] for term in terms], 1)
+
+        document_frequency = (counts > 0).sum(axis=0)
+        self.idf = np.log((1 + len(self.segments)) / (1 + document_frequency)) + 1
+        self.matrix = self._normalize(self._tf(counts) * self.idf)
+
+    @staticmethod
+    def _tf(counts):
+        """Frequência sublinear dos termos (1 + log)."""
+        tf = np.zeros_like(counts)
+        np.log(counts, out=tf, where=counts > 0)
+        return np.where(counts > 0, tf + 1, 0)
+
+    @staticmethod
+    def _normalize(matrix):
+        """Normaliza as linhas pela norma L2."""
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+    def vectorize(self, project):
+        """
+        Calcula o vetor TF-IDF de um projeto.
+
+        Args:
+            project: Dicionário do projeto
+
+        Returns:
+            numpy.ndarray: Vetor normalizado (zeros se nenhum termo for conhecido)
+        """
+        counts = np.zeros(len(self.vocabulary))
+        for field, weight in PROJECT_FIELDS.items():
+            for term in stems(project.get(field)):
+                index = self.vocabulary.get(term)
+                if index is not None:
+                    counts[index] += weight
+        return self._normalize(self._tf(counts) * self.idf)
+
+    def rank(self, project):
+        """
+        Ordena os segmentos pela similaridade com o projeto.
+
+        Args:
+            project: Dicionário do projeto
+
+        Returns:
+            list: Tuplas ((macroárea, segmento), score) em ordem decrescente de score
+        """
+        scores = self.matrix @ self.vectorize(project)
+        order = np.argsort(-scores, kind='stable')
+        return [(self.segments[i], float(scores[i])) for i in order]
+
+    def shortlist(self, project, top_k=8, min_score=0.08, min_coverage=0.5):
+        """
+        Seleciona os segmentos candidatos de um projeto.
+
+        A seleção é considerada confiável quando o melhor segmento tem score de
+        pelo menos min_score e os top_k segmentos concentram pelo menos
+        min_coverage da soma dos scores; caso contrário retorna None, e a
+        taxonomia completa deve ser usada.
+
+        Args:
+            project: Dicionário do projeto
+            top_k: Quantidade de segmentos candidatos
+            min_score: Score mínimo do melhor segmento
+            min_coverage: Fração mínima da soma dos scores nos candidatos
+
+        Returns:
+            list: Registros do aia.json dos segmentos candidatos, ou None
+        """
+        ranking = self.rank(project)
+        total = sum(score for _, score in ranking)
+        candidates = ranking[:top_k]
+        if not candidates or candidates[0][1] < min_score:
+            return None
+        if sum(score for _, score in candidates) / total < min_coverage:
+            return None
+
+        selected = {segment for segment, _ in candidates}
+        return [item for item in self.records if (item.get('Macroárea'), item.get('Segmento')) in selected]
@@ -0,0 +1,283 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import pandas as pd
+
+from app.write_committer import atomic_write_json
+from config import Config
+
+# Planilhas já lidas mantidas em memória (cada uma com todas as abas)
+MAX_PARSED_WORKBOOKS = 4
+
+# Tamanho das partes lidas ao calcular o hash de uma cópia local
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def workbook_version(properties):
+    """
+    Identificação da versão de um arquivo do SharePoint a partir dos seus
+    metadados (ver SharePointClient.get_file_properties).
+
+    Args:
+        properties: Metadados do arquivo, ou None
+
+    Returns:
+        dict: ETag, data de modificação e tamanho, ou None sem metadados
+    """
+    if not properties:
+        return None
+    return {
+        'etag': properties.get('etag'),
+        'time_last_modified': properties.get('time_last_modified'),
+        'file_size': properties.get('file_size')
+    }
+
+
+class WorkbookCache:
+    """
+    Cópias locais das planilhas baixadas do SharePoint, endereçadas pelo hash
+    do conteúdo (objects/<sha256>.xlsx) e indexadas por site, caminho remoto
+    e versão (index.json); os downloads são gravados direto em disco. Também
+    mantém em memória as abas já lidas de cada conteúdo, para que a mesma
+    planilha não seja interpretada de novo.
+
+    get_path, latest_path e put_file reservam a cópia devolvida para leitura;
+    o chamador a libera com release. Uma cópia substituída por uma versão nova
+    só é apagada quando não há mais leitores.
+    """
+
+    def __init__(self, root):
+        """
+        Args:
+            root: Diretório do cache (ex.: instance/sharepoint_cache)
+        """
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.index_path = os.path.join(root, 'index.json')
+        self._lock = threading.Lock()
+        self._index = self._load_index()
+        self._frames = OrderedDict()
+        self._readers = {}
+        self._orphans = set()
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _key(site_url, remote_path):
+        return f"{site_url.rstrip('/').lower()}|{remote_path}"
+
+    def _object_path(self, content_hash):
+        return os.path.join(self.objects_dir, f'{content_hash}.xlsx')
+
+    def _acquire(self, content_hash):
+        """Registra um leitor da cópia (chamar com _lock)."""
+        self._readers[content_hash] = self._readers.get(content_hash, 0) + 1
+
+    def _remove_if_unused(self, content_hash):
+        """Apaga a cópia se nenhum arquivo a referencia; com leitores, adia até o release (chamar com _lock)."""
+        if any(entry['sha256'] == content_hash for entry in self._index.values()):
+            return
+        if self._readers.get(content_hash):
+            self._orphans.add(content_hash)
+            return
+        self._orphans.discard(content_hash)
+        try:
+            os.remove(self._object_path(content_hash))
+        except OSError as e:
+            print(f"Erro ao remover cópia antiga do cache local de planilhas: {str(e)}")
+
+    def release(self, content_hash):
+        """
+        Libera uma cópia reservada por get_path, latest_path ou put_file.
+
+        Args:
+            content_hash: Hash do conteúdo da cópia
+        """
+        with self._lock:
+            count = self._readers.get(content_hash, 0) - 1
+            if count > 0:
+                self._readers[content_hash] = count
+                return
+            self._readers.pop(content_hash, None)
+            if content_hash in self._orphans:
+                self._remove_if_unused(content_hash)
+
+    def temp_path(self):
+        """
+        Caminho de um arquivo temporário no diretório do cache, onde os
+        downloads são gravados antes de entrar no cache (ver put_file).
+
+        Returns:
+            str: Caminho do arquivo temporário (já criado, vazio)
+        """
+        os.makedirs(self.objects_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(suffix='.download', dir=self.objects_dir)
+        os.close(fd)
+        return path
+
+    def get_path(self, site_url, remote_path, version):
+        """
+        Obtém (e reserva, ver release) a cópia local da versão informada do arquivo.
+
+        Args:
+            site_url: URL do site do SharePoint
+            remote_path: Caminho relativo do arquivo (pasta/arquivo.xlsx)
+            version: Versão atual do arquivo (ver workbook_version)
+
+        Returns:
+            tuple: (caminho da cópia local, hash do conteúdo), ou (None, None) se a versão não está no cache
+        """
+        if not version:
+            return None, None
+        with self._lock:
+            entry = self._index.get(self._key(site_url, remote_path))
+            if not entry or entry.get('version') != version:
+                return None, None
+            path = self._object_path(entry['sha256'])
+            if not os.path.exists(path):
+                return None, None
+            self._acquire(entry['sha256'])
+            return path, entry['sha256']
+
+    def latest_entry(self, site_url, remote_path):
+        """
+        Entrada do índice da última cópia baixada do arquivo, sem reservá-la.
+
+        Returns:
+            dict: Entrada com 'sha256', 'version' e 'cached_at', ou None sem cópia local
+        """
+        with self._lock:
+            entry = self._index.get(self._key(site_url, remote_path))
+            if not entry or not os.path.exists(self._object_path(entry['sha256'])):
+                return None
+            return dict(entry)
+
+    def latest_path(self, site_url, remote_path):
+        """
+        Obtém (e reserva, ver release) a última cópia baixada do arquivo,
+        qualquer que seja a versão (usado quando o SharePoint está inacessível).
+
+        Returns:
+            tuple: (caminho da cópia local, entrada do índice com 'version' e 'cached_at'), ou (None, None)
+        """
+        with self._lock:
+            entry = self._index.get(self._key(site_url, remote_path))
+            if not entry:
+                return None, None
+            path = self._object_path(entry['sha256'])
+            if not os.path.exists(path):
+                return None, None
+            self._acquire(entry['sha256'])
+            return path, dict(entry)
+
+    def put_file(self, site_url, remote_path, version, tmp_path):
+        """
+        Move um arquivo baixado para o cache e o associa ao arquivo remoto e à
+        versão; a cópia devolvida fica reservada (ver release).
+
+        Args:
+            site_url: URL do site do SharePoint
+            remote_path: Caminho relativo do arquivo (pasta/arquivo.xlsx)
+            version: Versão do arquivo (None se os metadados não estavam disponíveis)
+            tmp_path: Arquivo baixado (ver temp_path); é movido ou removido
+
+        Returns:
+            tuple: (caminho da cópia local, hash do conteúdo)
+        """
+        # Hash calculado em partes, sem carregar o arquivo inteiro na memória
+        digest = hashlib.sha256()
+        with open(tmp_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        content_hash = digest.hexdigest()
+
+        with self._lock:
+            object_path = self._object_path(content_hash)
+            if os.path.exists(object_path):
+                os.remove(tmp_path)
+            else:
+                os.replace(tmp_path, object_path)
+
+            self._acquire(content_hash)
+            key = self._key(site_url, remote_path)
+            previous = self._index.get(key)
+            self._index[key] = {
+                'sha256': content_hash,
+                'version': version,
+                'cached_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            }
+            try:
+                atomic_write_json(self.index_path, self._index)
+            except OSError as e:
+                print(f"Erro ao atualizar o cache local de planilhas: {str(e)}")
+
+            # Remover a cópia anterior se nenhum outro arquivo a referencia
+            if previous and previous['sha256'] != content_hash:
+                self._remove_if_unused(previous['sha256'])
+        return object_path, content_hash
+
+    def read_excel(self, path, content_hash, sheet_name):
+        """
+        Lê uma aba da planilha, interpretando cada conteúdo apenas uma vez.
+
+        Args:
+            path: Caminho da cópia local da planilha
+            content_hash: Hash do conteúdo (ver get_path e put_file)
+            sheet_name: Nome da aba
+
+        Returns:
+            pandas.DataFrame: Cópia da aba (pode ser alterada pelo chamador)
+        """
+        return self.read_workbook(path, content_hash)[sheet_name].copy()
+
+    def read_workbook(self, path, content_hash):
+        """
+        Lê todas as abas da planilha direto do disco, com memória por hash do conteúdo.
+
+        Args:
+            path: Caminho da cópia local da planilha
+            content_hash: Hash do conteúdo (ver get_path e put_file)
+
+        Returns:
+            dict: {nome da aba: DataFrame} (não alterar; use read_excel para obter cópias)
+        """
+        with self._lock:
+            sheets = self._frames.get(content_hash)
+            if sheets is not None:
+                self._frames.move_to_end(content_hash)
+                return sheets
+
+        sheets = pd.read_excel(path, sheet_name=None)
+        with self._lock:
+            self._frames[content_hash] = sheets
+            while len(self._frames) > MAX_PARSED_WORKBOOKS:
+                self._frames.popitem(last=False)
+        return sheets
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_workbook_cache():
+    """
+    Obtém o cache de planilhas compartilhado pelo processo.
+
+    Returns:
+        WorkbookCache: Instância única (diretório em SHAREPOINT_CACHE_DIR)
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = WorkbookCache(Config.SHAREPOINT_CACHE_DIR)
+        return _cache
@@ -0,0 +1,166 @@
+import json
+import os
+import threading
+import time
+
+
+def atomic_write_json(path, data, fsync=False):
+    """
+    Grava um arquivo JSON de forma atômica (arquivo temporário + rename).
+
+    Args:
+        path: Caminho do arquivo de destino
+        data: Dados serializáveis em JSON
+        fsync: Se True, força a gravação em disco antes de retornar
+    """
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+    if fsync:
+        fsync_directory(os.path.dirname(path) or '.')
+
+
+def fsync_directory(path):
+    """Força a gravação da entrada de diretório (necessário após rename em POSIX)."""
+    if os.name != 'posix':
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class _PendingWrite:
+    """Mutação aguardando o próximo lote de gravação."""
+
+    def __init__(self, apply_fn):
+        self.apply_fn = apply_fn
+        self.dirty = ()
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class WriteCommitter:
+    """
+    Agrupa gravações de requisições concorrentes (group commit).
+
+    Cada mutação é aplicada ao estado em memória e informa quais arquivos
+    ficaram sujos; ao final do lote, cada arquivo sujo é gravado uma única
+    vez. A requisição só retorna depois que o lote com a sua mutação foi gravado.
+    """
+
+    def __init__(self, window=0.01, fsync=False):
+        """
+        Inicializa o agrupador de gravações.
+
+        Args:
+            window: Tempo (segundos) de espera para reunir mutações no mesmo lote
+            fsync: Se True, os arquivos são sincronizados em disco antes de liberar as requisições
+        """
+        self.window = window
+        self.fsync = fsync
+        self._flushers = {}
+        self._pending = []
+        self._leader_active = False
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def register(self, name, flush_fn):
+        """
+        Registra a função que grava um arquivo.
+
+        Args:
+            name: Nome lógico do arquivo (ex.: 'projetos')
+            flush_fn: Função flush_fn(fsync) que grava o estado em memória no disco
+        """
+        self._flushers[name] = flush_fn
+
+    def submit(self, apply_fn):
+        """
+        Envia uma mutação e aguarda a gravação do lote em que ela entrou.
+
+        Args:
+            apply_fn: Função sem argumentos que altera o estado em memória e retorna
+                      (resultado, nomes_dos_arquivos_sujos)
+
+        Returns:
+            O resultado retornado por apply_fn
+        """
+        pending = _PendingWrite(apply_fn)
+
+        with self._lock:
+            self._pending.append(pending)
+            is_leader = not self._leader_active
+            self._leader_active = True
+
+        if is_leader:
+            # O líder espera a janela para reunir mutações de outras requisições
+            if self.window > 0:
+                time.sleep(self.window)
+
+            with self._flush_lock:
+                with self._lock:
+                    batch = self._pending
+                    self._pending = []
+                    self._leader_active = False
+                self._commit(batch)
+
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _commit(self, batch):
+        """Aplica as mutações do lote e grava cada arquivo sujo uma única vez."""
+        dirty = []
+        for pending in batch:
+            try:
+                pending.result, pending.dirty = pending.apply_fn()
+                for name in pending.dirty:
+                    if name not in dirty:
+                        dirty.append(name)
+            except Exception as e:
+                pending.error = e
+
+        for name in dirty:
+            try:
+                self._flushers[name](self.fsync)
+            except Exception as e:
+                for pending in batch:
+                    if pending.error is None and name in pending.dirty:
+                        pending.error = e
+
+        for pending in batch:
+            pending.done.set()
+
+
+_committers = {}
+_committers_lock = threading.Lock()
+
+
+def get_write_committer(key, window=0.01, fsync=False):
+    """
+    Obtém o WriteCommitter compartilhado pelo processo para uma pasta de dados.
+
+    Args:
+        key: Identificador da pasta de dados
+        window: Janela de agrupamento em segundos (usada apenas na criação)
+        fsync: Se True, sincroniza em disco antes de liberar as requisições (usado apenas na criação)
+
+    Returns:
+        WriteCommitter: Instância única por chave
+    """
+    key = os.path.abspath(key)
+    with _committers_lock:
+        committer = _committers.get(key)
+        if committer is None:
+            committer = WriteCommitter(window, fsync)
+            _committers[key] = committer
+        return committer
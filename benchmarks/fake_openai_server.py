@@ -0,0 +1,199 @@
+"""
+Servidor local que simula a API de chat da OpenAI, com latência e erros
+configuráveis, para testar e medir o caminho da IA sem rede e sem custo.
+
+As respostas são sugestões válidas (escolhidas de forma determinística a
+partir do conteúdo da requisição) com os registros do aia.json.
+
+Uso:
+    python -m benchmarks.fake_openai_server --port 8099 --latency-ms 800 --error-rate 0.02
+    OPENAI_BASE_URL=http://127.0.0.1:8099/v1 python run.py
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.taxonomy import get_taxonomy
+
+
+class FakeOpenAIConfig:
+    """Distribuições de latência e de erros do servidor simulado."""
+
+    def __init__(self, latency_ms=800, latency_sigma=0.5, error_rate=0.0, rate_limit_rate=0.0,
+                 stall_rate=0.0, stall_ms=30000, aia_path='app/data/aia.json'):
+        """
+        Args:
+            latency_ms: Mediana da latência de cada resposta
+            latency_sigma: Dispersão da latência (log-normal)
+            error_rate: Fração de respostas 500
+            rate_limit_rate: Fração de respostas 429
+            stall_rate: Fração de respostas muito lentas (cauda)
+            stall_ms: Latência das respostas lentas
+            aia_path: Caminho do aia.json usado nas respostas
+        """
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.stall_rate = stall_rate
+        self.stall_ms = stall_ms
+        self.taxonomy = get_taxonomy(aia_path)
+        self.segments = [(m, s) for m, segments in self.taxonomy.tree.items() for s in segments]
+        self.seen_prefixes = set()
+        self.lock = threading.Lock()
+        self.requests = 0
+
+
+def fake_suggestion(config, content):
+    """Sugestão determinística para o conteúdo da requisição."""
+    rng = random.Random(hashlib.sha1(content.encode('utf-8')).hexdigest())
+    macroarea, segmento = rng.choice(config.segments)
+    dominios = config.taxonomy.domains_of(macroarea, segmento)
+    outros = [
+        d for s in config.taxonomy.segments_of(macroarea) if s != segmento
+        for d in config.taxonomy.domains_of(macroarea, s)
+    ]
+    return {
+        '_aia_n1_macroarea': macroarea,
+        '_aia_n2_segmento': segmento,
+        '_aia_n3_dominio_afeito': ';'.join(rng.sample(dominios, min(len(dominios), rng.randint(1, 2)))) if dominios else '',
+        '_aia_n3_dominio_outro': rng.choice(outros) if outros and rng.random() < 0.5 else 'N/A',
+        'confianca': rng.choice(['ALTA', 'MÉDIA', 'BAIXA']),
+        'justificativa': 'Resposta simulada pelo servidor local.'
+    }
+
+
+def make_handler(config):
+    """Cria a classe de tratamento das requisições com a configuração informada."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, payload, headers=None):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                # Cliente desistiu da requisição (timeout ou requisição de reserva cancelada)
+                self.close_connection = True
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            request = json.loads(self.rfile.read(length) or b'{}')
+            if not self.path.rstrip('/').endswith('/chat/completions'):
+                self._send(404, {'error': {'message': f'Caminho desconhecido: {self.path}'}})
+                return
+
+            with config.lock:
+                config.requests += 1
+            rng = random.Random()
+            latency = config.latency_ms * rng.lognormvariate(0, config.latency_sigma)
+            if rng.random() < config.stall_rate:
+                latency = config.stall_ms
+            time.sleep(latency / 1000.0)
+
+            draw = rng.random()
+            if draw < config.rate_limit_rate:
+                self._send(429, {'error': {'message': 'Rate limit simulado', 'type': 'rate_limit_error'}},
+                           {'Retry-After': '1'})
+                return
+            if draw < config.rate_limit_rate + config.error_rate:
+                self._send(500, {'error': {'message': 'Erro simulado', 'type': 'server_error'}})
+                return
+
+            messages = request.get('messages', [])
+            system = next((m['content'] for m in messages if m.get('role') == 'system'), '')
+            user = ''.join(m['content'] for m in messages if m.get('role') == 'user')
+            prompt_tokens = (len(system) + len(user)) // 4
+
+            # Simula o cache de prompts: o prefixo (mensagem de sistema) já visto conta como em cache
+            with config.lock:
+                cached = system in config.seen_prefixes
+                config.seen_prefixes.add(system)
+            cached_tokens = (len(system) // 4) // 128 * 128 if cached and len(system) // 4 >= 1024 else 0
+
+            content = json.dumps(fake_suggestion(config, user), ensure_ascii=False)
+            completion_tokens = len(content) // 4
+            self._send(200, {
+                'id': f'chatcmpl-local-{config.requests}',
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': request.get('model', 'local'),
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': content},
+                    'finish_reason': 'stop'
+                }],
+                'usage': {
+                    'prompt_tokens': prompt_tokens,
+                    'completion_tokens': completion_tokens,
+                    'total_tokens': prompt_tokens + completion_tokens,
+                    'prompt_tokens_details': {'cached_tokens': cached_tokens}
+                }
+            })
+
+    return Handler
+
+
+def start_server(config, host='127.0.0.1', port=0):
+    """
+    Inicia o servidor numa thread em segundo plano.
+
+    Args:
+        config: FakeOpenAIConfig
+        host: Endereço de escuta
+        port: Porta (0 escolhe uma porta livre)
+
+    Returns:
+        tuple: (servidor, URL base da API, ex.: http://127.0.0.1:8099/v1)
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='fake-openai', daemon=True).start()
+    return server, f'http://{host}:{server.server_address[1]}/v1'
+
+
+def add_arguments(parser):
+    """Argumentos de linha de comando das distribuições de latência e erros."""
+    parser.add_argument('--latency-ms', type=float, default=800, help='Mediana da latência (ms)')
+    parser.add_argument('--latency-sigma', type=float, default=0.5, help='Dispersão log-normal da latência')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fração de respostas 500')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Fração de respostas 429')
+    parser.add_argument('--stall-rate', type=float, default=0.0, help='Fração de respostas muito lentas')
+    parser.add_argument('--stall-ms', type=float, default=30000, help='Latência das respostas lentas (ms)')
+
+
+def config_from_args(args):
+    """Cria a configuração do servidor a partir dos argumentos."""
+    return FakeOpenAIConfig(
+        latency_ms=args.latency_ms, latency_sigma=args.latency_sigma, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, stall_rate=args.stall_rate, stall_ms=args.stall_ms
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Servidor local que simula a API de chat da OpenAI')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8099)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server, base_url = start_server(config_from_args(args), args.host, args.port)
+    print(f"Servidor simulado em {base_url} (Ctrl+C para encerrar)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,100 @@
+"""
+Mede a vazão e os percentis de latência de suggest_categories de ponta a ponta
+em diferentes níveis de concorrência, sem rede: contra o servidor simulado
+(benchmarks.fake_openai_server, padrão) ou reproduzindo um cassete gravado.
+
+Uso:
+    python -m benchmarks.pipeline --concurrency 1,4,16 --projects 64 --latency-ms 300
+    python -m benchmarks.pipeline --cassette instance/openai_cassette.jsonl
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from app.ai_integration import OpenAIClient
+from app.storage import create_data_client
+from benchmarks.fake_openai_server import add_arguments, config_from_args, start_server
+from benchmarks.suggestion_modes import percentile
+from config import Config
+
+
+async def run_level(client, projects, aia_data, concurrency):
+    """
+    Executa as sugestões com a concorrência informada.
+
+    Returns:
+        dict: Vazão, percentis de latência e erros
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def suggest(project):
+        nonlocal errors
+        async with semaphore:
+            started_at = time.perf_counter()
+            suggestion = await client.suggest_categories_async(project, None, aia_data)
+            latencies.append(time.perf_counter() - started_at)
+            if 'error' in suggestion:
+                errors += 1
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(suggest(project) for project in projects))
+    elapsed = time.perf_counter() - started_at
+    return {
+        'concorrencia': concurrency,
+        'projetos': len(projects),
+        'segundos': round(elapsed, 2),
+        'projetos_por_segundo': round(len(projects) / elapsed, 2),
+        'latencia_p50_ms': round(percentile(latencies, 0.5) * 1000),
+        'latencia_p95_ms': round(percentile(latencies, 0.95) * 1000),
+        'latencia_p99_ms': round(percentile(latencies, 0.99) * 1000),
+        'erros': errors
+    }
+
+
+async def main(args):
+    server = None
+    transport = None
+    if args.cassette:
+        # O cassete depende do pacote httpx (opcional)
+        from app.openai_transport import CassetteTransport
+        transport = CassetteTransport(args.cassette, 'reproduzir', replay_latency=args.replay_latency)
+        print(f"Reproduzindo {len(transport)} respostas de {args.cassette}")
+    elif args.base_url:
+        Config.OPENAI_BASE_URL = args.base_url
+    else:
+        server, Config.OPENAI_BASE_URL = start_server(config_from_args(args))
+        print(f"Servidor simulado em {Config.OPENAI_BASE_URL}")
+
+    json_client = create_data_client()
+    projects = json_client.get_excel_data(None, 'projetos')[:args.projects]
+    aia_data = json_client.get_taxonomy().records
+
+    try:
+        for concurrency in [int(level) for level in args.concurrency.split(',')]:
+            client = OpenAIClient(args.api_key, mode=args.mode, transport=transport)
+            try:
+                result = await run_level(client, projects, aia_data, concurrency)
+            finally:
+                # Fechar as conexões do nível, para não interferir na medição do próximo
+                await client.aclose()
+            result['requisicoes'] = client.get_usage()['requests']
+            print(json.dumps(result, ensure_ascii=False))
+    finally:
+        if server is not None:
+            server.shutdown()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark de ponta a ponta de suggest_categories')
+    parser.add_argument('--concurrency', default='1,4,16', help='Níveis de concorrência separados por vírgula')
+    parser.add_argument('--projects', type=int, default=64, help='Quantidade de projetos por nível')
+    parser.add_argument('--mode', default=Config.AI_SUGGESTION_MODE, choices=OpenAIClient.MODES)
+    parser.add_argument('--cassette', default=None, help='Reproduz as respostas gravadas neste arquivo')
+    parser.add_argument('--replay-latency', action='store_true', help='Na reprodução, espera o tempo de resposta gravado')
+    parser.add_argument('--base-url', default=None, help='Usa outro servidor em vez de iniciar o simulado')
+    parser.add_argument('--api-key', default='sk-local', help='Chave enviada à API')
+    add_arguments(parser)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,141 @@
+"""
+Compara os modos de classificação da IA (duas etapas x uma etapa):
+latência, tokens por projeto e concordância entre as sugestões.
+
+Uso:
+    python -m benchmarks.suggestion_modes --sample 50 --concurrency 8
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+from app.ai_integration import OpenAIClient
+from app.storage import create_data_client
+from config import Config
+
+
+def split_values(value):
+    """Converte 'A;B;C' no conjunto {'A', 'B', 'C'} (N/A e vazio viram conjunto vazio)."""
+    values = {item.strip() for item in str(value or '').split(';')}
+    return {item for item in values if item and item.lower() != 'n/a'}
+
+
+def jaccard(a, b):
+    """Similaridade de Jaccard entre dois conjuntos (1.0 quando ambos estão vazios)."""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def percentile(values, fraction):
+    """Percentil simples (vizinho mais próximo) de uma lista de valores."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+async def run_mode(api_key, mode, projects, aia_data, concurrency):
+    """
+    Executa as sugestões de um modo, medindo a latência de cada projeto.
+
+    Returns:
+        tuple: (sugestões, latências em segundos, uso da API)
+    """
+    client = OpenAIClient(api_key, mode=mode)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = [0.0] * len(projects)
+
+    async def suggest(i, project):
+        async with semaphore:
+            started_at = time.perf_counter()
+            suggestion = await client.suggest_categories_async(project, None, aia_data)
+            latencies[i] = time.perf_counter() - started_at
+            return suggestion
+
+    suggestions = await asyncio.gather(*(suggest(i, project) for i, project in enumerate(projects)))
+    return suggestions, latencies, client.get_usage()
+
+
+def summarize(mode, suggestions, latencies, usage):
+    """Resume latência, tokens e erros de um modo."""
+    count = max(len(suggestions), 1)
+    return {
+        'modo': mode,
+        'modelo': OpenAIClient.model_for(mode),
+        'latencia_media_s': round(statistics.mean(latencies), 2) if latencies else 0.0,
+        'latencia_p50_s': round(percentile(latencies, 0.5), 2),
+        'latencia_p95_s': round(percentile(latencies, 0.95), 2),
+        'requisicoes_por_projeto': round(usage['requests'] / count, 2),
+        'tokens_por_projeto': round(usage['total_tokens'] / count),
+        'tokens_em_cache_por_projeto': round(usage['cached_tokens'] / count),
+        'erros': sum(1 for suggestion in suggestions if 'error' in suggestion)
+    }
+
+
+def agreement(reference, candidate):
+    """Concordância campo a campo entre as sugestões dos dois modos (projetos sem erro)."""
+    pairs = [(a, b) for a, b in zip(reference, candidate) if 'error' not in a and 'error' not in b]
+    if not pairs:
+        return {'projetos_comparados': 0}
+    return {
+        'projetos_comparados': len(pairs),
+        'macroarea': round(sum(a.get('_aia_n1_macroarea') == b.get('_aia_n1_macroarea') for a, b in pairs) / len(pairs), 3),
+        'segmento': round(sum(a.get('_aia_n2_segmento') == b.get('_aia_n2_segmento') for a, b in pairs) / len(pairs), 3),
+        'dominio_afeito_jaccard': round(statistics.mean(
+            jaccard(split_values(a.get('_aia_n3_dominio_afeito')), split_values(b.get('_aia_n3_dominio_afeito')))
+            for a, b in pairs
+        ), 3),
+        'dominio_outro_jaccard': round(statistics.mean(
+            jaccard(split_values(a.get('_aia_n3_dominio_outro')), split_values(b.get('_aia_n3_dominio_outro')))
+            for a, b in pairs
+        ), 3)
+    }
+
+
+async def main(args):
+    api_key = args.api_key or Config.get_openai_api_key()
+    if not api_key:
+        raise SystemExit("Chave da API OpenAI não configurada")
+
+    json_client = create_data_client()
+    projects = json_client.get_excel_data(None, 'projetos')
+    random.Random(args.seed).shuffle(projects)
+    projects = projects[:args.sample]
+    aia_data = json_client.get_taxonomy().records
+    print(f"Projetos na amostra: {len(projects)}")
+
+    results = {}
+    summaries = []
+    for mode in OpenAIClient.MODES:
+        suggestions, latencies, usage = await run_mode(api_key, mode, projects, aia_data, args.concurrency)
+        results[mode] = suggestions
+        summaries.append(summarize(mode, suggestions, latencies, usage))
+        print(json.dumps(summaries[-1], ensure_ascii=False))
+
+    report = {
+        'modos': summaries,
+        'concordancia': agreement(results['duas_etapas'], results['uma_etapa'])
+    }
+    print(json.dumps(report['concordancia'], ensure_ascii=False))
+
+    if args.output:
+        report['sugestoes'] = [
+            {'codigo_projeto': project.get('codigo_projeto'), **{mode: results[mode][i] for mode in results}}
+            for i, project in enumerate(projects)
+        ]
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compara os modos de classificação da IA')
+    parser.add_argument('--sample', type=int, default=30, help='Quantidade de projetos na amostra')
+    parser.add_argument('--concurrency', type=int, default=8, help='Sugestões simultâneas por modo')
+    parser.add_argument('--seed', type=int, default=42, help='Semente da amostragem')
+    parser.add_argument('--output', default=None, help='Arquivo JSON com o relatório e as sugestões')
+    parser.add_argument('--api-key', default=None, help='Chave da API (padrão: a configurada na aplicação)')
+    asyncio.run(main(parser.parse_args()))
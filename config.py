@@ -11,6 +11,96 @@ class Config:
     # Caminho do arquivo Excel no SharePoint
     SHAREPOINT_EXCEL_PATH = os.environ.get('SHAREPOINT_EXCEL_PATH') or 'General/Lucas Pinheiro/db_classificacao/db_classificacao_projeto.xlsx'
     
+    # Cliente do SharePoint compartilhado entre as requisições: validade (segundos)
+    # da sessão autenticada e da biblioteca de documentos detectada em cada site
+    SHAREPOINT_AUTH_TTL_SECONDS = float(os.environ.get('SHAREPOINT_AUTH_TTL_SECONDS') or 3600)
+    SHAREPOINT_LIBRARY_TTL_SECONDS = float(os.environ.get('SHAREPOINT_LIBRARY_TTL_SECONDS') or 21600)
+    
+    # Caminhos do SharePoint que funcionaram (evita testar os alternativos a cada
+    # download/upload) e caminhos alternativos verificados em paralelo
+    SHAREPOINT_URL_CACHE_PATH = os.environ.get('SHAREPOINT_URL_CACHE_PATH') or os.path.join('instance', 'sharepoint_urls.json')
+    SHAREPOINT_PROBE_WORKERS = int(os.environ.get('SHAREPOINT_PROBE_WORKERS') or 4)
+    
+    # Cópias locais das planilhas baixadas do SharePoint (reaproveitadas enquanto
+    # a versão não muda e usadas, somente leitura, se o SharePoint estiver inacessível)
+    SHAREPOINT_CACHE_DIR = os.environ.get('SHAREPOINT_CACHE_DIR') or os.path.join('instance', 'sharepoint_cache')
+    
+    # Transferências em partes: tamanho de cada parte (downloads gravados direto
+    # em disco; uploads maiores que uma parte usam sessão de upload) e novas
+    # tentativas de cada parte em falhas temporárias
+    SHAREPOINT_CHUNK_SIZE_MB = float(os.environ.get('SHAREPOINT_CHUNK_SIZE_MB') or 10)
+    SHAREPOINT_UPLOAD_RETRIES = int(os.environ.get('SHAREPOINT_UPLOAD_RETRIES') or 5)
+    
+    # Backend de armazenamento dos dados: 'json' (padrão) ou 'sqlite'
+    STORAGE_BACKEND = (os.environ.get('STORAGE_BACKEND') or 'json').lower()
+    SQLITE_DB_PATH = os.environ.get('SQLITE_DB_PATH') or os.path.join('instance', 'data.db')
+    
+    # Agrupamento de gravações: janela (ms) para reunir salvamentos concorrentes
+    # e fsync antes de responder à requisição (durabilidade)
+    COMMIT_WINDOW_MS = float(os.environ.get('COMMIT_WINDOW_MS') or 10)
+    COMMIT_FSYNC = (os.environ.get('COMMIT_FSYNC') or 'false').lower() in ('1', 'true', 'sim')
+    
+    # Sugestões da IA: linhas no journal antes de compactar no ai_suggestions.json
+    # e se as sugestões substituídas devem ser guardadas como histórico
+    AI_SUGGESTIONS_COMPACT_EVERY = int(os.environ.get('AI_SUGGESTIONS_COMPACT_EVERY') or 500)
+    AI_SUGGESTIONS_HISTORY = (os.environ.get('AI_SUGGESTIONS_HISTORY') or 'false').lower() in ('1', 'true', 'sim')
+    
+    # Quantidade de sugestões da IA geradas em paralelo, em segundo plano
+    AI_SUGGESTION_WORKERS = int(os.environ.get('AI_SUGGESTION_WORKERS') or 4)
+    
+    # Cache das sugestões da IA: quantidade em memória (LRU) e validade em dias
+    AI_SUGGESTION_CACHE_SIZE = int(os.environ.get('AI_SUGGESTION_CACHE_SIZE') or 1000)
+    AI_SUGGESTION_CACHE_TTL_DAYS = float(os.environ.get('AI_SUGGESTION_CACHE_TTL_DAYS') or 30)
+    
+    # Tempo máximo (segundos) de uma sugestão da IA (duas chamadas à API)
+    OPENAI_TIMEOUT = float(os.environ.get('OPENAI_TIMEOUT') or 60)
+    
+    # Resiliência das chamadas à OpenAI: tempo máximo de cada chamada (segundos),
+    # novas tentativas com espera exponencial e jitter em 429/5xx/timeout,
+    # requisição de reserva após OPENAI_HEDGE_AFTER segundos (0 desativa) e
+    # disjuntor que recusa as chamadas por OPENAI_BREAKER_RESET_SECONDS após
+    # OPENAI_BREAKER_FAILURES falhas seguidas (as sugestões passam ao classificador local)
+    OPENAI_STAGE_TIMEOUT = float(os.environ.get('OPENAI_STAGE_TIMEOUT') or 20)
+    OPENAI_MAX_RETRIES = int(os.environ.get('OPENAI_MAX_RETRIES') or 3)
+    OPENAI_RETRY_BASE_DELAY = float(os.environ.get('OPENAI_RETRY_BASE_DELAY') or 0.5)
+    OPENAI_RETRY_MAX_DELAY = float(os.environ.get('OPENAI_RETRY_MAX_DELAY') or 8)
+    OPENAI_HEDGE_AFTER = float(os.environ.get('OPENAI_HEDGE_AFTER') or 0)
+    OPENAI_BREAKER_FAILURES = int(os.environ.get('OPENAI_BREAKER_FAILURES') or 5)
+    OPENAI_BREAKER_RESET_SECONDS = float(os.environ.get('OPENAI_BREAKER_RESET_SECONDS') or 30)
+    AI_LOCAL_FALLBACK = (os.environ.get('AI_LOCAL_FALLBACK') or 'true').lower() in ('1', 'true', 'sim')
+    
+    # Endereço alternativo da API (ex.: servidor local de testes benchmarks.fake_openai_server)
+    # e cassete de gravação/reprodução das respostas: '' (desativado), 'gravar',
+    # 'reproduzir' (sem rede) ou 'auto' (reproduz e grava as que faltam)
+    OPENAI_BASE_URL = os.environ.get('OPENAI_BASE_URL') or ''
+    OPENAI_CASSETTE_MODE = (os.environ.get('OPENAI_CASSETTE_MODE') or '').lower()
+    OPENAI_CASSETTE_PATH = os.environ.get('OPENAI_CASSETTE_PATH') or os.path.join('instance', 'openai_cassette.jsonl')
+    
+    # Modo de classificação: 'duas_etapas' (padrão) ou 'uma_etapa' (uma chamada com
+    # saída estruturada; compare com python -m benchmarks.suggestion_modes)
+    AI_SUGGESTION_MODE = (os.environ.get('AI_SUGGESTION_MODE') or 'duas_etapas').lower()
+    
+    # Pré-ranking local dos segmentos (modo duas_etapas): envia à IA apenas os
+    # AI_PRERANK_TOP_K segmentos mais parecidos com o projeto; abaixo de
+    # AI_PRERANK_MIN_SCORE a taxonomia completa é enviada
+    AI_PRERANK = (os.environ.get('AI_PRERANK') or 'false').lower() in ('1', 'true', 'sim')
+    AI_PRERANK_TOP_K = int(os.environ.get('AI_PRERANK_TOP_K') or 8)
+    AI_PRERANK_MIN_SCORE = float(os.environ.get('AI_PRERANK_MIN_SCORE') or 0.08)
+    
+    # Classificador local treinado com as categorizações existentes: sugestões
+    # com probabilidade >= LOCAL_CLASSIFIER_MIN_CONFIDENCE não chamam a OpenAI
+    # (avaliar com python -m app.local_classifier)
+    LOCAL_CLASSIFIER = (os.environ.get('LOCAL_CLASSIFIER') or 'false').lower() in ('1', 'true', 'sim')
+    LOCAL_CLASSIFIER_MIN_CONFIDENCE = float(os.environ.get('LOCAL_CLASSIFIER_MIN_CONFIDENCE') or 0.8)
+    LOCAL_CLASSIFIER_MIN_SAMPLES = int(os.environ.get('LOCAL_CLASSIFIER_MIN_SAMPLES') or 50)
+    LOCAL_CLASSIFIER_RETRAIN_SECONDS = int(os.environ.get('LOCAL_CLASSIFIER_RETRAIN_SECONDS') or 600)
+    
+    # Classificação em lote (python -m app.batch_classifier): limites de
+    # requisições e tokens por minuto e arquivo de checkpoint para retomar
+    AI_BATCH_RPM = int(os.environ.get('AI_BATCH_RPM') or 60)
+    AI_BATCH_TPM = int(os.environ.get('AI_BATCH_TPM') or 90000)
+    AI_BATCH_CHECKPOINT_PATH = os.environ.get('AI_BATCH_CHECKPOINT_PATH') or os.path.join('instance', 'batch_classification.json')
+    
     # Configurações que serão armazenadas localmente
     CONFIG_FILE = os.path.join('instance', 'config.json')
     
@@ -21,8 +21,8 @@ def save_file(file_n, file_obj, dest):
 
 def get_file(file_n, folder, dest):
     # print(f'Debug: Baixando arquivo -> {file_n} da pasta -> {folder}')
-    file_obj = SharePoint().download_file(file_n, folder)
-    save_file(file_n, file_obj, dest)
+    # Download em partes direto para o destino (arquivos grandes não ficam na memória)
+    SharePoint().download_file_to(file_n, folder, PurePath(dest, file_n))
 
 def get_files(folder, dest):
     # print(f'Debug: Listando arquivos na pasta -> {folder}')
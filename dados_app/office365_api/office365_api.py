@@ -47,6 +47,16 @@ class SharePoint:
         return file.content
 
 
+    def download_file_to(self, file_name, folder_name, dest_path, chunk_size=1024 * 1024, chunk_downloaded=None):
+        # Grava o arquivo direto em disco, em partes, sem carregá-lo inteiro na memória
+        conn = self._auth()
+        file_url = f'/sites/{SHAREPOINT_SITE_NAME}/{SHAREPOINT_DOC}/{folder_name}/{file_name}'
+        with open(dest_path, 'wb') as f:
+            conn.web.get_file_by_server_relative_path(file_url).download_session(
+                f, chunk_downloaded, chunk_size
+            ).execute_query()
+        return dest_path
+
     def download_latest_file(self, folder_name):
         date_format = "%Y-%m-%dT%H:%M:%SZ"
         files_list = self._get_files_list(folder_name)